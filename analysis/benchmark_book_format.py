@@ -0,0 +1,53 @@
+"""
+Compares convert_to_book_format_new (numpy) with the Polars version it replaced, on random books.
+
+    python -m analysis.benchmark_book_format
+"""
+
+import time
+
+import numpy as np
+
+from main_platform.utils import (convert_to_book_format_batch, convert_to_book_format_new,
+                                 convert_to_book_format_polars)
+
+
+def random_books(n_books: int, max_levels: int = 15, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    books = []
+    for _ in range(n_books):
+        book = {}
+        for side, best, direction in (('asks', 2000, 1), ('bids', 1999, -1)):
+            prices = best + direction * rng.integers(0, 25, rng.integers(0, max_levels))
+            book[side] = [{'x': float(price), 'y': float(rng.integers(1, 4))} for price in prices]
+        books.append(book)
+    return books
+
+
+def time_per_book(convert, books) -> float:
+    started = time.perf_counter()
+    for book in books:
+        convert(book)
+    return (time.perf_counter() - started) / len(books)
+
+
+def run_benchmark(n_books: int = 2000) -> dict:
+    books = random_books(n_books)
+    expected = np.array([convert_to_book_format_polars(book) for book in books])
+    assert np.array_equal(np.array([convert_to_book_format_new(book) for book in books]), expected)
+    assert np.array_equal(convert_to_book_format_batch(books), expected)
+
+    results = {
+        'polars': time_per_book(convert_to_book_format_polars, books),
+        'numpy': time_per_book(convert_to_book_format_new, books),
+    }
+    started = time.perf_counter()
+    convert_to_book_format_batch(books)
+    results['numpy_batch'] = (time.perf_counter() - started) / n_books
+    for name, seconds in results.items():
+        print(f"{name:>12}: {seconds * 1e6:8.1f} us per book ({results['polars'] / seconds:6.1f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -4,7 +4,7 @@ import duckdb
 import polars as pl
 
 from analysis import load_config
-from main_platform.utils import convert_to_book_format_new
+from main_platform.utils import convert_to_book_format_batch
 
 
 def load_configuration() -> dict:
@@ -32,12 +32,15 @@ def parse_and_transform_active_orders(active_orders: str) -> pl.DataFrame:
 
 
 def lobster_book_transformation(df_res: pl.DataFrame) -> pl.DataFrame:
-    active_orders_df = df_res["order_book"].str.json_decode()
-
-    book_format_series = active_orders_df.map_elements(
-        lambda ob: convert_to_book_format_new(ob) if ob else pl.DataFrame({'price': [], 'amount': []}),
-        return_dtype=pl.Object
-    )
+    order_books = df_res["order_book"].str.json_decode().to_list()
+
+    # all the books are converted at once, the rows without a book keep an empty frame
+    rows = [i for i, ob in enumerate(order_books) if ob]
+    books = convert_to_book_format_batch([order_books[i] for i in rows])
+    book_format = [pl.DataFrame({'price': [], 'amount': []}) for _ in order_books]
+    for i, book in zip(rows, books):
+        book_format[i] = book
+    book_format_series = pl.Series(book_format, dtype=pl.Object)
 
     df_res = df_res.with_columns(book_format_series.alias("LOBSTER_BOOK"))
     return df_res
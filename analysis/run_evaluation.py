@@ -16,10 +16,26 @@ from .utilities import flatten_item, load_config, process_df
 CONFIG = load_config()
 
 # cloud_db
-con = duckdb.connect(f"/Users/marioljonuzaj/Documents/Python Projects/Simulations/data.duckdb")
-con.execute(
-    f"""CREATE TABLE IF NOT EXISTS {CONFIG.TABLE_REF} (session_id VARCHAR, trader_data STRING)"""
-)
+DUCKDB_PATH = "/Users/marioljonuzaj/Documents/Python Projects/Simulations/data.duckdb"
+_con = None
+
+
+def get_con() -> duckdb.DuckDBPyConnection:
+    """The analysis store, opened on first use (importing this module doesn't touch it)."""
+    global _con
+    if _con is None:
+        _con = duckdb.connect(DUCKDB_PATH)
+        _con.execute(
+            f"""CREATE TABLE IF NOT EXISTS {CONFIG.TABLE_REF} (session_id VARCHAR, trader_data STRING)"""
+        )
+    return _con
+
+
+def close_con() -> None:
+    global _con
+    if _con is not None:
+        _con.close()
+        _con = None
 
 # params
 
@@ -52,13 +68,14 @@ resolution = 4  # (2p+2) * 2^n, n is resolution, p is number of tweaked paramete
 @task
 def write_to_duckdb(session_id: str, trader_data: dict) -> None:
     trader_data_string = json.dumps(trader_data)
-    con.execute(
+    get_con().execute(
         f"""INSERT INTO {CONFIG.TABLE_REF} VALUES (?, ?)""",
         (session_id, trader_data_string),
     )
 
 
 def ingest() -> pl.DataFrame:
+    con = get_con()
     table_exists = (
         con.execute(
             f"SELECT count(*) FROM information_schema.tables WHERE table_name = '{CONFIG.TABLE_RES}'"
@@ -152,7 +169,7 @@ def run_evaluation():
     params = generate_and_store_parameters(bounds=bounds, resolution=resolution)
     asyncio.run(run_trading_sessions(params))
     ingest()
-    con.close()
+    close_con()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""
+Runs parameter sweeps without the FastAPI servers.
+
+Every session runs in a worker process of a process pool, with all its traders in the same process
+(in-process transport) and on virtual time, so a session takes as long as the CPU needs instead of
+trading_day_duration minutes. Sessions are reported as soon as each one finishes and stored in the
+analysis store right away; the messages written to Mongo are ingested at the end, as with
+run_evaluation.
+
+Workers are spawned, not forked: the parent already has a Mongo client (trading_platform connects
+when it is imported) and PyMongo clients are not fork-safe. The analysis store and the parameter
+generation are only imported by run_headless_evaluation, so run_session works without them.
+
+    python -m analysis.run_headless
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from client_connector.trader_manager import TraderManager
+from main_platform.clock import VirtualClock
+from main_platform.custom_logger import setup_custom_logger
+from main_platform.transport import InProcessBus
+from structures import TraderCreationData
+
+logger = setup_custom_logger(__name__)
+
+
+async def launch_and_clean_up(manager: TraderManager) -> None:
+    try:
+        await manager.launch()
+    finally:
+        await manager.cleanup()
+
+
+def run_session(trader_data: Dict) -> Dict:
+    """Runs one trading session to its end in the current process and returns its summary."""
+    clock = VirtualClock()
+    manager = TraderManager(
+        TraderCreationData(**trader_data),
+        transport_factory=InProcessBus().transport,
+        clock=clock,
+    )
+    started = time.perf_counter()
+    clock.run(launch_and_clean_up(manager))
+    session = manager.trading_session
+    return {
+        "session_id": session.id,
+        "trader_data": trader_data,
+        "transactions": len(session.trade_tape),
+        "simulated_seconds": clock.time(),
+        "wall_seconds": time.perf_counter() - started,
+        "persistence": session.persistence_metrics,
+    }
+
+
+def iter_sessions(params: List[Dict], max_workers: Optional[int] = None) -> Iterator[Dict]:
+    """Runs the sessions on a process pool and yields their summaries in the order they finish."""
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(run_session, trader_data): trader_data for trader_data in params}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.error(f"Session with parameters {futures[future]} failed: {e}")
+
+
+def run_headless_evaluation(bounds: Optional[Dict] = None, resolution: Optional[int] = None,
+                            max_workers: Optional[int] = None) -> None:
+    """Runs the sweep of the given bounds and resolution, those of run_evaluation by default."""
+    from analysis import run_evaluation
+    from analysis.parameterize import generate_and_store_parameters
+
+    params = generate_and_store_parameters(
+        bounds=run_evaluation.bounds if bounds is None else bounds,
+        resolution=run_evaluation.resolution if resolution is None else resolution,
+    )
+    logger.critical(f"Running {len(params)} trading sessions headless")
+    try:
+        for result in iter_sessions(params, max_workers=max_workers):
+            run_evaluation.write_to_duckdb.fn(result["session_id"], result["trader_data"])
+            logger.critical(
+                f"Session {result['session_id']} done: {result['transactions']} transactions, "
+                f"{result['simulated_seconds']:.0f}s simulated in {result['wall_seconds']:.1f}s"
+            )
+        run_evaluation.ingest()
+    finally:
+        run_evaluation.close_con()
+
+
+if __name__ == "__main__":
+    run_headless_evaluation()
@@ -9,10 +9,13 @@ import uuid
 #from external_traders.noise_trader import get_signal_noise, settings_noise, get_noise_rule_unif, settings
 from external_traders.informed_naive import get_signal_informed, get_order_to_match, settings_informed, update_settings_informed
 from structures import TraderCreationData
-from typing import List
-from traders import HumanTrader, NoiseTrader, InformedTrader
+from typing import Callable, List, Optional
+from traders import HumanTrader, NoiseTrader, NoiseCrowd, InformedTrader
 
 from main_platform import TradingSession
+from main_platform.clock import Clock
+from main_platform.random_streams import RandomStream
+from main_platform.transport import RabbitMQTransport, Transport
 
 import asyncio
 
@@ -29,13 +32,23 @@ class TraderManager:
     noise_traders = List[NoiseTrader]
     informed_traders = List[InformedTrader]
 
-    def __init__(self, params: TraderCreationData):
+    def __init__(self, params: TraderCreationData, transport_factory: Callable[[], Transport] = RabbitMQTransport,
+                 clock: Optional[Clock] = None):
+        """
+        Every trader and the trading session get their own transport from transport_factory. Pass
+        InProcessBus().transport to run the whole session in this process without RabbitMQ, and a
+        VirtualClock to run it faster than real time. All of them share the same clock. Every
+        simulated trader draws from its own child of the session random stream (seeded by the
+        seed parameter).
+        """
 
         self.params = params
         params=params.model_dump()
         # disabled as this is stored within db
         # logger.critical(f"TraderManager params: {params}")
         self.tasks = []
+        self.rng = RandomStream(params.get("seed"))
+        logger.info(f"Random streams of the session seeded with {self.rng.entropy}")
         n_noise_traders = params.get("num_noise_traders", 1)
 
         n_informed_traders = params.get("num_informed_traders", 1)
@@ -60,10 +73,23 @@ class TraderManager:
         settings_noise['pr_bid'] = 0.5
         settings_noise['step'] = params.get('step')
 
-        self.noise_traders = [NoiseTrader(activity_frequency=params.get('activity_frequency'),
-                                          order_amount=params.get('order_amount'),
-                                          settings = settings, 
-                                          settings_noise=settings_noise) for _ in range(n_noise_traders)]
+        if params.get('noise_crowd'):
+            self.noise_traders = [NoiseCrowd(n_members=n_noise_traders,
+                                             activity_frequency=params.get('activity_frequency'),
+                                             order_amount=params.get('order_amount'),
+                                             settings=settings,
+                                             settings_noise=settings_noise,
+                                             transport=transport_factory(),
+                                             clock=clock,
+                                             rng=self.rng.spawn())] if n_noise_traders else []
+        else:
+            self.noise_traders = [NoiseTrader(activity_frequency=params.get('activity_frequency'),
+                                              order_amount=params.get('order_amount'),
+                                              settings = settings, 
+                                              settings_noise=settings_noise,
+                                              transport=transport_factory(),
+                                              clock=clock,
+                                              rng=self.rng.spawn()) for _ in range(n_noise_traders)]
 
         
         settings_informed['time_period_in_min'] = params.get('trading_day_duration')
@@ -80,13 +106,20 @@ class TraderManager:
                                                 informed_time_plan=informed_time_plan,
                                                 informed_state=informed_state,
                                                 get_signal_informed=get_signal_informed,
-                                                get_order_to_match=get_order_to_match) for _ in range(n_informed_traders)]
+                                                get_order_to_match=get_order_to_match,
+                                                transport=transport_factory(),
+                                                clock=clock,
+                                                rng=self.rng.spawn()) for _ in range(n_informed_traders)]
                 
-        self.human_traders = [HumanTrader(cash=cash, shares=shares) for _ in range(n_human_traders)]
+        self.human_traders = [HumanTrader(cash=cash, shares=shares, transport=transport_factory(), clock=clock)
+                              for _ in range(n_human_traders)]
 
 
         self.traders = {t.id: t for t in self.noise_traders + self.informed_traders + self.human_traders}
-        self.trading_session = TradingSession(duration=params['trading_day_duration'])
+        self.trading_session = TradingSession(duration=params['trading_day_duration'],
+                                              conflation_window=params.get('conflation_window'),
+                                              transport=transport_factory(),
+                                              clock=clock)
 
 
 
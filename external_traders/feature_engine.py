@@ -0,0 +1,70 @@
+"""
+EWMA of the book features over several horizons (the alphas of settings['alphas_ewma']).
+
+The state is a matrix with one row per alpha and one column per feature (get_cols_features), so a
+book update is one broadcasted operation for all the horizons. update_batch runs a whole block
+of books at once, for offline use.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from external_traders.noise_trader import get_cols_features, get_cols_features_state, get_features_new
+
+
+class FeatureEngine:
+    def __init__(self, settings: dict, alphas: Optional[Sequence[float]] = None):
+        self.settings = dict(settings)
+        if alphas is not None:
+            self.settings['alphas_ewma'] = list(alphas)
+        self.alphas = np.asarray(self.settings['alphas_ewma'], dtype=np.float64)[:, None]
+        self.cols_features: List[str] = get_cols_features(self.settings)
+        self.state = np.zeros((len(self.alphas), len(self.cols_features)))
+        self.n_updates = 0
+
+    @property
+    def cols_state(self) -> List[str]:
+        """The names of the flattened state (features_state of noise_trader.py)."""
+        return get_cols_features_state(self.settings)
+
+    def reset(self) -> None:
+        self.state[:] = 0
+        self.n_updates = 0
+
+    def update(self, features_new: np.ndarray) -> np.ndarray:
+        """Updates every horizon with one row of features and returns the state (alphas x features)."""
+        self.state *= self.alphas
+        self.state += (1 - self.alphas) * features_new
+        self.n_updates += 1
+        return self.state
+
+    def update_book(self, book_stack) -> np.ndarray:
+        """Updates with the features of the latest book of the stack (a RingStack or an array)."""
+        return self.update(get_features_new(np.asarray(book_stack)[-2:], self.settings)[-1])
+
+    def update_batch(self, books: np.ndarray, return_history: bool = False) -> np.ndarray:
+        """
+        Updates with the features of every book of the block but the first one (the features need
+        the previous book). Returns the final state, or the state after each of the books
+        (n_books - 1 x alphas x features) when return_history is set.
+        """
+        features = get_features_new(books, self.settings)
+        n = len(features)
+        if n == 0:
+            return np.empty((0, *self.state.shape)) if return_history else self.state
+        if return_history:
+            history = np.empty((n, *self.state.shape))
+            for t in range(n):
+                history[t] = self.update(features[t])
+            return history
+        # the weight of the t-th features in the final state is (1 - alpha) * alpha ** (n - 1 - t)
+        powers = self.alphas ** np.arange(n - 1, -1, -1)
+        self.state *= self.alphas ** n
+        self.state += (1 - self.alphas) * (powers @ features)
+        self.n_updates += n
+        return self.state
+
+    def features_state(self) -> np.ndarray:
+        """The state flattened as in get_features_update (a copy)."""
+        return self.state.ravel().copy()
@@ -0,0 +1,151 @@
+"""
+Kernels of the array based limit order book (see lob_simulator.py).
+
+A side of the book is a pair of float64 arrays of the same fixed length levels_n: prices and sizes.
+The prices are a grid of consecutive ticks starting at the best price (descending for bids,
+ascending for asks), so a level can have size 0. All kernels take and return plain arrays and
+scalars, they never modify their inputs.
+
+When numba is installed the kernels are compiled on their first call (set NUMBA_DISABLE_JIT=1 to
+run them as plain Python anyway). The Python versions stay available in PY_KERNELS.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional: without it the kernels run as plain Python
+    numba = None
+
+
+# finds the first price at which there is a size less than max_size_level, else gives -1
+def get_noise_condition_price(prices, sizes, max_size_level):
+    for i in range(len(prices)):
+        if sizes[i] < max_size_level:
+            return prices[i]
+    return -1.
+
+
+# execution code
+# this part updates the bid side of the order book using an ask price and size.
+def get_exec_sell_trd(bid_prices, bid_sizes, order_ask_price, order_ask_size):
+    """
+    Executes a sell order against the bids, best level first, for as long as the order price is
+    at or below the bid price. Returns the new bid sizes, the average execution price (nan if
+    nothing was executed) and the executed size.
+    """
+    bid_sizes_new = bid_sizes.copy()
+    remaining = order_ask_size
+    notional = 0.
+    i = 0
+    n = len(bid_sizes)
+    while i < n and remaining > 0 and order_ask_price <= bid_prices[i]:
+        traded = min(bid_sizes_new[i], remaining)
+        bid_sizes_new[i] -= traded
+        remaining -= traded
+        notional += traded * bid_prices[i]
+        i += 1
+    exec_size = order_ask_size - remaining
+    exec_price = notional / exec_size if exec_size > 0 else np.nan
+    return (bid_sizes_new, exec_price, exec_size)
+
+
+# this part updates the ask side of the order book using a bid price and size.
+def get_exec_buy_trd(ask_prices, ask_sizes, order_bid_price, order_bid_size):
+    """Same as get_exec_sell_trd for a buy order against the asks."""
+    ask_sizes_new = ask_sizes.copy()
+    remaining = order_bid_size
+    notional = 0.
+    i = 0
+    n = len(ask_sizes)
+    while i < n and remaining > 0 and order_bid_price >= ask_prices[i]:
+        traded = min(ask_sizes_new[i], remaining)
+        ask_sizes_new[i] -= traded
+        remaining -= traded
+        notional += traded * ask_prices[i]
+        i += 1
+    exec_size = order_bid_size - remaining
+    exec_price = notional / exec_size if exec_size > 0 else np.nan
+    return (ask_sizes_new, exec_price, exec_size)
+
+
+def get_insert_sell(ask_prices, ask_sizes, order_ask_price, order_ask_size):
+    """
+    Adds a (resting) sell order to the asks. A negative size cancels that many shares at the price.
+    An order better than the best ask moves the grid down, dropping the worst levels; an order
+    beyond the last level is outside of the book and is ignored.
+    """
+    n = len(ask_sizes)
+    ask_prices_new = ask_prices.copy()
+    ask_sizes_new = ask_sizes.copy()
+    ind = int(order_ask_price - ask_prices[0])
+    if 0 <= ind < n:
+        ask_sizes_new[ind] = max(ask_sizes_new[ind] + order_ask_size, 0.)
+    elif ind < 0 and order_ask_size > 0:
+        shift = min(-ind, n)
+        for i in range(n):
+            ask_prices_new[i] = order_ask_price + i
+        ask_sizes_new[shift:] = ask_sizes[:n - shift]
+        ask_sizes_new[:shift] = 0.
+        ask_sizes_new[0] = order_ask_size
+    return (ask_prices_new, ask_sizes_new)
+
+
+def get_insert_buy(bid_prices, bid_sizes, order_bid_price, order_bid_size):
+    """Same as get_insert_sell for a buy order on the bids."""
+    n = len(bid_sizes)
+    bid_prices_new = bid_prices.copy()
+    bid_sizes_new = bid_sizes.copy()
+    ind = int(bid_prices[0] - order_bid_price)
+    if 0 <= ind < n:
+        bid_sizes_new[ind] = max(bid_sizes_new[ind] + order_bid_size, 0.)
+    elif ind < 0 and order_bid_size > 0:
+        shift = min(-ind, n)
+        for i in range(n):
+            bid_prices_new[i] = order_bid_price - i
+        bid_sizes_new[shift:] = bid_sizes[:n - shift]
+        bid_sizes_new[:shift] = 0.
+        bid_sizes_new[0] = order_bid_size
+    return (bid_prices_new, bid_sizes_new)
+
+
+def get_shift_sell(ask_prices, ask_sizes):
+    """Moves the ask grid so that it starts at the best non empty level (if there is one)."""
+    n = len(ask_sizes)
+    k = 0
+    while k < n and ask_sizes[k] == 0:
+        k += 1
+    if k == 0 or k == n:
+        return (ask_prices.copy(), ask_sizes.copy())
+    ask_sizes_new = np.zeros(n)
+    ask_sizes_new[:n - k] = ask_sizes[k:]
+    return (ask_prices + k, ask_sizes_new)
+
+
+def get_shift_buy(bid_prices, bid_sizes):
+    """Same as get_shift_sell for the bids."""
+    n = len(bid_sizes)
+    k = 0
+    while k < n and bid_sizes[k] == 0:
+        k += 1
+    if k == 0 or k == n:
+        return (bid_prices.copy(), bid_sizes.copy())
+    bid_sizes_new = np.zeros(n)
+    bid_sizes_new[:n - k] = bid_sizes[k:]
+    return (bid_prices - k, bid_sizes_new)
+
+
+PY_KERNELS = {
+    kernel.__name__: kernel
+    for kernel in (get_noise_condition_price, get_exec_sell_trd, get_exec_buy_trd, get_insert_sell,
+                   get_insert_buy, get_shift_sell, get_shift_buy)
+}
+
+if numba is not None:
+    get_noise_condition_price = numba.njit(cache=True)(get_noise_condition_price)
+    get_exec_sell_trd = numba.njit(cache=True)(get_exec_sell_trd)
+    get_exec_buy_trd = numba.njit(cache=True)(get_exec_buy_trd)
+    get_insert_sell = numba.njit(cache=True)(get_insert_sell)
+    get_insert_buy = numba.njit(cache=True)(get_insert_buy)
+    get_shift_sell = numba.njit(cache=True)(get_shift_sell)
+    get_shift_buy = numba.njit(cache=True)(get_shift_buy)
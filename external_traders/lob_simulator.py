@@ -0,0 +1,184 @@
+"""
+Array based limit order book simulator, for calibration studies that need millions of events.
+
+It is what the driver loop at the bottom of noise_trader.py sketches, without the platform: no
+broker, no database, no order ids. The book is fixed-width (settings['levels_n'] price levels per
+side, see lob_kernels.py) and the traders are rules:
+
+- the noise traders, as in get_signal_noise and get_noise_rule: every step one of them may post a
+  passive order on the first level that isn't full, an aggressive one improving their side by a
+  tick, and cancel one share at a random level of one side;
+- the informed trader, as in informed_naive: at the times of its time plan it trades one share at
+  the best opposite price until its inventory is done.
+
+run_simulation returns the book after every event and the events themselves, in the cols_book and
+cols_message layouts of noise_trader.py (LOBSTER event types, direction 1 for buy, -1 for sell).
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from external_traders.lob_kernels import (get_exec_buy_trd, get_exec_sell_trd,
+                                          get_insert_buy, get_insert_sell,
+                                          get_noise_condition_price,
+                                          get_shift_buy, get_shift_sell)
+from external_traders.noise_trader import cols_message, cols_raw, get_ind_from_data
+from structures import LobsterEventType
+
+NOISE_ID = -1
+INFORMED_ID = 1
+N_NOISE_DRAWS = 7  # same draws as get_signal_noise
+MAX_EVENTS_PER_STEP = 3  # a noise order, a noise cancel and an informed order
+
+
+def get_lob_settings(levels_n: int = 10) -> Dict:
+    """The column layout of the book and the messages for a book with levels_n levels per side."""
+    cols_book = [name + '_' + str(level) for level in range(1, 1 + levels_n) for name in cols_raw]
+    settings = {'levels_n': levels_n, 'cols_book': cols_book, 'cols_message': cols_message}
+    for name in ['bid_price', 'bid_size', 'ask_price', 'ask_size']:
+        settings['ind_' + name] = get_ind_from_data(cols_book, name2search=name)
+    for name in cols_message:
+        settings['ind_' + name] = get_ind_from_data(cols_message, name2search=name)
+    return settings
+
+
+def get_informed_schedule(n_steps: int, informed_time_plan: Optional[Dict]) -> np.ndarray:
+    """Marks the steps at which the informed trader acts (the times of get_signal_informed)."""
+    act = np.zeros(n_steps, dtype=bool)
+    if informed_time_plan is not None:
+        times = informed_time_plan['period'].astype(int)
+        act[times[(times >= 0) & (times < n_steps)]] = True
+    return act
+
+
+class LOBState:
+    """The two sides of the book and the record of the events of a simulation."""
+
+    def __init__(self, best_bid: float, size: float, settings: Dict, capacity: int):
+        levels_n = settings['levels_n']
+        self.settings = settings
+        self.bid_prices = best_bid - np.arange(levels_n, dtype=np.float64)
+        self.ask_prices = best_bid + 1 + np.arange(levels_n, dtype=np.float64)
+        self.bid_sizes = np.full(levels_n, float(size))
+        self.ask_sizes = np.full(levels_n, float(size))
+
+        self.books = np.zeros((capacity, 4 * levels_n))
+        self.messages = np.zeros((capacity, len(settings['cols_message'])))
+        self.n_events = 0
+
+    def record(self, time: float, event_type: LobsterEventType, trader_id: int, size: float, price: float,
+               direction: int) -> None:
+        i = self.n_events
+        self.messages[i] = (time, event_type, trader_id, size, price, direction)
+        book = self.books[i]
+        book[self.settings['ind_bid_price']] = self.bid_prices
+        book[self.settings['ind_bid_size']] = self.bid_sizes
+        book[self.settings['ind_ask_price']] = self.ask_prices
+        book[self.settings['ind_ask_size']] = self.ask_sizes
+        self.n_events += 1
+
+    def submit(self, time: float, trader_id: int, price: float, size: float, is_bid: bool) -> None:
+        """A limit order: executes against the other side as far as it crosses, the rest rests."""
+        if is_bid:
+            self.ask_sizes, exec_price, exec_size = get_exec_buy_trd(self.ask_prices, self.ask_sizes, price, size)
+            if exec_size > 0:
+                self.ask_prices, self.ask_sizes = get_shift_sell(self.ask_prices, self.ask_sizes)
+            if size - exec_size > 0:
+                self.bid_prices, self.bid_sizes = get_insert_buy(self.bid_prices, self.bid_sizes, price,
+                                                                 size - exec_size)
+        else:
+            self.bid_sizes, exec_price, exec_size = get_exec_sell_trd(self.bid_prices, self.bid_sizes, price, size)
+            if exec_size > 0:
+                self.bid_prices, self.bid_sizes = get_shift_buy(self.bid_prices, self.bid_sizes)
+            if size - exec_size > 0:
+                self.ask_prices, self.ask_sizes = get_insert_sell(self.ask_prices, self.ask_sizes, price,
+                                                                  size - exec_size)
+        self.anchor()
+        direction = 1 if is_bid else -1
+        if exec_size > 0:
+            self.record(time, LobsterEventType.EXECUTION_VISIBLE, trader_id, exec_size, exec_price, direction)
+        if size - exec_size > 0:
+            self.record(time, LobsterEventType.NEW_LIMIT_ORDER, trader_id, size - exec_size, price, direction)
+
+    def cancel(self, time: float, trader_id: int, depth: float, is_bid: bool) -> None:
+        """Cancels one share at the level picked by depth (in [0, 1)) among the non empty ones."""
+        sizes = self.bid_sizes if is_bid else self.ask_sizes
+        levels = np.flatnonzero(sizes)
+        if len(levels) == 0:
+            return
+        level = levels[int(np.floor(depth * len(levels)))]
+        if is_bid:
+            price = self.bid_prices[level]
+            self.bid_prices, self.bid_sizes = get_insert_buy(self.bid_prices, self.bid_sizes, price, -1.)
+            self.bid_prices, self.bid_sizes = get_shift_buy(self.bid_prices, self.bid_sizes)
+        else:
+            price = self.ask_prices[level]
+            self.ask_prices, self.ask_sizes = get_insert_sell(self.ask_prices, self.ask_sizes, price, -1.)
+            self.ask_prices, self.ask_sizes = get_shift_sell(self.ask_prices, self.ask_sizes)
+        self.anchor()
+        self.record(time, LobsterEventType.CANCELLATION_TOTAL, trader_id, 1., price, 1 if is_bid else -1)
+
+    def anchor(self) -> None:
+        """An empty side keeps its grid right next to the best price of the other side."""
+        if not self.bid_sizes.any():
+            self.bid_prices = self.ask_prices[0] - 1 - np.arange(len(self.bid_prices), dtype=np.float64)
+        if not self.ask_sizes.any():
+            self.ask_prices = self.bid_prices[0] + 1 + np.arange(len(self.ask_prices), dtype=np.float64)
+
+
+def run_noise_rule(state: LOBState, time: float, draws: np.ndarray, settings_noise: Dict) -> None:
+    """get_noise_rule on the arrays: the outstanding orders of the noise traders are the book."""
+    if not draws[0] <= settings_noise['pr_order']:
+        return
+    event_passive = draws[1] <= settings_noise['pr_passive']
+    event_bid = draws[2] <= settings_noise['pr_bid']
+    event_cancel = draws[3] <= settings_noise['pr_cancel']
+    event_bid_cancel = draws[4] <= settings_noise['pr_bid']
+
+    if event_passive:
+        if event_bid:
+            price = get_noise_condition_price(state.bid_prices, state.bid_sizes, settings_noise['max_size_level'])
+        else:
+            price = get_noise_condition_price(state.ask_prices, state.ask_sizes, settings_noise['max_size_level'])
+        if price >= 0:
+            state.submit(time, NOISE_ID, price, 1., event_bid)
+    else:
+        # price improve: if spread is small, then it aggresses
+        price = state.bid_prices[0] + 1 if event_bid else state.ask_prices[0] - 1
+        state.submit(time, NOISE_ID, price, 1., event_bid)
+
+    if event_cancel:
+        state.cancel(time, NOISE_ID, draws[6], event_bid_cancel)
+
+
+def run_simulation(
+    n_steps: int,
+    settings: Dict,
+    settings_noise: Dict,
+    informed_time_plan: Optional[Dict] = None,
+    informed_state: Optional[Dict] = None,
+    best_bid: float = 2000,
+    size: float = 1,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Runs n_steps steps (one noise trader event each, plus the informed trader when its time plan
+    says so) and returns (books, messages): one row per event, in the layout of settings.
+    informed_state['inv'] is consumed as in informed_naive: negative to buy, positive to sell.
+    """
+    rng = np.random.default_rng(seed)
+    draws = rng.random((n_steps, N_NOISE_DRAWS))  # all the randomness of the noise traders at once
+    informed_act = get_informed_schedule(n_steps, informed_time_plan)
+    state = LOBState(best_bid, size, settings, capacity=MAX_EVENTS_PER_STEP * n_steps)
+
+    for t in range(n_steps):
+        run_noise_rule(state, t, draws[t], settings_noise)
+
+        if informed_act[t] and informed_state is not None and informed_state['inv'] != 0:
+            selling = informed_state['inv'] > 0
+            price = state.bid_prices[0] if selling else state.ask_prices[0]
+            state.submit(t, INFORMED_ID, price, 1., not selling)
+            informed_state['inv'] += -1 if selling else 1
+
+    return state.books[:state.n_events], state.messages[:state.n_events]
@@ -7,8 +7,9 @@ Created on Wed Aug  2 10:14:44 2023
 """
 
 import numpy as np
-# import numba
 import datetime
+from external_traders.lob_kernels import get_exec_sell_trd, get_insert_sell, get_noise_condition_price
+from external_traders.ring_stack import RingStack
 from main_platform.custom_logger import setup_custom_logger
 
 
@@ -111,8 +112,8 @@ message_stack = {"a 2d array of shape (settings['stack_max_size'],len(cols_messa
 cols_features_state = {'they will vary: they are intermediate inputs not used by the interface'}
 
 # features_state = {"a 1d array of shape (len(cols_features_state),) and type floats"}
-n_features = 22  # This should be set to the actual number of features
-n_alphas = 3  # This should be set to the actual number of alphas
+n_features = 2 * settings['levels_n'] + 2  # order flow and mid change, with their absolute values
+n_alphas = len(settings['alphas_ewma'])
 
 features_state = np.zeros(n_alphas * n_features)
 # signals state
@@ -183,44 +184,35 @@ settings.update({'ind_bid_price': ind_bid_price, 'ind_bid_size': ind_bid_size,
 
 def get_state_count_update(state_count, book_stack, message_stack, settings):
     if state_count[0] > 0:
-        time = message_stack[settings['ind_time']]
-        state_count[1] = time[state_count[1]] - time[0]
+        time = message_stack.last()[:, settings['ind_time'][0]]
+        state_count[1] = time[-1] - time[0]
     state_count[0] += 1
     return state_count
 
 
 def get_stack_update_1(book, message, book_stack, message_stack, state_count, settings):
+    # resetting stack: the stacks are RingStacks, they start again empty after a reset
     time_thresh = settings['time_thresh']
     stack_max_size = settings['stack_max_size']
     count = state_count[0]
     time_delta = state_count[1]
-    cond_reset = (time_delta >= time_thresh) or (count > stack_max_size)
+    cond_reset = (time_delta >= time_thresh) or (count >= stack_max_size)
     if cond_reset:
-        count = 0
-        time_delta = 0
-        state_count = [0, 0]
-    book_stack[count] = book
-    message_stack[count] = message
+        book_stack.clear()
+        message_stack.clear()
+        state_count[:] = 0
+    book_stack.push(book)
+    message_stack.push(message)
     state_count = get_state_count_update(state_count, book_stack, message_stack, settings)
     return (book_stack, message_stack, state_count)
 
 
 def get_stack_update(book, message, book_stack, message_stack, state_count, settings):
-    # rolling stack
-    time_thresh = settings['time_thresh']
-    stack_max_size = settings['stack_max_size']
-    count = state_count[0]
-    time_delta = state_count[1]
-    cond_increse = (count < stack_max_size)
-    if cond_increse:
-        book_stack[count] = book
-        count += 1
-        state_count = [count, 0]
-    else:  # drop the first in stack and add new to the last
-        book_stack[:count - 1] = book_stack[1:]
-        book_stack[-1] = book
-        message_stack[:count - 1] = message_stack[1:]
-        message_stack[-1] = message
+    # rolling stack: the stacks are RingStacks, once full the push drops the first in stack
+    book_stack.push(book)
+    message_stack.push(message)
+    state_count[0] = len(book_stack)
+    state_count[1] = 0
     return (book_stack, message_stack, state_count)
 
 
@@ -248,17 +240,30 @@ def get_should_update(state_count, settings):
 # only called if output of get_should_update is true
 
 
-def transform_book(book_stack, settings):
+def get_slice_from_ind(ind):
+    # the columns of a book are interleaved by level: a slice gives a view instead of a copy
+    step = ind[1] - ind[0] if len(ind) > 1 else 1
+    if step > 0 and list(ind) == list(range(ind[0], ind[-1] + 1, step)):
+        return slice(ind[0], ind[-1] + 1, step)
+    return ind
+
+
+def transform_book(book_stack, settings, out=None):
+    # order flow between consecutive books of the stack (the first row is 0)
+    book_stack = np.asarray(book_stack)
     levels_n = settings['levels_n']
-    book_of_stack = np.zeros((len(book_stack), levels_n))
+    if out is None:
+        out = np.zeros((len(book_stack), levels_n))
+    else:
+        out[0] = 0
 
-    bid_p = book_stack[:, settings['ind_bid_price']]
-    ask_p = book_stack[:, settings['ind_ask_price']]
-    bid_s = book_stack[:, settings['ind_bid_size']]
-    ask_s = book_stack[:, settings['ind_bid_size']]
+    bid_p = book_stack[:, get_slice_from_ind(settings['ind_bid_price'])]
+    ask_p = book_stack[:, get_slice_from_ind(settings['ind_ask_price'])]
+    bid_s = book_stack[:, get_slice_from_ind(settings['ind_bid_size'])]
+    ask_s = book_stack[:, get_slice_from_ind(settings['ind_ask_size'])]
 
     dbid_p = bid_p[1:] - bid_p[:-1]
-    dask_p = bid_p[1:] - bid_p[:-1]
+    dask_p = ask_p[1:] - ask_p[:-1]
 
     cond_bid_1 = dbid_p >= 0
     cond_bid_2 = dbid_p <= 0
@@ -273,8 +278,8 @@ def transform_book(book_stack, settings):
     # cols_a_of    = ['ask_of_'+str(x) for x in range(1,1+levels_n)]
     # cols_of      = cols_b_of+cols_a_of
 
-    book_of_stack[1:] = bid_of + ask_of  # np.c_[bid_of,ask_of]
-    return book_of_stack
+    np.add(bid_of, ask_of, out=out[1:])  # np.c_[bid_of,ask_of]
+    return out
 
 
 def get_features_stack_update(features_stack, book, message, book_of, settings):
@@ -282,81 +287,57 @@ def get_features_stack_update(features_stack, book, message, book_of, settings):
     return features_stack
 
 
-def get_features_update(features_state, book_stack, message_stack, settings, cols_ft=None):
-    features_state = list(features_state)
-    alphas = settings['alphas_ewma']
-    n_alphas = len(alphas)
-    n_features = 22  # This should be set to the actual number of features
-    n_alphas = 3  # This should be set to the actual number of alphas
-
-    features_state = np.zeros(n_alphas * n_features)
+def get_cols_features(settings):
     levels_n = settings['levels_n']
-    ind_bid_price1 = settings['ind_bid_price'][0]
-    ind_bid_price1 = settings['ind_bid_price'][0]
-    ind_ask_price1 = settings['ind_ask_price'][0]
+    cols_of = ['of_' + str(level) for level in range(1, 1 + levels_n)]
+    cols_dmid = ['dmid']
+    cols_of_abs = [col_of + '_abs' for col_of in cols_of]
+    cols_dmid_abs = ['dmid_abs']
+    return cols_of + cols_dmid + cols_of_abs + cols_dmid_abs
+
 
-    bid_p1 = book_stack[-1, ind_bid_price1]
-    ask_p1 = book_stack[-1, ind_ask_price1]
-    bid_p1l = book_stack[-2, ind_bid_price1]
-    ask_p1l = book_stack[-2, ind_ask_price1]
+def get_cols_features_state(settings):
+    # one block of features per alpha, in the order of settings['alphas_ewma']
+    return [col_features + '_' + str(int(100 * alpha)) for alpha in settings['alphas_ewma']
+            for col_features in get_cols_features(settings)]
 
-    mid = 0.5 * (bid_p1 + ask_p1)
-    midl = 0.5 * (bid_p1l + ask_p1l)
 
-    of = transform_book(book_stack, settings)[-1]  # if stack longer than 2, only use the latest
-    of_abs = np.abs(of)
-    dmid = 2 * (mid - midl) / (mid + midl)
-    dmid_abs = np.abs(dmid)
+def get_features_new(book_stack, settings):
+    # the features of every book of the stack but the first, one row per book (cols_features)
+    book_stack = np.asarray(book_stack)
+    ind_bid_price1 = settings['ind_bid_price'][0]
+    ind_ask_price1 = settings['ind_ask_price'][0]
+
+    mid = 0.5 * (book_stack[:, ind_bid_price1] + book_stack[:, ind_ask_price1])
+    dmid = 2 * (mid[1:] - mid[:-1]) / (mid[1:] + mid[:-1])
+    of = transform_book(book_stack, settings)[1:]
 
     # signed_trd  =
     # trd         = np.abs(signed_trd)
 
     # features_new = np.r_[book_of,book_of_abs,dmid ,dmid_abs,signed_trd,trd ]
 
-    features_new = np.r_[of, dmid, of_abs, dmid_abs]
-    cols_features = None
-    if cols_features is None:
-        cols_of = ['of_' + str(level) for level in range(1, 1 + levels_n)]
-        cols_dmid = ['dmid']
-        cols_of_abs = [col_of + '_abs' for col_of in cols_of]
-        cols_dmid_abs = ['dmid_abs']
-        cols_features = cols_of + cols_dmid + cols_of_abs + cols_dmid_abs
+    return np.c_[of, dmid, np.abs(of), np.abs(dmid)]
+
 
-    n_features = len(features_new)
+def get_features_update(features_state, book_stack, message_stack, settings, cols_ft=None):
+    # features_state holds the ewma of the features for every alpha: see get_cols_features_state
+    alphas = np.asarray(settings['alphas_ewma'], dtype=np.float64)
+    features_new = get_features_new(np.asarray(book_stack)[-2:], settings)[-1]  # only use the latest
 
     if features_state is None:  # no features have been computed so far
-        features_state = np.zeros((n_alphas * len(features_new),))
+        features_state = np.zeros(len(alphas) * len(features_new))
         if cols_ft is not None:  # perform a check - only at the very beginning that we are computing the correct features
-            cols_of = ['of_' + str(level) for level in range(1, 1 + levels_n)]
-            cols_dmid = ['dmid']
-            cols_of_abs = [col_of + '_abs' for col_of in cols_of]
-            cols_dmid_abs = ['dmid_abs']
-            cols_features = cols_of + cols_dmid + cols_of_abs + cols_dmid_abs
-            col_features = [col_features + '_' + str(int(100 * alpha)) for alpha in alphas for col_features in
-                            cols_features]
-            if cols_ft != cols_features: raise Exception('features are not as expected: check settings')
-
-    for i in range(n_alphas):
-        alpha = alphas[i]
-
-        ewma_block_i = features_state[(i * n_features):((i + 1) * n_features)]
-        ewma_block_i = np.array(ewma_block_i)
-        features_new = np.array(features_new)
+            if list(cols_ft) != get_cols_features_state(settings):
+                raise Exception('features are not as expected: check settings')
 
-        ewma_block_i = alpha * ewma_block_i + (1 - alpha) * features_new
-
-        features_state[(i * n_features):((i + 1) * n_features)] = ewma_block_i
-
-    # update features names with ewma
-
-    return features_state
+    ewma_state = np.asarray(features_state, dtype=np.float64).reshape(len(alphas), len(features_new))
+    return ewma_update(ewma_state, features_new, alphas[:, None]).ravel()
 
 
 def ewma_update(ewma_val, x, alpha):
-    ew
-    for alpha in alphas:
-        ewma_val = alpha * ewma_val + (1 - alpha) * x
-    return ewma_val
+    # alpha can be an array (one alpha per row of ewma_val): all the horizons are updated at once
+    return alpha * ewma_val + (1 - alpha) * x
 
 
 def get_model_prediction(features, model, settings):
@@ -365,16 +346,26 @@ def get_model_prediction(features, model, settings):
     return np.random.uniform(0, 1)
 
 
+def get_model_predictions(features, model, settings):
+    """
+    The predictions of a model for a stack of features (one row per agent): a single call of the
+    fitted model (an sklearn like object with predict), or the placeholder when there is none.
+    """
+    features_ind = model['feature_ind']
+    if features_ind is not None:
+        features = features[:, features_ind]
+    model_fitted = model['model']
+    if model_fitted is None:
+        return np.random.uniform(0, 1, len(features))
+    return np.asarray(model_fitted.predict(features), dtype=np.float64).reshape(len(features))
+
+
 def get_signal_update(features_state, models, settings):
-    # example
-    model_names = list(models.keys())
-    signals_state = np.zeros((len(model_names),))
-    for i, model_name in enumerate(model_names):
-        model = models[model_name]
-        features_ind = model['feature_ind']
-        features = features_state[features_ind]
-        model_fitted = model['model']
-        signals_state[i] = get_model_prediction(features, model, settings)
+    # example: for the features of several agents at once, see SignalService in signal_service.py
+    features = np.atleast_2d(features_state)
+    signals_state = np.zeros((len(models),))
+    for i, model in enumerate(models.values()):
+        signals_state[i] = get_model_predictions(features, model, settings)[0]
     return signals_state
 
 
@@ -620,78 +611,7 @@ def get_noise_order(book, signal_noise, noise_state,
 # auxiliary: they can change and will be placed inside the other functions
 
 
-# finds the first price at which there is a size less than max_size_level, else gives -1
-# @numba.jit('float64(float64[:],float64[:], float64)', nopython=True)
-
-def get_noise_condition_price(prices, sizes, max_size_level):
-
-    # Zip the prices and sizes, then find the first pair where size is either zero or less than max_size_level
-    for p, s in zip(prices, sizes):
-        if s < max_size_level:
-            return p  # return the price of the first such pair
-
-    return -1  # if no such pair exists, return -1
-
-
-
-
-# execution code
-# this part updates the bid side of the order book using an ask price and size.
-# @numba.jit(numba.types.Tuple((numba.float64[:], numba.float64, numba.float64))(numba.float64[:], numba.float64[:],
-#                                                                                numba.float64, numba.float64),
-#            nopython=True)
-def get_exec_sell_trd(bid_prices, bid_sizes,
-                      order_ask_price, order_ask_size):
-    bid_sizes_new = bid_sizes
-    i = 0
-    n = len(bid_sizes)
-    cond = order_ask_price <= bid_prices[i]
-    if cond:
-        exec_size = 0
-        exec_price = 0
-        order_ask_size_tot = order_ask_size
-        order_ask_size_new = order_ask_size
-
-        while cond:
-            order_ask_size = order_ask_size_new  # size to execute at level i
-            bid_size_i = bid_sizes[i] - order_ask_size  # size left on book at level i
-            bid_sizes_new[i] = np.maximum(bid_size_i, 0)  # new size in book at level i
-            order_ask_size_new = np.maximum(-bid_size_i, 0)  # residual size to execute at next level
-
-            exec_price = exec_price \
-                         + bid_prices[i] \
-                         * (order_ask_size - order_ask_size_new)  # weighted sum pe exec price
-
-            i += 1
-            cond = (order_ask_price <= bid_prices[i]) & \
-                   (order_ask_size_new > 0) & (i < n)
-            # print(order_ask_size_new)
-        exec_size = (order_ask_size_tot - order_ask_size_new)
-        exec_price = exec_price / exec_size
-    else:
-        exec_size = np.nan
-        exec_price = np.nan
-
-    return (bid_sizes_new, exec_price, exec_size)
-
-
-def get_insert_sell(ask_prices, ask_sizes,
-                    order_ask_price, order_ask_size):
-    ask_sizes_new = ask_sizes
-    ask_prices_new = ask_prices
-    n = len(ask_sizes)
-    cond = order_ask_price in ask_prices
-    if cond:
-        ind_insertion = list(ask_prices).index(order_ask_price)
-        ask_sizes_new[ind_insertion] += order_ask_size
-    elif (order_ask_price < ask_prices[0]):  # need to modify the price with new insertion if price improves
-        ask_prices_new = np.empty((n,))
-        ask_sizes_new = np.empty((n,))
-        ask_prices_new[0] = order_ask_price
-        ask_prices_new[1:] = ask_prices[:-1]
-        ask_sizes_new[0] = order_ask_size
-        ask_sizes_new[1:] = ask_sizes[:-1]
-    return (ask_prices_new, ask_sizes_new)
+# get_noise_condition_price and the execution/insertion code of the book are in lob_kernels.py
 
 
 # running example
@@ -725,62 +645,64 @@ def get_book_message_init(best_bid, size, settings):
     return (book, message)
 
 
-cond = True
-iter_num = 0
-max_iter = 1000
+# the driver below is completed in lob_simulator.py: run_simulation
+if __name__ == "__main__":
+    cond = True
+    iter_num = 0
+    max_iter = 1000
 
-# initialise the book
-best_bid = 2009
-size = 1
-book, message = get_book_message_init(best_bid, size, settings)
+    # initialise the book
+    best_bid = 2009
+    size = 1
+    book, message = get_book_message_init(best_bid, size, settings)
 
-bid_p = book[settings['ind_bid_price']]
-ask_p = book[settings['ind_ask_price']]
-bid_s = book[settings['ind_bid_size']]
-ask_s = book[settings['ind_ask_size']]
+    bid_p = book[settings['ind_bid_price']]
+    ask_p = book[settings['ind_ask_price']]
+    bid_s = book[settings['ind_bid_size']]
+    ask_s = book[settings['ind_ask_size']]
 
-# id -1 as the book is initialised by noise traders
-bid_queue_dict = {bid_p[i]: [[bid_s[i]], [-1]] for i in range(len(bid_p))}
-ask_queue_dict = {ask_p[i]: [[ask_s[i]], [-1]] for i in range(len(ask_p))}
+    # id -1 as the book is initialised by noise traders
+    bid_queue_dict = {bid_p[i]: [[bid_s[i]], [-1]] for i in range(len(bid_p))}
+    ask_queue_dict = {ask_p[i]: [[ask_s[i]], [-1]] for i in range(len(ask_p))}
 
-# initialise the noise_state
-outstanding_bid_noise = {bid_p[i]: [bid_s[i]] for i in range(len(bid_p))}
-outstanding_ask_noise = {ask_p[i]: [ask_s[i]] for i in range(len(ask_p))}
-noise_state = {'outstanding_orders': {'bid': outstanding_bid_noise, 'ask': outstanding_ask_noise}}
+    # initialise the noise_state
+    outstanding_bid_noise = {bid_p[i]: [bid_s[i]] for i in range(len(bid_p))}
+    outstanding_ask_noise = {ask_p[i]: [ask_s[i]] for i in range(len(ask_p))}
+    noise_state = {'outstanding_orders': {'bid': outstanding_bid_noise, 'ask': outstanding_ask_noise}}
 
-book_stack = np.zeros((settings['stack_max_size'], len(cols_book)))
-message_stack = np.zeros((settings['stack_max_size'], len(cols_message)))
+    book_stack = RingStack(settings['stack_max_size'], len(cols_book))
+    message_stack = RingStack(settings['stack_max_size'], len(cols_message))
 
-state_count = np.array([0, 0])
+    state_count = np.array([0, 0])
 
-tic = datetime.datetime.now()
+    tic = datetime.datetime.now()
 
-while cond:
-    book_stack, message_stack, state_count = get_stack_update(book, message,
-                                                              book_stack, message_stack,
-                                                              state_count, settings)
+    while cond:
+        book_stack, message_stack, state_count = get_stack_update(book, message,
+                                                                  book_stack, message_stack,
+                                                                  state_count, settings)
 
-    cond_update_auxiliary_objects = get_should_update(state_count, settings)
-    # if true run all the following processes
-    if cond_update_auxiliary_objects:  # update features and signal
-        features_state = get_features_update(features_state, book_stack, message_stack, settings)
-        signals_state = get_signal_update(features_state, models, settings)
+        cond_update_auxiliary_objects = get_should_update(state_count, settings)
+        # if true run all the following processes
+        if cond_update_auxiliary_objects:  # update features and signal
+            features_state = get_features_update(features_state, book_stack, message_stack, settings)
+            signals_state = get_signal_update(features_state, models, settings)
 
-    # call each subscribed trader`
+        # call each subscribed trader`
 
-    signal_noise = get_signal_noise(signals_state, settings_noise)
-    order_noise = get_noise_order(book, signal_noise, noise_state,
-                                  settings_noise, settings)
+        signal_noise = get_signal_noise(signals_state, settings_noise)
+        order_noise = get_noise_order(book, signal_noise, noise_state,
+                                      settings_noise, settings)
 
-    # put together all the orders: only one as we only have one trader
+        # put together all the orders: only one as we only have one trader
 
-    orders = [order_noise, -1]  # only one order with id -1, the one of noise trader
+        orders = [order_noise, -1]  # only one order with id -1, the one of noise trader
 
-    # do the matching here, modify
-    # 1. book, message
-    # it may leads to multiple updates, but only report the last one,
-    # but in message to report the type as trade if there was one and include price and size
-    # 2.bid_queue_dict, ask_queue_dict
-    # 3. the state of all the traders, including the outstanding orders
-    iter_num += 1
-    cond = iter_num < max_iter
\ No newline at end of file
+        # do the matching here, modify
+        # 1. book, message
+        # it may leads to multiple updates, but only report the last one,
+        # but in message to report the type as trade if there was one and include price and size
+        # 2.bid_queue_dict, ask_queue_dict
+        # 3. the state of all the traders, including the outstanding orders
+        iter_num += 1
+        cond = iter_num < max_iter
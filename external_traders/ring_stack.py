@@ -0,0 +1,60 @@
+"""
+Fixed-size stack of the latest snapshots (books or messages) of the feature pipeline.
+
+The rows live in a preallocated buffer of twice the stack size and every row is written twice, at
+its slot and at its slot + size. The last k rows are then always contiguous in the buffer, so
+reading them is a view: a push costs two row copies whatever the size of the stack, and nothing
+is allocated after construction.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class RingStack:
+    def __init__(self, size: int, width: int, dtype=np.float64):
+        if size < 1:
+            raise ValueError("The stack size must be at least 1")
+        self.size = size
+        self._buffer = np.zeros((2 * size, width), dtype=dtype)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        rows = self.last()
+        return rows if dtype is None else rows.astype(dtype, copy=False)
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.size
+
+    def push(self, row) -> None:
+        """Adds a row on top of the stack, dropping the oldest one when the stack is full."""
+        if self._count < self.size:
+            slot = (self._start + self._count) % self.size
+            self._count += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.size
+        self._buffer[slot] = row
+        self._buffer[slot + self.size] = row
+
+    def last(self, k: Optional[int] = None) -> np.ndarray:
+        """
+        The last k rows (all of them by default), oldest first. This is a view of the buffer: it
+        is only valid until the next push.
+        """
+        k = self._count if k is None else min(k, self._count)
+        end = self._start + self._count
+        return self._buffer[end - k:end]
+
+    def latest(self) -> np.ndarray:
+        return self._buffer[self._start + self._count - 1]
+
+    def clear(self) -> None:
+        self._start = 0
+        self._count = 0
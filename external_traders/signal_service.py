@@ -0,0 +1,80 @@
+"""
+Evaluates the signal models once per book update for all the agents.
+
+The models are registered once (as in the models dict of noise_trader.py: a fitted model and the
+feature_ind it uses). On every update, the features of the agents are stacked in a matrix (one row
+per agent, or a single row when they share the same features) and each model runs once on the
+whole matrix. The signals are then handed to the callbacks subscribed to each model, each
+agent getting the signal of its own row.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from external_traders.noise_trader import get_model_predictions
+from main_platform.custom_logger import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class SignalService:
+    def __init__(self, settings: dict, models: Optional[Dict] = None):
+        self.settings = settings
+        self.models: Dict[str, Dict] = {}
+        self._subscribers: Dict[str, List[Tuple[Callable, Optional[int]]]] = defaultdict(list)
+        for name, model in (models or {}).items():
+            self.register(name, model['model'], model['feature_ind'])
+
+    @property
+    def model_names(self) -> List[str]:
+        return list(self.models)
+
+    def register(self, name: str, model=None, feature_ind=None) -> None:
+        """model is an sklearn like object with predict (None for the placeholder prediction)."""
+        self.models[name] = {'model': model, 'feature_ind': feature_ind}
+
+    def subscribe(self, name: str, callback: Callable, row: Optional[int] = None) -> None:
+        """
+        callback(signal) is called after every update with the signal of the model for the agent
+        whose features are in the given row of the stack: a float. When the update has a single row
+        of features (shared by all the agents) that is the signal; without a row, the callback gets
+        the whole column of signals of a stacked update, one value per row.
+        """
+        if name not in self.models:
+            raise KeyError(f"No model registered as {name}")
+        self._subscribers[name].append((callback, row))
+
+    def unsubscribe(self, name: str, callback: Callable) -> None:
+        self._subscribers[name] = [
+            (subscriber, row) for subscriber, row in self._subscribers.get(name, []) if subscriber != callback
+        ]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        The signals of all the models: (n_models,) for a 1d features_state, (n_rows, n_models)
+        for a stack of them.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        stacked = np.atleast_2d(features)
+        signals = np.empty((len(stacked), len(self.models)))
+        for i, model in enumerate(self.models.values()):
+            signals[:, i] = get_model_predictions(stacked, model, self.settings)
+        return signals[0] if features.ndim == 1 else signals
+
+    def update(self, features: np.ndarray) -> np.ndarray:
+        """Runs all the models on the features of this book update and fans the signals out."""
+        signals = self.predict(features)
+        for i, name in enumerate(self.models):
+            column = signals[..., i]
+            for callback, row in self._subscribers.get(name, []):
+                if column.ndim == 0:
+                    signal = float(column)
+                else:
+                    signal = column if row is None else float(column[row])
+                try:
+                    callback(signal)
+                except Exception as e:
+                    logger.error(f"Subscriber of {name} failed: {e}")
+        return signals
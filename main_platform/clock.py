@@ -0,0 +1,95 @@
+"""
+Clocks the trading session and the traders read the time from.
+
+- WallClock is the real time, what sessions with human traders use.
+- VirtualClock is a discrete-event clock for simulations: the event loop it runs never waits.
+  Whenever every task is asleep, the clock jumps straight to the next timer that is due, so a
+  15 minute session takes as long as the CPU needs to process its messages.
+
+Both sleep with asyncio.sleep: VirtualClock.run runs a VirtualTimeEventLoop, an event loop that
+tells virtual time itself, so timers of asyncio.sleep, asyncio.wait_for etc. are virtual as well.
+It is a selector event loop, whatever the loop policy in use (uvloop etc.). Virtual time only
+makes sense when nothing waits on the network, i.e. with the in-process transport (see
+transport.py).
+"""
+
+import asyncio
+import selectors
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Coroutine, Optional
+
+from main_platform.utils import now
+
+
+class Clock(ABC):
+    @abstractmethod
+    def now(self) -> datetime:
+        """Current time in UTC."""
+
+    @abstractmethod
+    def time(self) -> float:
+        """Monotonic time in seconds, to measure intervals."""
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class WallClock(Clock):
+    def now(self) -> datetime:
+        return now()
+
+    def time(self) -> float:
+        return asyncio.get_event_loop().time()
+
+
+class VirtualClock(Clock):
+    def __init__(self, start: Optional[datetime] = None):
+        self.start = start or now()
+        self._time = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self._time)
+
+    def time(self) -> float:
+        return self._time
+
+    def _advance(self, timeout: Optional[float]) -> Optional[float]:
+        """The event loop is about to wait for timeout seconds: skip them instead."""
+        if timeout is None or timeout <= 0:
+            return timeout
+        self._time += timeout
+        return 0
+
+    def run(self, main: Coroutine) -> Any:
+        """Like asyncio.run, on an event loop that runs on this clock."""
+        loop = VirtualTimeEventLoop(self)
+        try:
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(main)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    """Polls for I/O without waiting: the timeout the loop would wait for is skipped on the clock."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: Optional[float] = None):
+        return super().select(self.clock._advance(timeout))
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """A selector event loop whose time is the time of a VirtualClock."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(_VirtualTimeSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.time()
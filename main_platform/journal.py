@@ -0,0 +1,67 @@
+"""
+Append-only binary journal of a trading session.
+
+Every accepted order, cancel, trader registration and fill is written as one record:
+
+    | payload length: uint32 | event type: uint8 | payload: JSON (utf-8) |
+
+The file is only ever appended to, and it is fsync-ed at most every fsync_interval seconds (and on
+close), so journaling costs a buffered sequential write per event. TradingSession.replay_journal
+rebuilds the book, the archive and the trade tape from such a file, which is what we use for crash
+recovery without Mongo and as a deterministic input for benchmarks.
+"""
+
+import json
+import os
+import struct
+import time
+from typing import BinaryIO, Dict, Iterator, Tuple
+
+from main_platform.custom_logger import setup_custom_logger
+from main_platform.utils import CustomEncoder
+from structures import JournalEventType
+
+logger = setup_custom_logger(__name__)
+
+HEADER = struct.Struct("<IB")
+
+
+class EventJournal:
+    def __init__(self, path: str, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file: BinaryIO = open(path, "ab")
+        self._last_fsync = time.monotonic()
+
+    def record(self, event_type: JournalEventType, payload: Dict) -> None:
+        body = json.dumps(payload, cls=CustomEncoder).encode()
+        self._file.write(HEADER.pack(len(body), event_type))
+        self._file.write(body)
+        if time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+
+def read_journal(path: str) -> Iterator[Tuple[JournalEventType, Dict]]:
+    """Yields the records of a journal in order. A record cut short by a crash ends the journal."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            length, event_type = HEADER.unpack(header)
+            body = f.read(length)
+            if len(body) < length:
+                logger.warning(f"Journal {path} ends with an incomplete record, ignoring it")
+                break
+            yield JournalEventType(event_type), json.loads(body)
@@ -0,0 +1,267 @@
+"""
+Incremental market data feed.
+
+Instead of shipping the whole book, every active order and the whole transaction history with each
+broadcast, the trading session sends numbered updates:
+
+- a delta: the price levels that changed since the previous update (with their new aggregated
+  amount, 0 meaning that the level is gone), the orders added to / removed from the book and the
+  trades that happened in between;
+- a full snapshot every `snapshot_interval` updates, or on request of a trader that detected a gap
+  in the sequence numbers.
+
+Next to them the session publishes a ticker on its own exchange: the few best levels of each side
+with mid and spread, sent only when they change. It is self-contained (no deltas), so algorithmic
+traders that only need the top of the book can read it instead of the full feed.
+
+MarketDataFeed builds these messages on the platform side, MarketDataReplica applies them on the
+trader side and keeps a local copy of the book in the same format as the old broadcasts.
+
+Traders declare the feeds they consume (structures.Feed): a replica only keeps those, and the
+session leaves the trade history out of snapshots when no connected trader reads it.
+"""
+
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from main_platform.order_book import OrderBook
+from main_platform.trade_tape import TradeTape
+from structures import Feed, OrderType
+
+BROADCAST_ORDER_FIELDS = ("id", "trader_id", "order_type", "amount", "price", "timestamp", "client_order_id")
+
+
+def order_to_broadcast(order: Dict) -> Dict:
+    return {field: order.get(field) for field in BROADCAST_ORDER_FIELDS}
+
+
+class MarketDataFeed:
+    def __init__(self, book: OrderBook, tape: TradeTape, snapshot_interval: int = 100):
+        self.book = book
+        self.tape = tape
+        self.snapshot_interval = snapshot_interval
+        self.seq = 0
+        # whether snapshots carry the trade history, see TradingSession.handle_register_me
+        self.snapshot_history = True
+        self._changed_levels = {OrderType.BID: set(), OrderType.ASK: set()}
+        self._added_orders: Dict = {}
+        self._removed_orders: List = []
+        self._tape_position = 0
+        self._last_ticker = None
+
+    @property
+    def has_new_trades(self) -> bool:
+        return len(self.tape) > self._tape_position
+
+    def order_added(self, order: Dict) -> None:
+        self._changed_levels[order["order_type"]].add(order["price"])
+        self._added_orders[order["id"]] = order
+
+    def order_removed(self, order: Dict) -> None:
+        self._changed_levels[order["order_type"]].add(order["price"])
+        # an order that came and went within the same update is not worth reporting
+        if self._added_orders.pop(order["id"], None) is None:
+            self._removed_orders.append(order["id"])
+
+    def next_update(self) -> Dict:
+        """Returns the next numbered update: a snapshot every snapshot_interval updates, a delta otherwise."""
+        self.seq += 1
+        if self.snapshot_interval and self.seq % self.snapshot_interval == 0:
+            update = self.snapshot()
+        else:
+            update = self.delta()
+        self._reset()
+        return update
+
+    def snapshot(self, with_history: Optional[bool] = None, owner_id: Optional[str] = None) -> Dict:
+        """
+        Full state of the book at the current sequence number (doesn't advance the sequence). With an
+        owner_id, only the orders of that trader are listed.
+        """
+        orders = self.book.orders.values()
+        if owner_id is not None:
+            orders = (order for order in orders if order["trader_id"] == owner_id)
+        snapshot = {
+            "seq": self.seq,
+            "snapshot": True,
+            "order_book": self.book.depth(),
+            "active_orders": [order_to_broadcast(order) for order in orders],
+            # the trades it covers: a snapshot served between two updates already has some of the
+            # trades of the next delta
+            "tape_position": len(self.tape),
+        }
+        if self.snapshot_history if with_history is None else with_history:
+            snapshot["history"] = self.tape.to_list()
+        return snapshot
+
+    def delta(self) -> Dict:
+        book_delta = {}
+        for order_type, name in ((OrderType.BID, "bids"), (OrderType.ASK, "asks")):
+            levels = self.book.side(order_type).levels
+            book_delta[name] = [
+                {"x": price, "y": levels[price].volume if price in levels else 0}
+                for price in self._changed_levels[order_type]
+            ]
+        return {
+            "seq": self.seq,
+            "snapshot": False,
+            "book_delta": book_delta,
+            "orders_added": [order_to_broadcast(order) for order in self._added_orders.values()],
+            "orders_removed": list(self._removed_orders),
+            "trades": self.tape.since(self._tape_position),
+            "tape_position": self._tape_position,  # of the first of the trades
+        }
+
+    def ticker(self, levels: int = 1) -> Dict:
+        """
+        Top of the book at the current sequence number: the best `levels` levels of each side as
+        [price, amount] pairs (best first), best prices and sizes, mid, spread and last trade price.
+        """
+        bids = [[level.price, level.volume] for level in islice(self.book.bids.iter_levels(), levels)]
+        asks = [[level.price, level.volume] for level in islice(self.book.asks.iter_levels(), levels)]
+        best_bid, bid_size = bids[0] if bids else (None, None)
+        best_ask, ask_size = asks[0] if asks else (None, None)
+        two_sided = best_bid is not None and best_ask is not None
+        return {
+            "seq": self.seq,
+            "levels": levels,
+            "best_bid": best_bid,
+            "bid_size": bid_size,
+            "best_ask": best_ask,
+            "ask_size": ask_size,
+            "mid": (best_bid + best_ask) / 2 if two_sided else None,
+            "spread": best_ask - best_bid if two_sided else None,
+            "bids": bids,
+            "asks": asks,
+            "last_price": self.tape.last_price,
+        }
+
+    def next_ticker(self, levels: int = 1) -> Optional[Dict]:
+        """The ticker, or None when neither the top levels nor the last trade changed since the previous one."""
+        ticker = self.ticker(levels)
+        key = (ticker["bids"], ticker["asks"], len(self.tape))
+        if key == self._last_ticker:
+            return None
+        self._last_ticker = key
+        return ticker
+
+    def _reset(self) -> None:
+        for prices in self._changed_levels.values():
+            prices.clear()
+        self._added_orders = {}
+        self._removed_orders = []
+        self._tape_position = len(self.tape)
+
+
+class MarketDataReplica:
+    """
+    Trader side copy of the market data. Deltas have to be applied in sequence: when one is missing,
+    apply() returns False once, and the following updates are buffered until a snapshot arrives.
+    Only the feeds given are kept (all of them by default): the other parts of the updates are skipped.
+    """
+
+    def __init__(self, owner_id: Optional[str] = None, feeds: Optional[Iterable[Feed]] = None):
+        self.owner_id = owner_id
+        self.feeds = frozenset(Feed) if feeds is None else frozenset(feeds)
+        self._keeps_book = Feed.BOOK in self.feeds
+        self._keeps_orders = Feed.ORDERS in self.feeds
+        self._keeps_own_orders = Feed.OWN_ORDERS in self.feeds
+        self._keeps_trades = Feed.TRADES in self.feeds
+        self.seq = 0
+        self.awaiting_snapshot = False
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.active_orders: Dict = {}
+        self.own_orders: Dict = {}
+        self.history: List[Dict] = []
+        self.tape_position = 0  # number of trades of the session this replica has seen
+        self.order_book = {"bids": [], "asks": []}
+        self._pending: List[Dict] = []
+
+    def apply(self, message: Dict) -> bool:
+        seq = message["seq"]
+        if message.get("snapshot"):
+            if seq < self.seq:
+                return True  # stale snapshot, we are already past it
+            self._load_snapshot(message)
+            pending = sorted(
+                (m for m in self._pending if m["seq"] > seq), key=lambda m: m["seq"]
+            )
+            self._pending = []
+            self.awaiting_snapshot = False
+            for update in pending:
+                if not self.apply(update):
+                    return False
+            return True
+
+        if self.awaiting_snapshot:
+            self._pending.append(message)
+            return True
+        if seq <= self.seq:
+            return True  # duplicate
+        if seq != self.seq + 1:
+            self.awaiting_snapshot = True
+            self._pending.append(message)
+            return False
+
+        self._apply_delta(message)
+        return True
+
+    def _load_snapshot(self, message: Dict) -> None:
+        self.seq = message["seq"]
+        if self._keeps_book:
+            order_book = message["order_book"]
+            self.bids = {level["x"]: level["y"] for level in order_book["bids"]}
+            self.asks = {level["x"]: level["y"] for level in order_book["asks"]}
+            self._refresh_order_book()
+        self.active_orders = {}
+        self.own_orders = {}
+        self._add_orders(message["active_orders"])
+        # a snapshot without history leaves out the trades before it, the deltas bring the next ones
+        if self._keeps_trades and "history" in message:
+            self.history = list(message["history"])
+        self.tape_position = message.get("tape_position", self.tape_position)
+
+    def _apply_delta(self, message: Dict) -> None:
+        self.seq = message["seq"]
+        if self._keeps_book:
+            for name, levels in (("bids", self.bids), ("asks", self.asks)):
+                for level in message["book_delta"][name]:
+                    if level["y"]:
+                        levels[level["x"]] = level["y"]
+                    else:
+                        levels.pop(level["x"], None)
+            self._refresh_order_book()
+        self._add_orders(message["orders_added"])
+        for order_id in message["orders_removed"]:
+            self.active_orders.pop(order_id, None)
+            self.own_orders.pop(order_id, None)
+        trades = message["trades"]
+        start = message.get("tape_position", self.tape_position)
+        if self._keeps_trades:
+            # skips the trades a snapshot served since the previous update already brought
+            self.history.extend(trades[max(self.tape_position - start, 0):])
+        self.tape_position = max(self.tape_position, start + len(trades))
+
+    def own_orders_added(self, orders: List[Dict]) -> None:
+        """Orders of the owner acknowledged on its private queue, ahead of the update that lists them."""
+        if self._keeps_own_orders:
+            for order in orders:
+                self.own_orders[order["id"]] = order
+
+    def own_order_closed(self, order_id) -> None:
+        """An order of the owner got executed or cancelled (private queue)."""
+        self.own_orders.pop(order_id, None)
+
+    def _add_orders(self, orders: List[Dict]) -> None:
+        for order in orders:
+            if self._keeps_orders:
+                self.active_orders[order["id"]] = order
+            if self._keeps_own_orders and order["trader_id"] == self.owner_id:
+                self.own_orders[order["id"]] = order
+
+    def _refresh_order_book(self) -> None:
+        self.order_book = {
+            "bids": [{"x": price, "y": amount} for price, amount in sorted(self.bids.items(), reverse=True)],
+            "asks": [{"x": price, "y": amount} for price, amount in sorted(self.asks.items())],
+        }
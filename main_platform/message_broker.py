@@ -1,28 +1,18 @@
-import json
-import aio_pika
 from datetime import datetime
 from structures.structures import Message
-from main_platform.utils import CustomEncoder
+from main_platform.transport import Transport
 
 class MessageBroker:
-    def __init__(self, channel):
-        self.channel = channel
+    def __init__(self, transport: Transport):
+        self.transport = transport
 
-    async def send_message(self, queue_name, message, routing_key=""):
-        message = self.prepare_message(message)
-        exchange = await self.channel.get_exchange(queue_name)
-        await exchange.publish(
-            aio_pika.Message(body=json.dumps(message, cls=CustomEncoder).encode()),
-            routing_key=routing_key
-        )
+    async def send_message(self, queue_name, message, context, routing_key=""):
+        message = self.prepare_message(message, context)
+        await self.transport.publish(queue_name, message, routing_key=routing_key)
 
     async def broadcast_message(self, base_message, exchange_name, context):
         message = self.prepare_message(base_message, context)
-        exchange = await self.channel.get_exchange(exchange_name)
-        await exchange.publish(
-            aio_pika.Message(body=json.dumps(message, cls=CustomEncoder).encode()),
-            routing_key=""
-        )
+        await self.transport.publish(exchange_name, message)
 
     def prepare_message(self, base_message, context):
         # Update the message with additional context
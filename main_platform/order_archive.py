@@ -0,0 +1,95 @@
+"""
+Compact storage for orders that reached a terminal state (executed or cancelled).
+
+Once an order leaves the book it doesn't change anymore, so instead of keeping its dict around we
+append it to typed columns (array.array for the numeric fields, plain lists for ids). The archive
+keeps an id -> row index so that single orders can still be looked up for audit, and it can be
+exported as a whole (to_dicts / to_polars) for the LOBSTER pipeline.
+"""
+
+from array import array
+from datetime import datetime, timezone
+from math import isnan, nan
+from typing import Dict, Iterator, List, Optional
+
+import polars as pl
+
+from structures import OrderStatus
+
+STATUSES = list(OrderStatus)
+
+
+def _to_epoch(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else nan
+
+
+def _from_epoch(value: float) -> Optional[datetime]:
+    return None if isnan(value) else datetime.fromtimestamp(value, timezone.utc)
+
+
+class OrderArchive:
+    def __init__(self):
+        self.ids: List = []
+        self.trader_ids: List[str] = []
+        self.order_type = array("b")
+        self.status = array("b")
+        self.amount = array("d")
+        self.price = array("d")
+        self.timestamp = array("d")
+        self.closed_at = array("d")
+        self._rows: Dict = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self._rows
+
+    def append(self, order: Dict, closed_at: Optional[datetime] = None) -> None:
+        self._rows[order["id"]] = len(self.ids)
+        self.ids.append(order["id"])
+        self.trader_ids.append(order.get("trader_id"))
+        self.order_type.append(int(order["order_type"]))
+        self.status.append(STATUSES.index(OrderStatus(order["status"])))
+        self.amount.append(order.get("amount", 0))
+        self.price.append(order["price"])
+        self.timestamp.append(_to_epoch(order.get("timestamp")))
+        self.closed_at.append(_to_epoch(closed_at))
+
+    def row(self, i: int) -> Dict:
+        return {
+            "id": self.ids[i],
+            "trader_id": self.trader_ids[i],
+            "order_type": self.order_type[i],
+            "status": STATUSES[self.status[i]].value,
+            "amount": self.amount[i],
+            "price": self.price[i],
+            "timestamp": _from_epoch(self.timestamp[i]),
+            "closed_at": _from_epoch(self.closed_at[i]),
+        }
+
+    def get(self, order_id) -> Optional[Dict]:
+        i = self._rows.get(order_id)
+        return None if i is None else self.row(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self.ids)):
+            yield self.row(i)
+
+    def to_dicts(self) -> List[Dict]:
+        return list(self)
+
+    def to_polars(self) -> pl.DataFrame:
+        """Columnar export of the archive, e.g. to build LOBSTER message files."""
+        return pl.DataFrame(
+            {
+                "id": [str(order_id) for order_id in self.ids],
+                "trader_id": self.trader_ids,
+                "order_type": pl.Series(self.order_type, dtype=pl.Int8),
+                "status": [STATUSES[code].value for code in self.status],
+                "amount": pl.Series(self.amount, dtype=pl.Float64),
+                "price": pl.Series(self.price, dtype=pl.Float64),
+                "timestamp": pl.Series(self.timestamp, dtype=pl.Float64),
+                "closed_at": pl.Series(self.closed_at, dtype=pl.Float64),
+            }
+        )
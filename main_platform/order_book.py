@@ -0,0 +1,165 @@
+"""
+Price-level indexed limit order book used by the TradingSession for matching.
+
+Each side keeps its price levels in a SortedList of keys (sortedcontainers, O(log n) to add or drop a
+level) with the best level always at the end of the list, so that best bid/ask is a lookup of the
+last key. Every level is a FIFO queue of
+resting orders (an OrderedDict, so cancelling from the middle of the queue is O(1) as well), and the
+book keeps an id -> order index over all resting orders.
+
+The aggregated volume of each level is updated on every insert and removal, so the L2 view of the
+book (price, total amount) costs O(levels) and never touches individual orders.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+from sortedcontainers import SortedList
+
+from structures import OrderType
+
+
+class PriceLevel:
+    """FIFO queue of resting orders sitting at the same price, together with their total amount."""
+
+    __slots__ = ("price", "orders", "volume")
+
+    def __init__(self, price: float):
+        self.price = price
+        self.orders = OrderedDict()
+        self.volume = 0
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def head(self) -> Dict:
+        """Returns the oldest order at this level (first in the queue)."""
+        return next(iter(self.orders.values()))
+
+
+class BookSide:
+    """
+    One side of the book. Levels are kept in a SortedList of keys where the best level is the last
+    element: for bids the key is the price, for asks it is the negated price. Opening or emptying a
+    level is O(log n) in the number of levels, wherever the level is in the book.
+    """
+
+    def __init__(self, order_type: OrderType):
+        self.order_type = order_type
+        self._sign = 1 if order_type == OrderType.BID else -1
+        self._keys = SortedList()
+        self.levels: Dict[float, PriceLevel] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __bool__(self) -> bool:
+        return bool(self._keys)
+
+    def best_level(self) -> Optional[PriceLevel]:
+        if not self._keys:
+            return None
+        return self.levels[self._sign * self._keys[-1]]
+
+    def add(self, order: Dict) -> PriceLevel:
+        price = order["price"]
+        level = self.levels.get(price)
+        if level is None:
+            level = PriceLevel(price)
+            self.levels[price] = level
+            self._keys.add(self._sign * price)
+        level.orders[order["id"]] = order
+        level.volume += order.get("amount", 0)
+        return level
+
+    def remove(self, order: Dict) -> PriceLevel:
+        price = order["price"]
+        level = self.levels[price]
+        del level.orders[order["id"]]
+        level.volume -= order.get("amount", 0)
+        if not level.orders:
+            self._drop_level(price)
+        return level
+
+    def _drop_level(self, price: float) -> None:
+        del self.levels[price]
+        self._keys.remove(self._sign * price)
+
+    def iter_levels(self) -> Iterator[PriceLevel]:
+        """Iterates over the levels from the best price to the worst one."""
+        for key in reversed(self._keys):
+            yield self.levels[self._sign * key]
+
+    def depth(self, max_levels: Optional[int] = None) -> List[Dict]:
+        """Aggregated L2 view of the side, best level first, in the {'x': price, 'y': amount} format."""
+        depth = []
+        for level in self.iter_levels():
+            if max_levels is not None and len(depth) >= max_levels:
+                break
+            depth.append({"x": level.price, "y": level.volume})
+        return depth
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self.levels.clear()
+
+
+class OrderBook:
+    """Resting orders of a trading session, indexed by price level and by order id."""
+
+    def __init__(self):
+        self.bids = BookSide(OrderType.BID)
+        self.asks = BookSide(OrderType.ASK)
+        self.orders: Dict = {}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self.orders
+
+    def side(self, order_type: OrderType) -> BookSide:
+        return self.bids if order_type == OrderType.BID else self.asks
+
+    def get(self, order_id) -> Optional[Dict]:
+        return self.orders.get(order_id)
+
+    def add(self, order: Dict) -> None:
+        if order["id"] in self.orders:
+            self.remove(order["id"])
+        self.orders[order["id"]] = order
+        self.side(order["order_type"]).add(order)
+
+    def remove(self, order_id) -> Optional[Dict]:
+        """Removes an order (cancelled or executed) from the book. Returns None if it is not resting."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        self.side(order["order_type"]).remove(order)
+        return order
+
+    def best_bid(self) -> Optional[Dict]:
+        level = self.bids.best_level()
+        return level.head() if level is not None else None
+
+    def best_ask(self) -> Optional[Dict]:
+        level = self.asks.best_level()
+        return level.head() if level is not None else None
+
+    @property
+    def best_bid_price(self) -> Optional[float]:
+        level = self.bids.best_level()
+        return level.price if level is not None else None
+
+    @property
+    def best_ask_price(self) -> Optional[float]:
+        level = self.asks.best_level()
+        return level.price if level is not None else None
+
+    def depth(self, max_levels: Optional[int] = None) -> Dict[str, List[Dict]]:
+        return {"bids": self.bids.depth(max_levels), "asks": self.asks.depth(max_levels)}
+
+    def clear(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        self.orders.clear()
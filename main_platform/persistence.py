@@ -0,0 +1,148 @@
+"""
+Write-behind persistence of mongoengine documents.
+
+The trading session must never wait on Mongo while matching orders, so documents are put on a
+bounded queue and a single background task writes them with insert_many, either when a batch is
+full or when flush_interval has passed since the first document of the batch arrived. The insert
+itself runs in the thread pool executor.
+
+If Mongo can't keep up and the queue is full, new documents are dropped (and counted) instead of
+blocking the caller. Pass max_queue_size=0 for an unbounded queue where nothing is ever dropped.
+If the background task dies on an unexpected error, it is restarted.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Type
+
+from mongoengine import Document
+
+from main_platform.custom_logger import setup_custom_logger
+from structures.structures import executor
+
+logger = setup_custom_logger(__name__)
+
+_STOP = object()  # put on the queue by close() to make the writer flush what it has and exit
+
+
+class BatchWriter:
+    def __init__(
+        self,
+        document_cls: Type[Document],
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        backpressure_threshold: float = 0.8,
+    ):
+        self.document_cls = document_cls
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self._backpressure_size = int(max_queue_size * backpressure_threshold) if max_queue_size > 0 else None
+        self._task: Optional[asyncio.Task] = None
+
+        # metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_events = 0
+        self.max_depth = 0
+        self.last_flush_latency = 0.0
+
+    @property
+    def metrics(self) -> Dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "backpressure_events": self.backpressure_events,
+            "last_flush_latency": self.last_flush_latency,
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task is not self._task or task.cancelled() or task.exception() is None:
+            return
+        logger.error(f"{self.document_cls.__name__} writer crashed, restarting it: {task.exception()}")
+        self._task = None
+        self.start()
+
+    def put(self, document: Document) -> bool:
+        """Enqueues a document without ever blocking. Returns False if it had to be dropped."""
+        try:
+            self.queue.put_nowait(document)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.error(f"{self.document_cls.__name__} writer queue is full, {self.dropped} documents dropped so far")
+            return False
+
+        self.enqueued += 1
+        depth = self.queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        if self._backpressure_size is not None and depth >= self._backpressure_size:
+            self.backpressure_events += 1
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            document = await self.queue.get()
+            if document is _STOP:
+                self.queue.task_done()
+                return
+            batch = [document]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    document = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if document is _STOP:
+                    await self._flush(batch)
+                    self.queue.task_done()
+                    return
+                batch.append(document)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Document]) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor, self._insert_many, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} {self.document_cls.__name__} documents: {e}")
+        finally:
+            self.batches += 1
+            self.last_flush_latency = time.perf_counter() - started
+            for _ in batch:
+                self.queue.task_done()
+
+    def _insert_many(self, batch: List[Document]) -> None:
+        collection = self.document_cls._get_collection()
+        collection.insert_many([document.to_mongo() for document in batch], ordered=False)
+
+    async def close(self, timeout: float = 30) -> None:
+        """Writes the documents that are still queued and stops the background task."""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{self.queue.qsize()} {self.document_cls.__name__} documents were not written")
+        self._task = None
@@ -0,0 +1,77 @@
+"""
+Streaming PnL statistics of a trader.
+
+Fills and midpoints update running sums only, so every update and every read (VWAP, inventory,
+PnL) is O(1) and the memory of a trader doesn't grow with the session. The most recent fills and
+midpoints can be kept as well, in fixed-size ring buffers (see external_traders/ring_stack.py).
+
+The PnL is marked to a midpoint: each fill of dinv shares (negative when selling) at price is
+valued against the midpoint of the time of the fill,
+
+    pnl = mid * inventory - sum(mid_at_fill * dinv) - sum(dinv * (price - mid_at_fill))
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from external_traders.ring_stack import RingStack
+
+FILL_COLUMNS = ("dinv", "price", "mid")
+
+
+class PnLStats:
+    def __init__(self, history_size: int = 0):
+        self.last_mid: Optional[float] = None
+        self.inventory = 0.0
+        self.volume = 0.0
+        self.n_fills = 0
+        self.sum_price_volume = 0.0
+        self.sum_cost = 0.0
+        self.sum_mid_executions = 0.0
+        self.pnl_at_last_fill = 0.0
+        # the last history_size fills (dinv, price, mid at the fill) and midpoints, none by default
+        self.recent_fills = RingStack(history_size, len(FILL_COLUMNS)) if history_size else None
+        self.recent_mids = RingStack(history_size, 1) if history_size else None
+
+    def update_mid(self, mid: float) -> None:
+        self.last_mid = mid
+        if self.recent_mids is not None:
+            self.recent_mids.push(mid)
+
+    def update_fill(self, dinv: float, price: float) -> None:
+        """Records a fill of dinv shares (negative when selling), valued at the latest midpoint."""
+        mid = self.last_mid if self.last_mid is not None else price
+        self.inventory += dinv
+        self.volume += abs(dinv)
+        self.n_fills += 1
+        self.sum_price_volume += abs(dinv) * price
+        self.sum_cost += dinv * (price - mid)
+        self.sum_mid_executions += mid * dinv
+        self.pnl_at_last_fill = self.pnl(mid)
+        if self.recent_fills is not None:
+            self.recent_fills.push((dinv, price, mid))
+
+    @property
+    def vwap(self) -> float:
+        """Volume weighted average price of the fills, 0 before the first one."""
+        return self.sum_price_volume / self.volume if self.volume else 0
+
+    def pnl(self, mid: Optional[float] = None) -> float:
+        """The PnL marked to mid, to the latest midpoint by default (to the fills when there is none yet)."""
+        mid = self.last_mid if mid is None else mid
+        if mid is None:
+            return self.pnl_at_last_fill
+        return mid * self.inventory - self.sum_mid_executions - self.sum_cost
+
+    def fills(self) -> np.ndarray:
+        """The recent fills, oldest first, one row per fill with the FILL_COLUMNS (a copy)."""
+        if self.recent_fills is None:
+            return np.empty((0, len(FILL_COLUMNS)))
+        return self.recent_fills.last().copy()
+
+    def mids(self) -> np.ndarray:
+        """The recent midpoints, oldest first (a copy)."""
+        if self.recent_mids is None:
+            return np.empty(0)
+        return self.recent_mids.last()[:, 0].copy()
@@ -0,0 +1,57 @@
+"""
+Random number streams of a trading session.
+
+A session has one seeded RandomStream and every simulated trader gets a child stream spawned from it
+(see TraderManager), so a seed reproduces the draws of every trader, whatever the order in which
+they act. A stream draws its variables in blocks and hands them out one at a time (or as many as
+asked for), refilling the block when it runs out: an act costs an array lookup instead of a call
+into the generator.
+"""
+
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+Seed = Union[None, int, np.random.SeedSequence]
+
+
+class RandomStream:
+    def __init__(self, seed: Seed = None, block_size: int = 1024):
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+        self.block_size = block_size
+        self._blocks: Dict[Hashable, Tuple[np.ndarray, int]] = {}
+
+    @property
+    def entropy(self) -> int:
+        """The seed to pass to reproduce this stream (and its children), also when none was given."""
+        return self.seed_sequence.entropy
+
+    def spawn(self) -> "RandomStream":
+        """An independent child stream, for one trader of the session."""
+        return RandomStream(self.seed_sequence.spawn(1)[0], block_size=self.block_size)
+
+    def _take(self, key: Hashable, size: Optional[int], draw: Callable[[int], np.ndarray]):
+        block, position = self._blocks.get(key, (None, 0))
+        n = 1 if size is None else size
+        if block is None or position + n > len(block):
+            rest = block[position:] if block is not None else np.empty(0)
+            block = np.concatenate([rest, draw(max(self.block_size, n - len(rest)))])
+            position = 0
+        self._blocks[key] = (block, position + n)
+        values = block[position:position + n]
+        return float(values[0]) if size is None else values
+
+    def uniform(self, low: float = 0.0, high: float = 1.0, size: Optional[int] = None):
+        return low + (high - low) * self._take('uniform', size, self.generator.random)
+
+    def gamma(self, shape: float, scale: float = 1.0, size: Optional[int] = None):
+        return scale * self._take(('gamma', shape), size, lambda n: self.generator.standard_gamma(shape, n))
+
+    def integers(self, low: int, high: int, size: Optional[int] = None):
+        """Integers in [low, high), as Generator.integers."""
+        values = low + np.floor(self.uniform(size=size) * (high - low))
+        return int(values) if size is None else values.astype(np.int64)
+
+    def choice(self, options: Sequence):
+        return options[self.integers(0, len(options))]
@@ -0,0 +1,46 @@
+"""
+Append-only, in-memory record of the trades of a trading session.
+
+The tape is the source of truth for the transaction history and the last traded price that we
+broadcast. Mongo is only written behind it (see TradingSession.transaction_writer), it is never
+read back on the hot path.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+from structures import TransactionModel
+
+
+class TradeTape:
+    def __init__(self):
+        self._trades: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self._trades)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._trades)
+
+    def append(self, transaction: TransactionModel) -> Dict:
+        """Records a transaction, using the same fields as the documents stored in Mongo."""
+        trade = {
+            "_id": transaction.id,
+            "trading_session_id": transaction.trading_session_id,
+            "bid_order_id": transaction.bid_order_id,
+            "ask_order_id": transaction.ask_order_id,
+            "timestamp": transaction.timestamp,
+            "price": transaction.price,
+        }
+        self._trades.append(trade)
+        return trade
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return self._trades[-1]["price"] if self._trades else None
+
+    def since(self, position: int) -> List[Dict]:
+        """Trades appended after the given position (i.e. after len(tape) was equal to it)."""
+        return self._trades[position:]
+
+    def to_list(self) -> List[Dict]:
+        return list(self._trades)
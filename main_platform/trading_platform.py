@@ -1,25 +1,29 @@
 import asyncio
 import json
-import os
 import uuid
 from asyncio import Event, Lock
 from collections import defaultdict
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
-import aio_pika
-import polars as pl
 from mongoengine import connect
 from pydantic import ValidationError
 
+from main_platform.clock import Clock, WallClock
 from main_platform.custom_logger import setup_custom_logger
-from main_platform.utils import CustomEncoder, if_active, now
-from structures import (Message, Order, OrderStatus, OrderType, TraderType,
-                        TransactionModel)
+from main_platform.journal import EventJournal, read_journal
+from main_platform.market_data import MarketDataFeed, order_to_broadcast
+from main_platform.order_archive import OrderArchive
+from main_platform.order_book import OrderBook
+from main_platform.persistence import BatchWriter
+from main_platform.trade_tape import TradeTape
+from main_platform.transport import RabbitMQTransport, Transport
+from main_platform.utils import if_active
+from structures import (DEFAULT_FEEDS, ExchangeType, Feed, JournalEventType, Message, Order,
+                        OrderStatus, OrderType, TraderType, TransactionModel)
 
 connect(host="mongodb://localhost:27017/trader?w=majority&wtimeoutMS=1000")
 
-rabbitmq_url = os.getenv("RABBITMQ_URL", "amqp://localhost")
 logger = setup_custom_logger(__name__)
 
 
@@ -27,8 +31,11 @@ class TradingSession:
     duration: int
     active: bool
     start_time: datetime
-    transactions = List[TransactionModel]
-    all_orders = Dict[uuid.UUID, Dict]
+    transactions: List[TransactionModel]
+    all_orders: Dict[uuid.UUID, Dict]
+    book: OrderBook
+    archive: OrderArchive
+    trade_tape: TradeTape
 
     def __init__(
         self,
@@ -36,24 +43,45 @@ class TradingSession:
         default_price: int = 1000,
         default_spread: int = 10,
         punishing_constant: int = 1,
+        snapshot_interval: int = 100,
+        conflation_window: Optional[float] = None,
+        ticker_levels: int = 3,
+        journal_path: Optional[str] = None,
+        transport: Optional[Transport] = None,
+        clock: Optional[Clock] = None,
     ):
         self.active = False
+        self.clock = clock or WallClock()
         self.duration = duration
         self.default_price = default_price
 
         self.default_spread = default_spread
         self.punishing_constant = punishing_constant
+        # None: broadcast after every handled message, 0: coalesce within one event loop tick,
+        # > 0: coalesce within that many seconds. Transactions are always broadcast immediately.
+        self.conflation_window = conflation_window
+        self._conflated = []
+        self._conflation_task = None
 
         self._stop_requested = asyncio.Event()
 
         self.id = str(uuid.uuid4())
 
-        self.creation_time = now()
-        self.all_orders = {}
+        self.creation_time = self.clock.now()
+        self.book = OrderBook()
+        self.archive = OrderArchive()
+        self.trade_tape = TradeTape()
+        self.market_data = MarketDataFeed(
+            self.book, self.trade_tape, snapshot_interval=snapshot_interval
+        )
+        # depth of the top of book ticker, published on its own exchange (see MarketDataFeed.ticker)
+        self.ticker_levels = ticker_levels
 
         self.broadcast_exchange_name = f"broadcast_{self.id}"
+        self.ticker_exchange_name = f"ticker_{self.id}"
         self.queue_name = f"trading_system_queue_{self.id}"
-        self.trader_exchange = None
+        # RabbitMQ unless the session runs in the same process as its traders (see transport.py)
+        self.transport = transport or RabbitMQTransport()
 
         self.connected_traders = {}
         self.trader_responses = {}
@@ -61,18 +89,21 @@ class TradingSession:
         self.lock = Lock()
         self.release_event = Event()
         self.current_price = 0  # handling non-defined attribute
-        self.transaction_processor_task = None # handling non-defined attribute
 
-        self.transaction_queue = asyncio.Queue()
+        # the only writer of the session transactions: it never drops, so its queue is unbounded
+        self.transaction_writer = BatchWriter(TransactionModel, max_queue_size=0)
+        self.transaction_queue = self.transaction_writer.queue
+        self.message_writer = BatchWriter(Message)
+        # optional local record of everything that changes the book, see replay_journal
+        self.journal = EventJournal(journal_path) if journal_path else None
 
     @property
     def current_time(self) -> datetime:
-        return datetime.now(timezone.utc)
+        return self.clock.now()
 
     @property
     def transactions(self) -> List[Dict]:
-        transactions = TransactionModel.objects(trading_session_id=self.id)
-        return [transaction.to_mongo().to_dict() for transaction in transactions]
+        return self.trade_tape.to_list()
 
     @property
     def mid_price(self) -> float:
@@ -95,79 +126,60 @@ class TradingSession:
             "connected_traders": self.connected_traders,
         }
 
+    @property
+    def all_orders(self) -> Dict:
+        """
+        The live working set of the session: orders resting on the book. Orders that got executed or
+        cancelled are moved to self.archive, so this never grows with the session age.
+        """
+        return self.book.orders
+
+    @all_orders.setter
+    def all_orders(self, orders: Dict) -> None:
+        """Replaces the orders of the session: active ones go to the book, the rest to the archive."""
+        self.book.clear()
+        self.archive = OrderArchive()
+        for order in orders.values():
+            if order["status"] == OrderStatus.ACTIVE:
+                self.book.add(order)
+            else:
+                self.archive.append(order)
+
     @property
     def active_orders(self) -> Dict:
-        return {
-            k: v
-            for k, v in self.all_orders.items()
-            if v["status"] == OrderStatus.ACTIVE
-        }
+        """Resting orders indexed by id. It is a live view of the book, so don't mutate it while iterating."""
+        return self.book.orders
 
     @property
     def order_book(self) -> Dict:
-        active_orders_df = pl.DataFrame(list(self.active_orders.values()))
-
-        order_book = {"bids": [], "asks": []}
-        if active_orders_df.height == 0:
-            return order_book
+        return self.book.depth()
 
-        active_bids = active_orders_df.filter(pl.col("order_type") == OrderType.BID)
-        active_asks = active_orders_df.filter(pl.col("order_type") == OrderType.ASK)
-
-        if not active_bids.is_empty():
-            bids_grouped = (
-                active_bids.groupby("price")
-                .agg([pl.col("amount").sum().alias("amount_sum")])
-                .sort(by="price", descending=True)
-            )
-            order_book["bids"] = bids_grouped.rename(
-                {"price": "x", "amount_sum": "y"}
-            ).to_dicts()
-
-        if not active_asks.is_empty():
-            asks_grouped = (
-                active_asks.groupby("price")
-                .agg([pl.col("amount").sum().alias("amount_sum")])
-                .sort(by="price")
-            )
-            order_book["asks"] = asks_grouped.rename(
-                {"price": "x", "amount_sum": "y"}
-            ).to_dicts()
-
-        return order_book
+    @property
+    def persistence_metrics(self) -> Dict:
+        """Queue depth, flush latency, drops etc. of the Mongo writers."""
+        return {
+            "transactions": self.transaction_writer.metrics,
+            "messages": self.message_writer.metrics,
+        }
 
     @property
     def transaction_price(self) -> Optional[float]:
         """Returns the price of last transaction. If there are no transactions, returns None."""
-        if not self.transactions or len(self.transactions) == 0:
-            return None
-        transactions = [
-            {"price": t["price"], "timestamp": t["timestamp"].timestamp()}
-            for t in self.transactions
-        ]
-        # sort by timestamp
-        transactions.sort(key=lambda x: x["timestamp"])
-        return transactions[-1]["price"]
+        return self.trade_tape.last_price
 
     async def initialize(self) -> None:
-        self.start_time = now()
+        self.start_time = self.clock.now()
         self.active = True
-        self.connection = await aio_pika.connect_robust(rabbitmq_url)
-        self.channel = await self.connection.channel()
-
-        await self.channel.declare_exchange(
-            self.broadcast_exchange_name, aio_pika.ExchangeType.FANOUT, auto_delete=True
+        self.transaction_writer.start()
+        self.message_writer.start()
+        await self.transport.connect()
+
+        await self.transport.declare_exchange(self.broadcast_exchange_name, ExchangeType.FANOUT)
+        await self.transport.declare_exchange(self.ticker_exchange_name, ExchangeType.FANOUT)
+        await self.transport.declare_exchange(self.queue_name, ExchangeType.DIRECT)
+        await self.transport.subscribe(
+            self.queue_name, self.on_individual_message, queue_name=self.queue_name
         )
-        self.trader_exchange = await self.channel.declare_exchange(
-            self.queue_name, aio_pika.ExchangeType.DIRECT, auto_delete=True
-        )
-        trader_queue = await self.channel.declare_queue(
-            self.queue_name, auto_delete=True
-        )
-        await trader_queue.bind(self.trader_exchange)  # bind the queue to the exchange
-        await trader_queue.consume(self.on_individual_message)
-
-        await trader_queue.purge()
 
     async def clean_up(self) -> None:
         """
@@ -178,22 +190,14 @@ class TradingSession:
 
         self._stop_requested.set()
         self.active = False
-        try:
-            # Unbind the queue from the exchange (optional, as auto_delete should handle this)
-            trader_queue = await self.channel.get_queue(self.queue_name)
-            await trader_queue.unbind(self.trader_exchange)
-
-            # Close the channel and connection
-            await self.channel.close()
-            logger.info(f"Trading System {self.id} channel closed")
-            await self.connection.close()
-            logger.info(f"Trading System {self.id} connection closed")
-        except Exception as e:
-            logger.error(f"An error occurred during cleanup: {e}")
-
-    async def get_order_book_snapshot(self) -> Dict:
-        async with self.lock:
-            return self.order_book.copy()  
+        self._drain_conflated()
+        await self.transaction_writer.close()
+        await self.message_writer.close()
+        if self.journal is not None:
+            self.journal.close()
+        logger.info(f"Trading System {self.id} writers closed: {self.persistence_metrics}")
+        await self.transport.close()
+        logger.info(f"Trading System {self.id} transport closed")
 
     def get_transaction_history(self) -> List[Dict]:
         return self.transactions
@@ -210,36 +214,88 @@ class TradingSession:
         return self.transaction_price
 
     def get_active_orders_to_broadcast(self) -> List[Dict]:
-        active_orders_df = pl.DataFrame(list(self.active_orders.values()))
-        if active_orders_df.height == 0:
-            return []
-        active_orders_df = active_orders_df.select(
-            ["id", "trader_id", "order_type", "amount", "price", "timestamp"]
-        )
-        return active_orders_df.to_dicts()
+        return [order_to_broadcast(order) for order in self.active_orders.values()]
 
     async def send_broadcast(self, message: dict, message_type="BOOK_UPDATED", incoming_message=None) -> None:
+            """
+            Publishes the next numbered market data update (see MarketDataFeed): only what changed
+            since the previous broadcast, with a full snapshot every snapshot_interval messages.
+            The ticker goes out first, if the top of the book changed.
+            """
             if "type" not in message:
                 message["type"] = message_type  # Only set default if not specified
 
+            # whatever was being conflated goes out with this update
+            coalesced = self._drain_conflated()
+            if coalesced:
+                if incoming_message is not None:
+                    coalesced.append(incoming_message)
+                message["incoming_messages"] = coalesced
+                incoming_message = coalesced[-1]
+
+            message.update(self.market_data.next_update())
             message.update({
-                "order_book": await self.get_order_book_snapshot(),
-                "active_orders": self.get_active_orders_to_broadcast(),
-                "history": self.get_transaction_history(),
                 "spread": self.get_current_spread(),
                 "midpoint": self.get_current_midpoint(),
                 "transaction_price": self.get_last_transaction_price(),
                 "incoming_message": incoming_message,
                 "test_field": "test"
             })
-            message_document = Message(trading_session_id=self.id, content=message)
-            message_document.save()
+            # the stored messages keep the full L2 book for the LOBSTER export
+            self.message_writer.put(Message(
+                trading_session_id=self.id,
+                content={**message, "order_book": self.order_book},
+            ))
 
-            exchange = await self.channel.get_exchange(self.broadcast_exchange_name)
-            await exchange.publish(
-                aio_pika.Message(body=json.dumps(message, cls=CustomEncoder).encode()),
-                routing_key="",  # routing_key is typically ignored in FANOUT exchanges
-            )
+            ticker = self.market_data.next_ticker(self.ticker_levels)
+            if ticker is not None:
+                await self.transport.publish(self.ticker_exchange_name, {"type": "ticker", **ticker})
+            await self.transport.publish(self.broadcast_exchange_name, message)
+
+    async def request_broadcast(self, message: dict, message_type: str, incoming_message: dict) -> None:
+        """
+        Broadcasts the update right away, or in conflation mode coalesces it with all the updates
+        arriving within conflation_window into a single publish. Transactions are never delayed.
+        """
+        if self.conflation_window is None or self.market_data.has_new_trades:
+            await self.send_broadcast(message=message, message_type=message_type, incoming_message=incoming_message)
+            return
+
+        self._conflated.append((message, message_type, incoming_message))
+        if self._conflation_task is None:
+            self._conflation_task = asyncio.create_task(self._flush_conflated())
+
+    async def _flush_conflated(self) -> None:
+        await self.clock.sleep(self.conflation_window)
+        self._conflation_task = None
+        if self._conflated:
+            message, message_type, _ = self._conflated[-1]
+            await self.send_broadcast(message=message, message_type=message_type)
+
+    def _drain_conflated(self) -> List[Dict]:
+        """Cancels the pending conflated broadcast and returns the incoming messages it would have carried."""
+        if self._conflation_task is not None and self._conflation_task is not asyncio.current_task():
+            self._conflation_task.cancel()
+        self._conflation_task = None
+        coalesced = [incoming_message for _, _, incoming_message in self._conflated]
+        self._conflated = []
+        return coalesced
+
+    async def send_to_trader(self, trader_id: str, message: dict) -> None:
+        """Sends a message to the individual queue of a trader."""
+        await self.transport.publish(self.queue_name, message, routing_key=f"trader_{trader_id}")
+
+    async def send_fills(self, fills: Dict[str, List[Dict]]) -> None:
+        """Sends each trader its own fills, on its individual queue. The session itself gets nothing."""
+        for trader_id, trader_fills in fills.items():
+            if trader_id in self.connected_traders:
+                await self.send_to_trader(trader_id, {"type": "transaction_update", "transactions": trader_fills})
+
+    async def send_order_ack(self, trader_id: str, orders: List[Dict]) -> None:
+        """Tells a trader the ids the session gave to its new orders."""
+        await self.send_to_trader(
+            trader_id, {"type": "order_ack", "orders": [order_to_broadcast(order) for order in orders]}
+        )
 
     @property
     def list_active_orders(self) -> List[Dict]:
@@ -258,33 +314,36 @@ class TradingSession:
                 "status": OrderStatus.ACTIVE.value,
             }
         )
-        self.all_orders[order_id] = order_dict
+        self.book.add(order_dict)
+        self.market_data.order_added(order_dict)
+        if self.journal is not None:
+            self.journal.record(JournalEventType.ORDER, order_dict)
         return order_dict
 
+    def get_order(self, order_id) -> Optional[Dict]:
+        """Looks the order up among the resting ones first and then in the archive."""
+        return self.book.get(order_id) or self.archive.get(order_id)
+
+    def remove_order(self, order_id, status: OrderStatus, closed_at: Optional[datetime] = None) -> Optional[Dict]:
+        """Takes the order off the book, marks it with a terminal status and moves it to the archive."""
+        order = self.book.remove(order_id)
+        if order is None:
+            return None
+        order["status"] = status.value
+        closed_at = closed_at or self.clock.now()
+        self.archive.append(order, closed_at=closed_at)
+        self.market_data.order_removed(order)
+        if self.journal is not None and status == OrderStatus.CANCELLED:
+            self.journal.record(JournalEventType.CANCEL, {"order_id": order_id, "timestamp": closed_at})
+        return order
+
     def get_spread(self) -> Tuple[Optional[float], Optional[float]]:
         """
         Returns the spread and the midpoint. If there are no overlapping orders, returns None, None.
         """
-        asks = [
-            order
-            for order in self.active_orders.values()
-            if order["order_type"] == OrderType.ASK
-        ]
-        bids = [
-            order
-            for order in self.active_orders.values()
-            if order["order_type"] == OrderType.BID
-        ]
-
-        # Sort by price (lowest first for asks), and then by timestamp (oldest first - FIFO)
-        asks.sort(key=lambda x: (x["price"], x["timestamp"]))
-        # Sort by price (highest first for bids), and then by timestamp (oldest first)
-        bids.sort(key=lambda x: (-x["price"], x["timestamp"]))
-
-        # Calculate the spread
-        if asks and bids:
-            lowest_ask = asks[0]["price"]
-            highest_bid = bids[0]["price"]
+        lowest_ask = self.book.best_ask_price
+        highest_bid = self.book.best_bid_price
+        if lowest_ask is not None and highest_bid is not None:
             spread = lowest_ask - highest_bid
             mid_price = (lowest_ask + highest_bid) / 2
             return spread, mid_price
@@ -293,84 +352,62 @@ class TradingSession:
             return None, None
 
     async def create_transaction(self, bid: Dict, ask: Dict, transaction_price: float) -> Tuple[str, str, TransactionModel]:
-        self.all_orders[ask["id"]]["status"] = OrderStatus.EXECUTED.value
-        self.all_orders[bid["id"]]["status"] = OrderStatus.EXECUTED.value
+        timestamp = self.clock.now()
+        self.remove_order(ask["id"], OrderStatus.EXECUTED, closed_at=timestamp)
+        self.remove_order(bid["id"], OrderStatus.EXECUTED, closed_at=timestamp)
 
         transaction = TransactionModel(
             trading_session_id=self.id,
             bid_order_id=bid["id"],
             ask_order_id=ask["id"],
             price=transaction_price,
+            timestamp=timestamp,
         )
+        self.trade_tape.append(transaction)
+        if self.journal is not None:
+            self.journal.record(JournalEventType.FILL, {
+                "id": transaction.id,
+                "trading_session_id": self.id,
+                "bid_order_id": bid["id"],
+                "ask_order_id": ask["id"],
+                "price": transaction_price,
+                "timestamp": transaction.timestamp,
+            })
 
-        await self.transaction_queue.put(transaction)
+        # Mongo is only a write-behind sink for the tape
+        self.transaction_writer.put(transaction)
         logger.info(f"Transaction enqueued: {transaction}")
-
-        # Send transaction details to both traders
-        transaction_details = {
-            "type": "transaction_update",
-            "transactions": [
-                {"id": ask["id"], "price": transaction_price, "type": "ask", "amount": ask["amount"], "trader_id": ask["trader_id"]},
-                {"id": bid["id"], "price": transaction_price, "type": "bid", "amount": bid["amount"], "trader_id": bid["trader_id"]}
-            ]
-        }
-
-        # Publish transaction details to both traders
-        exchange = await self.channel.get_exchange(self.broadcast_exchange_name)
-        await exchange.publish(
-            aio_pika.Message(body=json.dumps(transaction_details, cls=CustomEncoder).encode()),
-            routing_key=""
-        )
-
         return ask["trader_id"], bid["trader_id"], transaction
 
-    async def process_transactions(self) -> None:
-        while True:
-            transaction = await self.transaction_queue.get()
-            await transaction.save_async()
-            self.transaction_queue.task_done()
-            logger.info(f"Transaction processed: {transaction}")
-
     async def clear_orders(self) -> Dict:
+        """
+        Matches the best bid against the best ask for as long as the book is crossed. The fills of
+        each trader are returned under subgroup_broadcast, for send_fills.
+        """
         res = {"transactions": [], "removed_active_orders": []}
-        asks = [
-            order
-            for order in self.active_orders.values()
-            if order["order_type"] == OrderType.ASK
-        ]
-        bids = [
-            order
-            for order in self.active_orders.values()
-            if order["order_type"] == OrderType.BID
-        ]
-
-        asks.sort(key=lambda x: (x["price"], x["timestamp"]))
-        bids.sort(key=lambda x: (-x["price"], x["timestamp"]))
-
-        if asks and bids:
-            lowest_ask = asks[0]["price"]
-            highest_bid = bids[0]["price"]
-            spread = lowest_ask - highest_bid
-        else:
+        lowest_ask = self.book.best_ask_price
+        highest_bid = self.book.best_bid_price
+
+        if lowest_ask is None or highest_bid is None:
             logger.info("No overlapping orders.")
             return res
 
+        spread = lowest_ask - highest_bid
         if spread > 0:
             logger.info(
                 f"No overlapping orders. Spread is positive: {spread}. Lowest ask: {lowest_ask}, highest bid: {highest_bid}"
             )
             return res
 
-        viable_asks = [ask for ask in asks if ask["price"] <= highest_bid]
-        viable_bids = [bid for bid in bids if bid["price"] >= lowest_ask]
-
         transactions = []
         participated_traders = set()
         traders_to_transactions_lookup = defaultdict(list)
 
-        while viable_asks and viable_bids:
-            ask = viable_asks.pop(0)
-            bid = viable_bids.pop(0)
+        while True:
+            ask = self.book.best_ask()
+            bid = self.book.best_bid()
+            if ask is None or bid is None or ask["price"] > bid["price"]:
+                break
 
             transaction_price = (ask["price"] + bid["price"]) / 2
             ask_trader_type = self.connected_traders[ask["trader_id"]]["trader_type"]
@@ -382,7 +419,7 @@ class TradingSession:
                 and ask_trader_id == bid_trader_id
             ):
                 logger.warning(f"Blocking self-execution for trader {ask_trader_id}")
-                return res
+                break
 
             ask_trader_id, bid_trader_id, transaction = await self.create_transaction(
                 bid, ask, transaction_price
@@ -391,22 +428,8 @@ class TradingSession:
             participated_traders.add(ask_trader_id)
             participated_traders.add(bid_trader_id)
 
-            traders_to_transactions_lookup[ask["trader_id"]].append(
-                {
-                    "id": ask["id"],
-                    "price": ask["price"],
-                    "type": "ask",
-                    "amount": ask["amount"],
-                }
-            )
-            traders_to_transactions_lookup[bid["trader_id"]].append(
-                {
-                    "id": bid["id"],
-                    "price": bid["price"],
-                    "type": "bid",
-                    "amount": bid["amount"],
-                }
-            )
+            traders_to_transactions_lookup[ask_trader_id].append(fill_of(ask, transaction_price))
+            traders_to_transactions_lookup[bid_trader_id].append(fill_of(bid, transaction_price))
 
             transactions.append(transaction)
 
@@ -416,68 +439,68 @@ class TradingSession:
         return res
 
     async def handle_add_order(self, data: dict) -> Dict:
-        data["order_type"] = int(data["order_type"])
         try:
-            order = Order(status=OrderStatus.BUFFERED.value, session_id=self.id, **data)
-            self.place_order(order.model_dump())
-        except ValidationError as e:
+            data["order_type"] = int(data["order_type"])
+            order = Order(status=OrderStatus.BUFFERED.value, session_id=self.id, timestamp=self.clock.now(),
+                          **without_session_fields(data))
+            order = self.place_order(order.model_dump())
+        except (ValidationError, KeyError, TypeError, ValueError) as e:
             logger.critical(f"Order validation failed: {e}")
+            await self.send_to_trader(data.get("trader_id"), {"type": "order_rejected", "reason": str(e)})
             return {"status": "failed", "reason": str(e), "type": "order_failed"}
+        await self.send_order_ack(data["trader_id"], [order])
 
         # Clear orders and prepare for response
         resp = await self.clear_orders()
-        subgroup_data = resp.pop("subgroup_broadcast", None)
+        await self.send_fills(resp.pop("subgroup_broadcast", {}))
         resp.update({"type": "NEW_ORDER_ADDED", "content": "A", "respond": True})
         return resp
 
-
-    async def handle_cancel_order(self, data: dict) -> Dict:
-        order_id = data.get("order_id")
-        trader_id = data.get("trader_id")
-        order_details = data.get("order_details")  # Ensure this key exists in the message
-
+    async def handle_add_orders(self, data: dict) -> Dict:
+        """
+        Adds a batch of orders at once: either all of them are valid and placed, or none is. The book
+        is then cleared once and a single broadcast goes out for the whole batch.
+        """
+        orders = []
         try:
-            order_id = uuid.UUID(order_id)
-        except ValueError:
-            logger.warning(f"Invalid order ID format: {order_id}.")
-            return {"status": "failed", "reason": "Invalid order ID format"}
-
-        async with self.lock:
-            if order_id not in self.active_orders:
-                return {"status": "failed", "reason": "Order not found"}
-
-            existing_order = self.active_orders[order_id]
-            if existing_order["trader_id"] != trader_id:
-                return {"status": "failed", "reason": "Trader does not own the order"}
-
-            if existing_order["status"] != OrderStatus.ACTIVE.value:
-                return {"status": "failed", "reason": "Order is not active"}
+            for order_data in data.get("orders", []):
+                order_data = dict(without_session_fields(order_data), trader_id=data["trader_id"],
+                                  order_type=int(order_data["order_type"]))
+                orders.append(
+                    Order(status=OrderStatus.BUFFERED.value, session_id=self.id, timestamp=self.clock.now(), **order_data)
+                )
+        except (ValidationError, KeyError, TypeError, ValueError) as e:
+            logger.critical(f"Order batch validation failed: {e}")
+            await self.send_to_trader(data.get("trader_id"), {"type": "order_rejected", "reason": str(e)})
+            return {"status": "failed", "reason": str(e), "type": "order_failed"}
+        if not orders:
+            return {"status": "failed", "reason": "no orders in the batch", "type": "order_failed"}
 
-            # Log the cancellation with details
-            message_document = Message(
-                trading_session_id=self.id,
-                content={
-                    "action": "order_cancelled",
-                    "order_id": str(order_id),
-                    "details": order_details  # Include negative amount and other details
-                }
-            )
-            message_document.save()
+        orders = [self.place_order(order.model_dump()) for order in orders]
+        await self.send_order_ack(data["trader_id"], orders)
 
-            # Update order status
-            self.all_orders[order_id]["status"] = OrderStatus.CANCELLED.value
-            self.all_orders[order_id]["cancellation_timestamp"] = now()
+        resp = await self.clear_orders()
+        await self.send_fills(resp.pop("subgroup_broadcast", {}))
+        resp.update({"type": "NEW_ORDERS_ADDED", "content": "A", "respond": True})
+        return resp
 
-            return {"status": "cancel success", "order": order_id, "type": "ORDER_CANCELLED", "respond": True}
-    
     @if_active
     async def handle_cancel_order(self, data: dict) -> Dict:
-        order_id = data.get("order_id")
+        """Cancels an order, the trader gets the confirmation (or why it failed) on its own queue."""
         trader_id = data.get("trader_id")
+        result = await self.cancel_order(data.get("order_id"), trader_id)
+        if result["status"] == "failed":
+            await self.send_to_trader(trader_id, {
+                "type": "cancel_rejected", "order_id": data.get("order_id"), "reason": result["reason"]
+            })
+        else:
+            await self.send_to_trader(trader_id, {"type": "order_cancelled", "order_id": result["order"]})
+        return result
 
+    async def cancel_order(self, order_id: str, trader_id: str) -> Dict:
         try:
             order_id = uuid.UUID(order_id)
-        except ValueError:
+        except (TypeError, ValueError):
             logger.warning(f"Invalid order ID format: {order_id}.")
             return {"status": "failed", "reason": "Invalid order ID format"}
 
@@ -495,19 +518,60 @@ class TradingSession:
                 logger.warning(f"Order {order_id} is not active and cannot be canceled.")
                 return {"status": "failed", "reason": "Order is not active"}
 
-            self.all_orders[order_id]["status"] = OrderStatus.CANCELLED.value
-            self.all_orders[order_id]["cancellation_timestamp"] = now()
+            self.remove_order(order_id, OrderStatus.CANCELLED)
 
             return {"status": "cancel success", "order": order_id, "respond": True}
             
+    def trader_feeds(self, trader_id: str) -> FrozenSet[Feed]:
+        """The feeds a connected trader consumes: DEFAULT_FEEDS unless it declared some when registering."""
+        feeds = self.connected_traders.get(trader_id, {}).get("feeds")
+        return DEFAULT_FEEDS if feeds is None else frozenset(Feed(feed) for feed in feeds)
+
+    def connect_trader(self, trader_id: str, trader_type: str, feeds: Optional[List[str]] = None) -> None:
+        self.connected_traders[trader_id] = {"trader_type": trader_type, "feeds": feeds}
+        self.trader_responses[trader_id] = False
+        # the trade history is left out of the snapshots as long as nobody reads it
+        self.market_data.snapshot_history = any(
+            Feed.TRADES in self.trader_feeds(connected) for connected in self.connected_traders
+        )
+
+    async def handle_request_snapshot(self, data: dict) -> None:
+        """A trader that missed an update asks for the full state of the book, limited to its feeds."""
+        trader_id = data.get("trader_id")
+        feeds = self.trader_feeds(trader_id)
+        message = {
+            "type": "snapshot",
+            **self.market_data.snapshot(
+                with_history=Feed.TRADES in feeds,
+                owner_id=None if Feed.ORDERS in feeds else trader_id,
+            ),
+            "spread": self.get_current_spread(),
+            "midpoint": self.get_current_midpoint(),
+            "transaction_price": self.get_last_transaction_price(),
+        }
+        await self.send_to_trader(trader_id, message)
+        await self.send_ticker_to(trader_id)
+
+    async def send_ticker_to(self, trader_id: str) -> None:
+        """
+        The current ticker, for a trader reading it that joined or lost track since it was last
+        published: the ticker exchange only gets a new one when the top of the book changes.
+        """
+        if Feed.TICKER in self.trader_feeds(trader_id):
+            await self.send_to_trader(trader_id, {"type": "ticker", **self.market_data.ticker(self.ticker_levels)})
+
     @if_active
     async def handle_register_me(self, msg_body: Dict) -> Dict:
         trader_id = msg_body.get("trader_id")
         trader_type = msg_body.get("trader_type")
-        self.connected_traders[trader_id] = {
-            "trader_type": trader_type,
-        }
-        self.trader_responses[trader_id] = False
+        feeds = msg_body.get("feeds")
+        self.connect_trader(trader_id, trader_type, feeds)
+        if self.journal is not None:
+            self.journal.record(
+                JournalEventType.REGISTER, {"trader_id": trader_id, "trader_type": trader_type, "feeds": feeds}
+            )
+
+        await self.send_ticker_to(trader_id)
 
         logger.info(f"Trader type  {trader_type} id {trader_id} connected.")
         logger.info(f"Total connected traders: {len(self.connected_traders)}")
@@ -518,6 +582,50 @@ class TradingSession:
             individual=True,
         )
 
+    def replay_journal(self, path: str) -> None:
+        """
+        Rebuilds the connected traders, the book, the archive and the trade tape of the session from a
+        journal written by a previous run (see main_platform/journal.py). Nothing is broadcast or
+        persisted while replaying.
+        """
+        journal, self.journal = self.journal, None
+        try:
+            for event_type, payload in read_journal(path):
+                if event_type == JournalEventType.ORDER:
+                    payload.update(
+                        id=_parse_id(payload["id"]),
+                        order_type=OrderType(payload["order_type"]),
+                        timestamp=datetime.fromisoformat(payload["timestamp"]),
+                    )
+                    self.place_order(payload)
+                elif event_type == JournalEventType.CANCEL:
+                    self.remove_order(
+                        _parse_id(payload["order_id"]),
+                        OrderStatus.CANCELLED,
+                        closed_at=datetime.fromisoformat(payload["timestamp"]),
+                    )
+                elif event_type == JournalEventType.REGISTER:
+                    self.connect_trader(payload["trader_id"], payload["trader_type"], payload.get("feeds"))
+                elif event_type == JournalEventType.FILL:
+                    timestamp = datetime.fromisoformat(payload["timestamp"])
+                    bid_order_id = _parse_id(payload["bid_order_id"])
+                    ask_order_id = _parse_id(payload["ask_order_id"])
+                    self.remove_order(ask_order_id, OrderStatus.EXECUTED, closed_at=timestamp)
+                    self.remove_order(bid_order_id, OrderStatus.EXECUTED, closed_at=timestamp)
+                    self.trade_tape.append(TransactionModel(
+                        id=_parse_id(payload["id"]),
+                        trading_session_id=payload["trading_session_id"],
+                        bid_order_id=bid_order_id,
+                        ask_order_id=ask_order_id,
+                        price=payload["price"],
+                        timestamp=timestamp,
+                    ))
+        finally:
+            self.journal = journal
+        logger.info(
+            f"Trading System {self.id} replayed {path}: {len(self.book)} active orders, {len(self.trade_tape)} transactions"
+        )
+
     async def on_individual_message(self, message: Dict) -> None:
         incoming_message = json.loads(message.body.decode())
         logger.info(f"TS {self.id} received message: {incoming_message}")
@@ -536,7 +644,7 @@ class TradingSession:
                     if not result.get("individual", False):
                         # Determine the appropriate message type based on the action
                         message_type = f"{action.upper()}"
-                        await self.send_broadcast(
+                        await self.request_broadcast(
                             message=dict(text=f"{action} update processed"),
                             message_type=message_type,
                             incoming_message=incoming_message,
@@ -550,7 +658,8 @@ class TradingSession:
     async def close_existing_book(self) -> None:
         """we create a counteroffer on behalf of the platform with a get_closure_price price. and then we
         create a transaction out of it."""
-        for order_id, order in self.active_orders.items():
+        fills = defaultdict(list)
+        for order_id, order in list(self.active_orders.items()):
             platform_order_type = (
                 OrderType.ASK.value
                 if order["order_type"] == OrderType.BID
@@ -564,6 +673,7 @@ class TradingSession:
                 price=closure_price,
                 status=OrderStatus.BUFFERED.value,
                 session_id=self.id,
+                timestamp=self.clock.now(),
             )
 
             self.place_order(platform_order.model_dump())
@@ -575,7 +685,9 @@ class TradingSession:
                 await self.create_transaction(
                     platform_order.model_dump(), order, closure_price
                 )
+            fills[order["trader_id"]].append(fill_of(order, closure_price))
 
+        await self.send_fills(fills)
         await self.send_broadcast(message=dict(text="book is updated"))
 
     async def handle_inventory_report(self, data: dict) -> Dict:
@@ -598,6 +710,7 @@ class TradingSession:
                 price=closure_price,
                 status=OrderStatus.BUFFERED.value,
                 session_id=self.id,
+                timestamp=self.clock.now(),
             )
             trader_order = Order(
                 trader_id=trader_id, order_type=trader_order_type, **proto_order
@@ -621,29 +734,17 @@ class TradingSession:
                     closure_price,
                 )
 
-            traders_to_transactions_lookup = defaultdict(list)
-            trader_order = trader_order.model_dump()
-            traders_to_transactions_lookup[trader_id].append(
-                {
-                    "id": trader_order["id"],
-                    "price": trader_order["price"],
-                    "type": trader_order["order_type"],
-                    "amount": trader_order["amount"],
-                }
-            )
+            await self.send_fills({trader_id: [fill_of(trader_order.model_dump(), closure_price)]})
 
     async def wait_for_traders(self) -> None:
         while not all(self.trader_responses.values()):
-            await asyncio.sleep(1)  # Check every second
+            await self.clock.sleep(1)  # Check every second
         logger.info("All traders have reported back their inventories.")
 
     async def run(self) -> None:
         try:
             while not self._stop_requested.is_set():
-                self.transaction_processor_task = asyncio.create_task(
-                    self.process_transactions()
-                )
-                current_time = now()
+                current_time = self.clock.now()
                 if current_time - self.start_time > timedelta(minutes=self.duration):
                     logger.critical("Time limit reached, stopping...")
                     self.active = False  # here we stop accepting all incoming requests on placing new orders, cancelling etc.
@@ -654,7 +755,7 @@ class TradingSession:
                     await self.send_broadcast({"type": "closure"})
 
                     break
-                await asyncio.sleep(1)
+                await self.clock.sleep(1)
             logger.critical("Exited the run loop.")
         except asyncio.CancelledError:
             logger.info(
@@ -668,3 +769,27 @@ class TradingSession:
             raise
         finally:
             await self.clean_up()
+
+
+def without_session_fields(order_data: Dict) -> Dict:
+    """The order as sent by a trader, without the fields the session sets itself (e.g. a client timestamp)."""
+    return {key: value for key, value in order_data.items() if key not in ("status", "session_id", "timestamp")}
+
+
+def fill_of(order: Dict, transaction_price: float) -> Dict:
+    """What the owner of an executed order is told about the execution."""
+    return {
+        "id": order["id"],
+        "price": transaction_price,
+        "type": "bid" if order["order_type"] == OrderType.BID else "ask",
+        "amount": order["amount"],
+        "trader_id": order["trader_id"],
+    }
+
+
+def _parse_id(value: str):
+    """Order ids are UUIDs, except for hand-made ones (e.g. in tests) that are kept as they are."""
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return value
@@ -0,0 +1,197 @@
+"""
+Transports the trading session, the traders and the message broker talk through.
+
+A transport declares fanout and direct exchanges, subscribes callbacks to them and publishes dicts.
+Callbacks get messages with a JSON encoded `body`, like aio_pika's IncomingMessage, so handlers
+don't care which transport delivered them.
+
+- RabbitMQTransport goes through RabbitMQ, for sessions whose traders run in other processes.
+- InProcessTransport goes through an InProcessBus shared by everyone in the same event loop. There
+  is no broker: a message is encoded once per publish and the same bytes are handed to every
+  subscriber. Queues are consumed one message at a time, in publish order.
+"""
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aio_pika
+
+from main_platform.custom_logger import setup_custom_logger
+from main_platform.utils import CustomEncoder
+from structures import ExchangeType
+
+rabbitmq_url = os.getenv("RABBITMQ_URL", "amqp://localhost")
+logger = setup_custom_logger(__name__)
+
+Callback = Callable[[Any], Awaitable[None]]  # gets an object with the encoded message as .body
+
+
+def encode(message: Dict) -> bytes:
+    return json.dumps(message, cls=CustomEncoder).encode()
+
+
+class Transport(ABC):
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Removes the subscriptions of this transport and closes its connection."""
+
+    @abstractmethod
+    async def declare_exchange(self, name: str, exchange_type: ExchangeType) -> None:
+        ...
+
+    @abstractmethod
+    async def subscribe(self, exchange: str, callback: Callback, routing_key: Optional[str] = None,
+                        queue_name: str = "") -> None:
+        """
+        Binds a queue to the exchange and consumes it with the callback. An empty queue_name makes
+        a private queue; routing_key only matters for direct exchanges (it defaults to queue_name).
+        """
+
+    @abstractmethod
+    async def publish(self, exchange: str, message: Dict, routing_key: str = "") -> None:
+        ...
+
+
+class RabbitMQTransport(Transport):
+    def __init__(self, url: str = None):
+        self.url = url or rabbitmq_url
+        self.connection = None
+        self.channel = None
+        self._exchanges: Dict[str, aio_pika.abc.AbstractExchange] = {}
+        self._bindings: List[Tuple[aio_pika.abc.AbstractQueue, aio_pika.abc.AbstractExchange]] = []
+
+    async def connect(self) -> None:
+        self.connection = await aio_pika.connect_robust(self.url)
+        self.channel = await self.connection.channel()
+
+    async def close(self) -> None:
+        try:
+            # auto_delete should take care of it, but unbinding makes it immediate
+            for queue, exchange in self._bindings:
+                await queue.unbind(exchange)
+            self._bindings.clear()
+            if self.channel:
+                await self.channel.close()
+            if self.connection:
+                await self.connection.close()
+        except Exception as e:
+            logger.error(f"An error occurred while closing the RabbitMQ transport: {e}")
+
+    async def declare_exchange(self, name: str, exchange_type: ExchangeType) -> None:
+        self._exchanges[name] = await self.channel.declare_exchange(
+            name, aio_pika.ExchangeType(exchange_type.value), auto_delete=True
+        )
+
+    async def subscribe(self, exchange: str, callback: Callback, routing_key: Optional[str] = None,
+                        queue_name: str = "") -> None:
+        queue = await self.channel.declare_queue(queue_name, auto_delete=True)
+        await queue.bind(self._exchanges[exchange], routing_key=routing_key)
+        await queue.consume(callback)
+        self._bindings.append((queue, self._exchanges[exchange]))
+
+    async def publish(self, exchange: str, message: Dict, routing_key: str = "") -> None:
+        if exchange not in self._exchanges:
+            self._exchanges[exchange] = await self.channel.get_exchange(exchange)
+        await self._exchanges[exchange].publish(aio_pika.Message(body=encode(message)), routing_key=routing_key)
+
+
+class InProcessMessage:
+    __slots__ = ("body", "routing_key")
+
+    def __init__(self, body: bytes, routing_key: str):
+        self.body = body
+        self.routing_key = routing_key
+
+
+class _Subscription:
+    def __init__(self, routing_key: str, callback: Callback):
+        self.routing_key = routing_key
+        self.callback = callback
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.callback(message)
+            except Exception as e:
+                logger.error(f"Subscriber failed to handle a message: {e}")
+
+
+class InProcessBus:
+    """The exchanges shared by all the InProcessTransports of one event loop."""
+
+    def __init__(self):
+        self.exchanges: Dict[str, ExchangeType] = {}
+        self.subscriptions: Dict[str, List[_Subscription]] = defaultdict(list)
+
+    def transport(self) -> "InProcessTransport":
+        return InProcessTransport(self)
+
+    def route(self, exchange: str, body: bytes, routing_key: str) -> None:
+        exchange_type = self.exchanges.get(exchange)
+        if exchange_type is None:
+            logger.warning(f"Message published to unknown exchange {exchange} was dropped")
+            return
+        message = InProcessMessage(body, routing_key)
+        for subscription in self.subscriptions[exchange]:
+            if exchange_type == ExchangeType.FANOUT or subscription.routing_key == routing_key:
+                subscription.queue.put_nowait(message)
+
+    def unsubscribe(self, exchange: str, subscription: _Subscription) -> None:
+        subscription.task.cancel()
+        subscriptions = self.subscriptions[exchange]
+        subscriptions.remove(subscription)
+        if not subscriptions:
+            # same as auto_delete exchanges: gone when their last queue is unbound
+            del self.subscriptions[exchange]
+            self.exchanges.pop(exchange, None)
+
+    def release(self, exchange: str) -> None:
+        """Drops a declared exchange nobody is subscribed to, e.g. a ticker that never had readers."""
+        if not self.subscriptions.get(exchange):
+            self.exchanges.pop(exchange, None)
+
+
+class InProcessTransport(Transport):
+    def __init__(self, bus: InProcessBus):
+        self.bus = bus
+        self._subscriptions: List[Tuple[str, _Subscription]] = []
+        self._declared: List[str] = []
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        for exchange, subscription in self._subscriptions:
+            self.bus.unsubscribe(exchange, subscription)
+        self._subscriptions.clear()
+        for exchange in self._declared:
+            self.bus.release(exchange)
+        self._declared.clear()
+
+    async def declare_exchange(self, name: str, exchange_type: ExchangeType) -> None:
+        declared = self.bus.exchanges.setdefault(name, exchange_type)
+        if declared != exchange_type:
+            raise ValueError(f"Exchange {name} is already declared as {declared.value}")
+        self._declared.append(name)
+
+    async def subscribe(self, exchange: str, callback: Callback, routing_key: Optional[str] = None,
+                        queue_name: str = "") -> None:
+        if exchange not in self.bus.exchanges:
+            raise ValueError(f"Exchange {exchange} is not declared")
+        subscription = _Subscription(routing_key if routing_key is not None else queue_name, callback)
+        self.bus.subscriptions[exchange].append(subscription)
+        self._subscriptions.append((exchange, subscription))
+
+    async def publish(self, exchange: str, message: Dict, routing_key: str = "") -> None:
+        self.bus.route(exchange, encode(message), routing_key)
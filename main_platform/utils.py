@@ -186,6 +186,163 @@ def convert_to_book_format_new(input_data, levels_n=10, default_price=2000):
     """
     Convert a dictionary with 'bids' and 'asks' lists to a book format.
 
+    Parameters:
+        input_data (dict): Dictionary containing 'bids' and 'asks', each a list of dictionaries with 'x' for price and 'y' for amount.
+        levels_n (int, optional): Number of levels to include in the book for both bids and asks. Default is 10.
+        default_price (int, optional): Default price to use for expanding the DataFrame if needed. Default is 2000.
+
+    Returns:
+        np.ndarray: Interleaved array of ask prices, ask quantities, bid prices, and bid quantities.
+    """
+    interleaved_array = np.empty(4 * levels_n, dtype=np.float64)
+    interleaved_array[0::4], interleaved_array[1::4] = get_book_side(input_data['asks'], levels_n, reverse=False,
+                                                                     default_price=default_price)
+    interleaved_array[2::4], interleaved_array[3::4] = get_book_side(input_data['bids'], levels_n, reverse=True,
+                                                                     default_price=default_price - 1)
+    return interleaved_array
+
+
+def get_book_side(levels, levels_n=10, reverse=False, default_price=0, step=1):
+    """
+    The levels_n price levels and amounts of one side of a book ('x' for price and 'y' for amount),
+    best first, aggregated per price and expanded as in expand_dataframe.
+    """
+    if levels:
+        raw = np.array([(level['x'], level['y']) for level in levels], dtype=np.float64).astype(np.int64)
+        prices, inverse = np.unique(raw[:, 0], return_inverse=True)
+        amounts = np.bincount(inverse, weights=raw[:, 1])
+        if reverse:
+            prices, amounts = prices[::-1], amounts[::-1]
+        prices, amounts = prices[:levels_n], amounts[:levels_n]
+    else:
+        prices, amounts = np.array([default_price]), np.zeros(1)
+
+    missing = levels_n - len(prices)
+    if missing <= 0:
+        return prices, amounts
+    if reverse:
+        # the new levels go below the worst one
+        return (np.concatenate([prices, prices[-1] - step * np.arange(1, missing + 1)]),
+                np.concatenate([amounts, np.zeros(missing)]))
+    # the new levels fill the free prices above the best one
+    grid = prices[0] + step * np.arange(1, levels_n + 1)
+    extra = grid[~(grid[:, None] == prices).any(axis=1)][:missing]
+    prices = np.concatenate([prices, extra])
+    order = np.argsort(prices, kind='stable')
+    return prices[order], np.concatenate([amounts, np.zeros(missing)])[order]
+
+
+def convert_to_book_format_batch(books, levels_n=10, default_price=2000):
+    """
+    convert_to_book_format_new for many books at once.
+
+    Parameters:
+        books (list): Dictionaries with 'bids' and 'asks', as for convert_to_book_format_new.
+        levels_n (int, optional): Number of levels to include in the book for both bids and asks. Default is 10.
+        default_price (int, optional): Default price to use for expanding the levels if needed. Default is 2000.
+
+    Returns:
+        np.ndarray: One row per book, of shape (len(books), 4 * levels_n).
+    """
+    result = np.empty((len(books), 4 * levels_n), dtype=np.float64)
+    for side, column, reverse, side_default in (('asks', 0, False, default_price),
+                                                ('bids', 2, True, default_price - 1)):
+        book_ids, prices, amounts = [], [], []
+        for i, book in enumerate(books):
+            for level in book[side] or ():
+                book_ids.append(i)
+                prices.append(level['x'])
+                amounts.append(level['y'])
+        level_prices, level_amounts = aggregate_levels(
+            np.asarray(book_ids, dtype=np.int64),
+            np.asarray(prices, dtype=np.float64).astype(np.int64),
+            np.asarray(amounts, dtype=np.float64).astype(np.int64),
+            n_books=len(books),
+            reverse=reverse,
+        )
+        level_prices, level_amounts = expand_levels(level_prices, level_amounts, max_depth=levels_n, step=1,
+                                                    reverse=reverse, default_price=side_default)
+        result[:, column::4] = level_prices
+        result[:, column + 1::4] = level_amounts
+    return result
+
+
+def aggregate_levels(book_ids, prices, amounts, n_books, reverse=False):
+    """
+    Sums the amounts per price of one side of many books.
+
+    Returns:
+        tuple: (prices, amounts) arrays of shape (n_books, deepest book), best price first (descending
+        if reverse), padded with nan prices and 0 amounts.
+    """
+    order = np.lexsort((-prices if reverse else prices, book_ids))
+    book_ids, prices, amounts = book_ids[order], prices[order], amounts[order]
+    first = np.ones(len(book_ids), dtype=bool)
+    first[1:] = (book_ids[1:] != book_ids[:-1]) | (prices[1:] != prices[:-1])
+    starts = np.flatnonzero(first)
+    book_ids, prices = book_ids[starts], prices[starts]
+    amounts = np.add.reduceat(amounts, starts) if len(starts) else amounts
+
+    depths = np.bincount(book_ids, minlength=n_books)
+    ranks = np.arange(len(book_ids)) - np.searchsorted(book_ids, book_ids)
+    level_prices = np.full((n_books, max(depths.max(initial=0), 1)), np.nan)
+    level_amounts = np.zeros(level_prices.shape)
+    level_prices[book_ids, ranks] = prices
+    level_amounts[book_ids, ranks] = amounts
+    return level_prices, level_amounts
+
+
+def expand_levels(prices, amounts, max_depth=10, step=1, reverse=False, default_price=0):
+    """
+    expand_dataframe on arrays, for many books at once.
+
+    Parameters:
+        prices (np.ndarray): Price levels of one side, one book per row, best first (descending if
+            reverse), padded with nan.
+        amounts (np.ndarray): Amounts of these levels.
+        max_depth, step, reverse, default_price: as for expand_dataframe.
+
+    Returns:
+        tuple: (prices, amounts) of shape (n_books, max_depth).
+    """
+    prices = np.array(prices[:, :max_depth], dtype=np.float64)
+    amounts = np.array(amounts[:, :max_depth], dtype=np.float64)
+    depths = np.count_nonzero(~np.isnan(prices), axis=1)
+    empty = depths == 0
+    prices[empty, 0] = default_price
+    amounts[empty, 0] = 0
+    depths[empty] = 1
+
+    if prices.shape[1] < max_depth:
+        prices = np.concatenate([prices, np.full((len(prices), max_depth - prices.shape[1]), np.nan)], axis=1)
+        amounts = np.concatenate([amounts, np.zeros((len(amounts), max_depth - amounts.shape[1]))], axis=1)
+    missing = max_depth - depths
+    slots = np.arange(max_depth)
+
+    if reverse:
+        # bids: the new levels go below the worst one
+        last = prices[np.arange(len(prices)), depths - 1]
+        new = slots >= depths[:, None]
+        prices = np.where(new, last[:, None] - (slots - depths[:, None] + 1) * step, prices)
+        amounts = np.where(new, 0, amounts)
+        return prices, amounts
+
+    # asks: the new levels fill the free prices above the best one
+    grid = prices[:, :1] + (slots + 1) * step
+    free = ~(grid[:, :, None] == prices[:, None, :]).any(axis=2)
+    chosen = free & (np.cumsum(free, axis=1) <= missing[:, None])
+    candidates = np.concatenate([np.where(np.isnan(prices), np.inf, prices), np.where(chosen, grid, np.inf)], axis=1)
+    order = np.argsort(candidates, axis=1, kind='stable')[:, :max_depth]
+    prices = np.take_along_axis(candidates, order, axis=1)
+    amounts = np.take_along_axis(np.concatenate([amounts, np.zeros_like(amounts)], axis=1), order, axis=1)
+    return prices, amounts
+
+
+def convert_to_book_format_polars(input_data, levels_n=10, default_price=2000):
+    """
+    Convert a dictionary with 'bids' and 'asks' lists to a book format, with Polars. This is the
+    reference for convert_to_book_format_new, which gives the same result with numpy only.
+
     Parameters:
         input_data (dict): Dictionary containing 'bids' and 'asks', each a list of dictionaries with 'x' for price and 'y' for amount.
         levels_n (int, optional): Number of levels to include in the book for both bids and asks. Default is 10.
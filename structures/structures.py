@@ -67,6 +67,11 @@ class TraderCreationData(BaseModel):
         title="Noise Trader: Order Amount",
         description="Order amount for noise traders",
     )
+    noise_crowd: bool = Field(
+        default=False,
+        title="Noise Trader: Crowd",
+        description="Simulate all the noise traders in a single agent sharing one connection",
+    )
     passive_order_probability: float = Field(
         default=0.7,
         title="Noise Trader: Passive Order Probability",
@@ -108,6 +113,18 @@ class TraderCreationData(BaseModel):
         title="Order Book Levels",
         description="Numbers of levels in order book",
     )
+    seed: Optional[int] = Field(
+        default=None,
+        title="Random Seed",
+        description="Seed of the random streams of the simulated traders (empty for a fresh one every session)",
+        ge=0,
+    )
+    conflation_window: Optional[float] = Field(
+        default=None,
+        title="Broadcast Conflation Window",
+        description="Seconds within which book updates are coalesced into one broadcast (0 for one event loop tick, empty for no conflation)",
+        ge=0,
+    )
 
 
 class LobsterEventType(IntEnum):
@@ -124,13 +141,44 @@ class LobsterEventType(IntEnum):
     TRADING_HALT = 7
 
 
+class JournalEventType(IntEnum):
+    """Types of the records of the trading session journal (see main_platform/journal.py)."""
+
+    ORDER = 1
+    CANCEL = 2
+    REGISTER = 3
+    FILL = 4
+
+
 class ActionType(str, Enum):
     POST_NEW_ORDER = "add_order"
+    POST_NEW_ORDERS = "add_orders"
     CANCEL_ORDER = "cancel_order"
     UPDATE_BOOK_STATUS = "update_book_status"
     REGISTER = "register_me"
 
 
+class ExchangeType(str, Enum):
+    """Kinds of exchanges a transport routes messages through (see main_platform/transport.py)."""
+
+    FANOUT = "fanout"  # every bound queue gets every message
+    DIRECT = "direct"  # only the queues bound with the routing key of the message
+
+
+class Feed(str, Enum):
+    """Parts of the market data a trader consumes (see BaseTrader.feeds)."""
+
+    BOOK = "book"  # aggregated price levels
+    TICKER = "ticker"  # top of the book, on its own exchange
+    ORDERS = "orders"  # every resting order
+    OWN_ORDERS = "own_orders"  # the resting orders of the trader
+    TRADES = "trades"  # trade history of the session
+
+
+# the feeds of the traders that don't declare theirs: everything but the ticker
+DEFAULT_FEEDS = frozenset({Feed.BOOK, Feed.ORDERS, Feed.OWN_ORDERS, Feed.TRADES})
+
+
 class OrderType(IntEnum):
     ASK = -1  # the price a seller is willing to accept for a security
     BID = 1  # the price a buyer is willing to pay for a security
@@ -164,6 +212,7 @@ class Order(BaseModel):
     timestamp: datetime = Field(default_factory=now)
     session_id: str
     trader_id: str
+    client_order_id: Optional[str] = None  # free tag of the trader, reported back with the order
 
     class ConfigDict:
         use_enum_values = True
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from analysis.benchmark_book_format import random_books
+from main_platform.utils import (convert_to_book_format_batch, convert_to_book_format_new,
+                                 convert_to_book_format_polars)
+
+
+@pytest.mark.parametrize("levels_n", [10, 5, 1])
+def test_numpy_book_format_matches_polars(levels_n):
+    books = random_books(300, seed=levels_n)
+    books.append({'bids': [], 'asks': []})
+    books.append({'bids': None, 'asks': [{'x': 2000.7, 'y': 1.}, {'x': 2000.2, 'y': 2.}]})
+
+    expected = np.array([convert_to_book_format_polars(book, levels_n=levels_n) for book in books])
+
+    for book, row in zip(books, expected):
+        assert np.array_equal(convert_to_book_format_new(book, levels_n=levels_n), row)
+    assert np.array_equal(convert_to_book_format_batch(books, levels_n=levels_n), expected)
+
+
+def test_gaps_are_filled_above_the_best_ask():
+    book = {'bids': [{'x': 1998, 'y': 1}], 'asks': [{'x': 2001, 'y': 1}, {'x': 2003, 'y': 2}, {'x': 2001, 'y': 1}]}
+    result = convert_to_book_format_new(book, levels_n=4)
+    assert result[0::4].tolist() == [2001, 2002, 2003, 2004]
+    assert result[1::4].tolist() == [2, 0, 2, 0]
+    assert result[2::4].tolist() == [1998, 1997, 1996, 1995]
+    assert convert_to_book_format_batch([], levels_n=4).shape == (0, 16)
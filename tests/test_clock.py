@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from main_platform import TradingSession
+from main_platform.clock import Clock, VirtualClock, VirtualTimeEventLoop
+from main_platform.persistence import BatchWriter
+from main_platform.transport import InProcessBus
+from structures import OrderType, TraderType
+from traders.base_trader import BaseTrader
+
+
+def test_virtual_clock_skips_idle_time():
+    clock = VirtualClock()
+
+    async def main():
+        started = clock.now()
+        await asyncio.gather(clock.sleep(60), clock.sleep(15 * 60), clock.sleep(0.5))
+        return clock.now() - started
+
+    wall_started = time.perf_counter()
+    elapsed = clock.run(main())
+
+    assert elapsed.total_seconds() == 15 * 60
+    assert clock.time() == 15 * 60
+    assert time.perf_counter() - wall_started < 1, "Nobody waits for the timers"
+
+
+def test_session_runs_to_closure_in_virtual_time():
+    clock = VirtualClock()
+    bus = InProcessBus()
+    session = TradingSession(duration=5, transport=bus.transport(), clock=clock)
+    trader = BaseTrader(TraderType.NOISE, transport=bus.transport(), clock=clock)
+
+    async def main():
+        await session.initialize()
+        await trader.initialize()
+        await trader.connect_to_session(session.id)
+        await trader.post_new_order(1, 100, OrderType.BID)
+        await session.run()
+
+    with patch.object(BatchWriter, "_insert_many"):
+        clock.run(main())
+
+    assert clock.time() >= 5 * 60, "The whole session is simulated"
+    assert session.trader_responses[trader.id], "The trader reported its inventory"
+    assert len(session.transactions) == 1, "The open bid is closed by the platform"
+    assert session.transactions[0]["timestamp"] - session.start_time >= timedelta(minutes=5), "Stamped in virtual time"
+
+
+def test_virtual_time_event_loop():
+    clock = VirtualClock()
+
+    async def main():
+        assert isinstance(asyncio.get_running_loop(), VirtualTimeEventLoop)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.Event().wait(), timeout=30)
+        return asyncio.get_running_loop().time()
+
+    assert clock.run(main()) == clock.time() == 30, "wait_for times out on virtual time"
+    with pytest.raises(TypeError):
+        Clock()
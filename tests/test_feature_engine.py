@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from external_traders.feature_engine import FeatureEngine
+from external_traders.lob_simulator import get_lob_settings, run_simulation
+from external_traders.noise_trader import ewma_update, get_features_new, get_features_update
+
+settings_noise = {'pr_order': 1, 'pr_passive': .7, 'pr_bid': .5, 'pr_cancel': .2, 'max_size_level': 3}
+
+
+@pytest.fixture
+def settings():
+    settings = get_lob_settings(levels_n=5)
+    settings['alphas_ewma'] = [0., .5, .95, .98]
+    return settings
+
+
+@pytest.fixture
+def books(settings):
+    books, _ = run_simulation(300, settings, settings_noise, seed=3)
+    return books
+
+
+def test_ewma_update_broadcasts_over_alphas():
+    alphas = np.array([[0.], [.5]])
+    state = ewma_update(np.ones((2, 3)), np.array([3., 3., 3.]), alphas)
+    assert state.tolist() == [[3., 3., 3.], [2., 2., 2.]]
+
+
+def test_engine_keeps_history_and_matches_get_features_update(settings, books):
+    engine = FeatureEngine(settings)
+    features_state = None
+    for t in range(1, 50):
+        engine.update_book(books[t - 1:t + 1])
+        features_state = get_features_update(features_state, books[t - 1:t + 1], None, settings)
+
+    assert engine.state.shape == (4, 2 * 5 + 2)
+    assert len(engine.cols_state) == engine.state.size
+    assert np.allclose(engine.features_state(), features_state), "Same ewma as the functional interface"
+    assert np.allclose(engine.state[0], get_features_new(books[48:50], settings)[-1]), "alpha 0 is the latest features"
+    assert not np.allclose(engine.state[3], 0), "The history is kept between updates"
+
+
+def test_update_batch_matches_one_update_per_book(settings, books):
+    one_by_one = FeatureEngine(settings)
+    for t in range(1, len(books)):
+        one_by_one.update_book(books[t - 1:t + 1])
+
+    batched = FeatureEngine(settings)
+    history = FeatureEngine(settings).update_batch(books, return_history=True)
+    batched.update_batch(books[:100])
+    batched.update_batch(books[99:])
+
+    assert batched.n_updates == one_by_one.n_updates == len(books) - 1
+    assert np.allclose(batched.state, one_by_one.state)
+    assert np.allclose(history[-1], one_by_one.state)
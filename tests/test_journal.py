@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import AsyncMock
+from main_platform import TradingSession
+from main_platform.journal import read_journal
+from structures import JournalEventType, Order, OrderStatus, OrderType, TraderType
+
+
+def make_order(session, order_type, price, trader_id):
+    return Order(
+        status=OrderStatus.BUFFERED.value,
+        session_id=session.id,
+        trader_id=trader_id,
+        order_type=order_type,
+        price=price,
+    ).model_dump()
+
+
+@pytest.mark.asyncio
+async def test_replay_rebuilds_book_archive_and_tape(tmp_path):
+    path = str(tmp_path / "session.journal")
+    session = TradingSession(duration=1, journal_path=path)
+    session.active = True
+    session.transport = AsyncMock()
+    await session.handle_register_me({"trader_id": "t1", "trader_type": TraderType.NOISE.value})
+    await session.handle_register_me({"trader_id": "t2", "trader_type": TraderType.NOISE.value})
+
+    ask = session.place_order(make_order(session, OrderType.ASK, 100, "t1"))
+    session.place_order(make_order(session, OrderType.ASK, 105, "t1"))
+    cancelled = session.place_order(make_order(session, OrderType.BID, 90, "t2"))
+    session.remove_order(cancelled["id"], OrderStatus.CANCELLED)
+    session.place_order(make_order(session, OrderType.BID, 110, "t2"))
+    await session.clear_orders()
+    session.journal.close()
+
+    events = [event_type for event_type, _ in read_journal(path)]
+    assert events.count(JournalEventType.ORDER) == 4
+    assert events.count(JournalEventType.FILL) == 1
+
+    replayed = TradingSession(duration=1)
+    replayed.replay_journal(path)
+
+    assert replayed.connected_traders == session.connected_traders
+    assert replayed.all_orders == session.all_orders
+    assert replayed.order_book == session.order_book
+    assert replayed.archive.to_dicts() == session.archive.to_dicts()
+    assert replayed.transactions == session.transactions
+    assert replayed.get_order(ask["id"])["status"] == OrderStatus.EXECUTED.value
+
+
+def test_truncated_record_ends_the_journal(tmp_path):
+    path = str(tmp_path / "session.journal")
+    session = TradingSession(duration=1, journal_path=path)
+    session.place_order(make_order(session, OrderType.BID, 100, "t1"))
+    session.place_order(make_order(session, OrderType.BID, 101, "t1"))
+    session.journal.close()
+
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)
+
+    assert len(list(read_journal(path))) == 1
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from external_traders import lob_kernels
+from external_traders.lob_kernels import PY_KERNELS
+
+pytestmark = pytest.mark.skipif(lob_kernels.numba is None, reason="numba is not installed")
+
+LEVELS_N = 10
+
+
+def random_sides(rng):
+    """A bid and an ask grid around a random best bid, with some empty levels."""
+    best_bid = float(rng.integers(90, 110))
+    bid_prices = best_bid - np.arange(LEVELS_N, dtype=np.float64)
+    ask_prices = best_bid + 1 + np.arange(LEVELS_N, dtype=np.float64)
+    bid_sizes = rng.integers(0, 4, LEVELS_N).astype(np.float64)
+    ask_sizes = rng.integers(0, 4, LEVELS_N).astype(np.float64)
+    return bid_prices, bid_sizes, ask_prices, ask_sizes
+
+
+def assert_same(result, expected):
+    if isinstance(expected, tuple):
+        assert len(result) == len(expected)
+        for r, e in zip(result, expected):
+            assert_same(r, e)
+    else:
+        np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compiled_kernels_match_python(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        bid_prices, bid_sizes, ask_prices, ask_sizes = random_sides(rng)
+        price = float(bid_prices[0] + rng.integers(-LEVELS_N - 2, LEVELS_N + 3))
+        size = float(rng.integers(-3, 8))
+        max_size_level = float(rng.integers(0, 5))
+        cases = {
+            "get_noise_condition_price": [(bid_prices, bid_sizes, max_size_level),
+                                          (ask_prices, ask_sizes, max_size_level)],
+            "get_exec_sell_trd": [(bid_prices, bid_sizes, price, abs(size))],
+            "get_exec_buy_trd": [(ask_prices, ask_sizes, price, abs(size))],
+            "get_insert_sell": [(ask_prices, ask_sizes, price, size)],
+            "get_insert_buy": [(bid_prices, bid_sizes, price, size)],
+            "get_shift_sell": [(ask_prices, ask_sizes)],
+            "get_shift_buy": [(bid_prices, bid_sizes)],
+        }
+        for name, calls in cases.items():
+            for args in calls:
+                expected = PY_KERNELS[name](*args)
+                assert_same(getattr(lob_kernels, name)(*args), expected)
+        assert list(bid_prices) == list(bid_prices[0] - np.arange(LEVELS_N)), "Inputs are not modified"
+
+
+@pytest.mark.skipif(lob_kernels.numba is not None and lob_kernels.numba.config.DISABLE_JIT,
+                    reason="NUMBA_DISABLE_JIT is set")
+def test_kernels_are_compiled():
+    for name, kernel in PY_KERNELS.items():
+        assert getattr(lob_kernels, name) is not kernel, f"{name} is not compiled"
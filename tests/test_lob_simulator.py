@@ -0,0 +1,53 @@
+import numpy as np
+from external_traders.informed_naive import update_settings_informed
+from external_traders.lob_kernels import (get_exec_sell_trd, get_insert_buy,
+                                          get_insert_sell, get_shift_buy)
+from external_traders.lob_simulator import get_lob_settings, run_simulation
+
+settings_noise = {'pr_order': 1, 'pr_passive': .7, 'pr_bid': .5, 'pr_cancel': .2, 'max_size_level': 3}
+
+
+def test_exec_walks_the_levels():
+    bid_prices = np.array([100., 99., 98.])
+    bid_sizes = np.array([1., 2., 5.])
+
+    sizes, exec_price, exec_size = get_exec_sell_trd(bid_prices, bid_sizes, 99., 5.)
+
+    assert list(sizes) == [0., 0., 5.], "Does not go below the limit price"
+    assert exec_size == 3.
+    assert exec_price == (100. + 2 * 99.) / 3
+    assert list(bid_sizes) == [1., 2., 5.], "Inputs are not modified"
+    assert np.isnan(get_exec_sell_trd(bid_prices, bid_sizes, 101., 1.)[1])
+
+
+def test_insert_and_shift_keep_the_grid():
+    prices, sizes = get_insert_sell(np.array([101., 102., 103.]), np.array([1., 0., 2.]), 99., 4.)
+    assert list(prices) == [99., 100., 101.]
+    assert list(sizes) == [4., 0., 1.]
+
+    prices, sizes = get_insert_buy(np.array([100., 99., 98.]), np.array([1., 0., 2.]), 100., -1.)
+    prices, sizes = get_shift_buy(prices, sizes)
+    assert list(prices) == [98., 97., 96.]
+    assert list(sizes) == [2., 0., 0.]
+
+
+def test_simulation_is_consistent_and_seeded():
+    settings = get_lob_settings(levels_n=5)
+    settings_informed, informed_time_plan, informed_state = update_settings_informed({
+        'time_period_in_min': 5, 'NoiseTrader_frequency_activity': 1,
+        'trade_intensity': 0.1, 'direction': 'sell', 'pr_passive': 0.7,
+    })
+    books, messages = run_simulation(2000, settings, settings_noise, informed_time_plan, informed_state, seed=7)
+
+    best_bid = books[:, settings['ind_bid_price'][0]]
+    best_ask = books[:, settings['ind_ask_price'][0]]
+    assert (best_bid < best_ask).all(), "The book is never crossed"
+    assert (books[:, settings['ind_bid_size'] + settings['ind_ask_size']] >= 0).all()
+    assert informed_state['inv'] == 0, "The informed trader sold its whole inventory"
+    assert (messages[:, settings['ind_id'][0]] == 1).sum() == settings_informed['inv'], "One share at a time"
+
+    first, _ = run_simulation(500, settings, settings_noise, seed=7)
+    again, _ = run_simulation(500, settings, settings_noise, seed=7)
+    other, _ = run_simulation(500, settings, settings_noise, seed=8)
+    assert np.array_equal(first, again), "Same seed, same simulation"
+    assert not np.array_equal(first, other)
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from main_platform import TradingSession
+from main_platform.clock import VirtualClock
+from main_platform.market_data import MarketDataReplica
+from main_platform.transport import InProcessMessage
+from main_platform.utils import CustomEncoder
+from structures import Feed, OrderStatus, OrderType, TraderType
+from traders.base_trader import BaseTrader
+
+
+def make_order(order_id, order_type, price, amount=1, trader_id="t1"):
+    return {
+        "id": order_id,
+        "order_type": order_type,
+        "price": price,
+        "amount": amount,
+        "trader_id": trader_id,
+        "timestamp": None,
+        "status": OrderStatus.BUFFERED.value,
+    }
+
+
+def encode(update):
+    return json.loads(json.dumps(update, cls=CustomEncoder))
+
+
+@pytest.fixture
+def session():
+    session = TradingSession(duration=1, snapshot_interval=0)
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.NOISE.value},
+                                 "t2": {"trader_type": TraderType.NOISE.value}}
+    return session
+
+
+@pytest.mark.asyncio
+async def test_deltas_rebuild_the_book(session):
+    replica = MarketDataReplica(owner_id="t1")
+
+    session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+    session.place_order(make_order("b1", OrderType.BID.value, 1000, trader_id="t2"))
+    assert replica.apply(encode(session.market_data.next_update()))
+
+    session.place_order(make_order("b2", OrderType.BID.value, 1010, trader_id="t2"))
+    await session.clear_orders()
+    update = encode(session.market_data.next_update())
+    assert update["seq"] == 2 and not update["snapshot"]
+    assert update["orders_removed"] == ["a1"], "b2 came and went within the same update"
+    assert len(update["trades"]) == 1
+    assert replica.apply(update)
+
+    assert replica.order_book == session.order_book
+    assert list(replica.active_orders) == ["b1"]
+    assert replica.own_orders == {}
+    assert len(replica.history) == 1
+
+
+def test_gap_waits_for_snapshot(session):
+    replica = MarketDataReplica()
+    session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+    session.market_data.next_update()  # lost
+    session.place_order(make_order("a2", OrderType.ASK.value, 1011))
+    assert not replica.apply(encode(session.market_data.next_update())), "seq 2 after 0 is a gap"
+    assert replica.awaiting_snapshot
+
+    snapshot = encode(session.market_data.snapshot())
+    session.place_order(make_order("a3", OrderType.ASK.value, 1012))
+    assert replica.apply(encode(session.market_data.next_update()))  # buffered
+    assert replica.apply(snapshot)
+
+    assert replica.seq == 3
+    assert replica.order_book == session.order_book
+    assert set(replica.active_orders) == {"a1", "a2", "a3"}
+
+
+@pytest.mark.asyncio
+async def test_conflation_coalesces_book_updates():
+    session = TradingSession(duration=1, conflation_window=0)
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.NOISE.value}}
+
+    def broadcasts():
+        return [call.args[1] for call in session.transport.publish.await_args_list
+                if call.args[0] == session.broadcast_exchange_name]
+
+    with patch("main_platform.trading_platform.Message"):
+        for i in range(3):
+            session.place_order(make_order(f"a{i}", OrderType.ASK.value, 1010 + i))
+            await session.request_broadcast({}, "ADD_ORDER", {"price": 1010 + i})
+        assert len(broadcasts()) == 0
+        await asyncio.sleep(0.01)
+        assert len(broadcasts()) == 1, "One publish for the whole tick"
+
+        session.place_order(make_order("b1", OrderType.BID.value, 1010))
+        await session.clear_orders()
+        await session.request_broadcast({}, "ADD_ORDER", {"price": 1010})
+        assert session._conflation_task is None, "Transactions are published immediately"
+
+    body = broadcasts()[0]
+    assert len(body["incoming_messages"]) == 3
+    assert len(body["orders_added"]) == 3
+    body = broadcasts()[-1]
+    assert len(body["trades"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_ticker_is_published_when_the_top_changes(session):
+    session.ticker_levels = 2
+
+    def tickers():
+        return [call.args[1] for call in session.transport.publish.await_args_list
+                if call.args[0] == session.ticker_exchange_name]
+
+    with patch("main_platform.trading_platform.Message"):
+        session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+        session.place_order(make_order("a2", OrderType.ASK.value, 1012, amount=2))
+        session.place_order(make_order("b1", OrderType.BID.value, 1000, amount=3, trader_id="t2"))
+        await session.send_broadcast({})
+        session.place_order(make_order("a3", OrderType.ASK.value, 1020))
+        await session.send_broadcast({})
+        assert len(tickers()) == 1, "Nothing changed within the two best levels"
+
+        session.place_order(make_order("b2", OrderType.BID.value, 1010, trader_id="t2"))
+        await session.clear_orders()
+        await session.send_broadcast({})
+
+    first, last = map(encode, tickers())
+    assert first == {
+        "type": "ticker", "seq": 1, "levels": 2,
+        "best_bid": 1000, "bid_size": 3, "best_ask": 1010, "ask_size": 1, "mid": 1005.0, "spread": 10,
+        "bids": [[1000, 3]], "asks": [[1010, 1], [1012, 2]], "last_price": None,
+    }
+    assert last["seq"] == 3 and last["last_price"] == 1010
+    assert last["asks"] == [[1012, 2], [1020, 1]]
+
+
+@pytest.mark.asyncio
+async def test_trader_reads_the_top_from_the_ticker():
+    trader = BaseTrader(TraderType.INFORMED, transport=AsyncMock(), clock=VirtualClock())
+    trader.order_book = {"bids": [{"x": 990, "y": 1}], "asks": []}
+    assert trader.best_price(OrderType.BID) == 990, "No ticker yet, the local book is used"
+    assert trader.best_price(OrderType.ASK) is None
+
+    ticker = {"type": "ticker", "seq": 5, "levels": 2, "bids": [[1000, 3], [999, 1]], "asks": [[1010, 1]]}
+    await trader.on_ticker(InProcessMessage(json.dumps(ticker).encode(), routing_key=""))
+    await trader.on_ticker(InProcessMessage(json.dumps(dict(ticker, seq=4, bids=[])).encode(), routing_key=""))
+    assert trader.top_prices(OrderType.BID, 2) == [1000, 999], "The stale ticker is ignored"
+    assert trader.best_price(OrderType.ASK) == 1010
+    assert trader.top_prices(OrderType.BID, 3) == [990], "Deeper than the ticker, the local book is used"
+
+
+@pytest.mark.asyncio
+async def test_replica_keeps_only_its_feeds(session):
+    replica = MarketDataReplica(owner_id="t1", feeds={Feed.BOOK, Feed.OWN_ORDERS})
+    session.active = True
+    session.connected_traders = {}
+    for trader_id in ("t1", "t2"):
+        await session.handle_register_me({"trader_id": trader_id, "trader_type": TraderType.NOISE.value,
+                                          "feeds": [Feed.BOOK.value, Feed.OWN_ORDERS.value]})
+    assert session.market_data.snapshot_history is False, "Nobody reads the trade history"
+
+    session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+    session.place_order(make_order("b1", OrderType.BID.value, 1000, trader_id="t2"))
+    session.place_order(make_order("b2", OrderType.BID.value, 1010, trader_id="t2"))
+    await session.clear_orders()
+    assert replica.apply(encode(session.market_data.next_update()))
+    assert replica.order_book == session.order_book
+    assert replica.active_orders == {} and replica.history == []
+
+    session.place_order(make_order("a2", OrderType.ASK.value, 1020))
+    await session.handle_request_snapshot({"trader_id": "t1"})
+    snapshot = encode(session.transport.publish.await_args.args[1])
+    assert "history" not in snapshot
+    assert [order["id"] for order in snapshot["active_orders"]] == ["a2"], "Only the orders of t1"
+    assert replica.apply(snapshot)
+    assert list(replica.own_orders) == ["a2"]
+
+
+@pytest.mark.asyncio
+async def test_trader_tracks_own_orders_from_its_queue():
+    trader = BaseTrader(TraderType.INFORMED, transport=AsyncMock(), clock=VirtualClock())
+    order = {"id": "o1", "trader_id": trader.id, "order_type": OrderType.BID.value, "amount": 2, "price": 1000}
+    await trader.handle_order_ack({"orders": [order, dict(order, id="o2")]})
+    assert [own["id"] for own in trader.orders] == ["o1", "o2"], "Known before the next book update"
+
+    await trader.handle_transaction_update({"transactions": [
+        {"id": "o1", "price": 999, "type": "bid", "amount": 2, "trader_id": trader.id}]})
+    await trader.handle_order_cancelled({"order_id": "o2"})
+    assert trader.orders == []
+    assert trader.shares == 2
+
+
+@pytest.mark.asyncio
+async def test_snapshot_between_two_updates_does_not_repeat_trades(session):
+    replica = MarketDataReplica(owner_id="t1")
+    session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+    assert replica.apply(encode(session.market_data.next_update()))
+
+    session.place_order(make_order("b1", OrderType.BID.value, 1010, trader_id="t2"))
+    await session.clear_orders()
+    await session.handle_request_snapshot({"trader_id": "t1"})
+    snapshot = encode(session.transport.publish.await_args.args[1])
+    assert len(snapshot["history"]) == 1, "The fill is already in the snapshot"
+    assert replica.apply(snapshot)
+
+    update = encode(session.market_data.next_update())
+    assert len(update["trades"]) == 1, "and in the next delta"
+    assert replica.apply(update)
+    assert len(replica.history) == len(session.trade_tape) == 1
+
+    session.place_order(make_order("a2", OrderType.ASK.value, 1020))
+    session.place_order(make_order("b2", OrderType.BID.value, 1020, trader_id="t2"))
+    await session.clear_orders()
+    assert replica.apply(encode(session.market_data.next_update()))
+    assert len(replica.history) == 2, "The following trades are still added"
+
+
+class TickerReader(BaseTrader):
+    feeds = frozenset({Feed.TICKER, Feed.OWN_ORDERS})
+
+
+@pytest.mark.asyncio
+async def test_late_ticker_reader_gets_the_current_top(session):
+    session.active = True
+    session.place_order(make_order("a1", OrderType.ASK.value, 1010))
+    session.place_order(make_order("b1", OrderType.BID.value, 1000, trader_id="t2"))
+    with patch("main_platform.trading_platform.Message"):
+        await session.send_broadcast({})  # the last ticker goes out before the trader is there
+
+    trader = TickerReader(TraderType.INFORMED, transport=AsyncMock(), clock=VirtualClock())
+    await session.handle_register_me({"trader_id": trader.id, "trader_type": TraderType.INFORMED.value,
+                                      "feeds": [feed.value for feed in trader.feeds]})
+    exchange, message = session.transport.publish.await_args.args
+    assert exchange == session.queue_name and message["type"] == "ticker"
+
+    await trader.on_message_from_system(InProcessMessage(json.dumps(encode(message)).encode(), routing_key=""))
+    assert trader.best_price(OrderType.BID) == 1000 and trader.best_price(OrderType.ASK) == 1010
+    assert trader.market_data.seq == 0, "A ticker is not a book update"
@@ -0,0 +1,86 @@
+import asyncio
+import numpy as np
+from unittest.mock import AsyncMock, patch
+from main_platform import TradingSession
+from main_platform.clock import VirtualClock
+from main_platform.persistence import BatchWriter
+from main_platform.random_streams import RandomStream
+from main_platform.transport import InProcessBus
+from traders import NoiseCrowd
+
+settings = {'levels_n': 5, 'initial': 2000, 'step': 1}
+settings_noise = {'levels_n': 5, 'pr_passive': .7, 'pr_cancel': .1, 'pr_bid': .5, 'step': 1}
+
+
+def make_crowd(n_members, transport=None, clock=None):
+    return NoiseCrowd(n_members=n_members, activity_frequency=2, order_amount=1, settings=settings,
+                      settings_noise=settings_noise, transport=transport, clock=clock, rng=RandomStream(1))
+
+
+def test_decisions_follow_the_noise_probabilities():
+    crowd = make_crowd(10, clock=VirtualClock())
+    decisions = crowd.get_noise_orders(100_000)
+
+    assert abs(decisions['passive'].mean() - .7) < .01
+    assert abs(decisions['bid'].mean() - .5) < .01
+    assert abs(decisions['cancel'].mean() - .1) < .01
+    assert decisions['offset'].min() == 1 and decisions['offset'].max() == 4, "As random.choice(range(step, step * levels_n))"
+    assert abs(crowd.cooling_intervals(100_000).mean() - 1 / 2) < .01, "Gamma intervals of mean 1 / activity_frequency"
+
+
+def test_crowd_shares_one_connection_and_tracks_member_orders():
+    clock = VirtualClock()
+    bus = InProcessBus()
+    session = TradingSession(duration=1, transport=bus.transport(), clock=clock)
+    crowd = make_crowd(20, transport=bus.transport(), clock=clock)
+
+    async def main():
+        await session.initialize()
+        await crowd.initialize()
+        await crowd.connect_to_session(session.id)
+        await crowd.warm_up(1)
+        task = asyncio.create_task(crowd.run())
+        await clock.sleep(10)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await session.clean_up()
+
+    with patch.object(BatchWriter, "_insert_many"):
+        clock.run(main())
+
+    assert len(session.connected_traders) == 1, "One connection for all the members"
+    assert crowd.member_of, "The orders of the crowd are attributed to its members"
+    for order_id, member in crowd.member_of.items():
+        assert order_id in crowd.member_orders[member]
+        assert int(crowd.market_data.own_orders[order_id]['client_order_id'].split('-')[0]) == member
+    assert len({member for member in crowd.member_of.values()}) > 1
+    assert np.all(crowd.next_wake_up >= 10), "Every member woke up on its own schedule"
+
+
+class EarlyClock(VirtualClock):
+    """Wakes up halfway through the first sleep, and a hair early afterwards."""
+
+    def __init__(self):
+        super().__init__()
+        self.sleeps = 0
+
+    async def sleep(self, seconds):
+        self.sleeps += 1
+        await super().sleep(seconds / 2 if self.sleeps == 1 else max(seconds - 1e-12, 0))
+
+
+def test_crowd_keeps_running_when_it_wakes_up_early():
+    clock = EarlyClock()
+    crowd = make_crowd(5, transport=AsyncMock(), clock=clock)
+    crowd.order_book = {"bids": [{"x": 2000, "y": 1}], "asks": []}
+
+    async def main():
+        task = asyncio.create_task(crowd.run())
+        await VirtualClock.sleep(clock, 10)
+        running = not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return running
+
+    assert clock.run(main()), "An early wake up doesn't stop the crowd"
+    assert crowd.transport.publish.await_count > 0
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import AsyncMock
+from main_platform import TradingSession
+from main_platform.order_book import OrderBook
+from structures import OrderStatus, OrderType, TraderType
+
+
+def make_order(order_id, order_type, price, amount=1, trader_id="trader"):
+    return {
+        "id": order_id,
+        "order_type": order_type,
+        "price": price,
+        "amount": amount,
+        "trader_id": trader_id,
+        "status": OrderStatus.ACTIVE.value,
+    }
+
+
+def test_best_prices_and_fifo():
+    book = OrderBook()
+    book.add(make_order("b1", OrderType.BID.value, 1000))
+    book.add(make_order("b2", OrderType.BID.value, 1005))
+    book.add(make_order("b3", OrderType.BID.value, 1005))
+    book.add(make_order("a1", OrderType.ASK.value, 1010))
+    book.add(make_order("a2", OrderType.ASK.value, 1007))
+
+    assert book.best_bid_price == 1005
+    assert book.best_ask_price == 1007
+    assert book.best_bid()["id"] == "b2", "Oldest order at the best level goes first"
+    assert len(book) == 5
+
+
+def test_remove_updates_levels():
+    book = OrderBook()
+    book.add(make_order("b1", OrderType.BID.value, 1000))
+    book.add(make_order("b2", OrderType.BID.value, 1005))
+    book.add(make_order("b3", OrderType.BID.value, 990))
+
+    book.remove("b2")
+    assert book.best_bid_price == 1000
+    book.remove("b3")
+    assert [level.price for level in book.bids.iter_levels()] == [1000]
+    assert book.remove("missing") is None
+    book.remove("b1")
+    assert book.best_bid() is None
+    assert "b1" not in book
+
+
+def test_levels_stay_sorted_when_opened_and_emptied_anywhere():
+    book = OrderBook()
+    prices = [1003, 998, 1010, 1001, 995, 1007]
+    for i, price in enumerate(prices):
+        book.add(make_order(f"a{i}", OrderType.ASK.value, price))
+
+    book.remove("a3")  # a level in the middle of the book
+    book.remove("a4")  # the worst level
+    book.add(make_order("a6", OrderType.ASK.value, 1005))
+    assert [level.price for level in book.asks.iter_levels()] == [998, 1003, 1005, 1007, 1010]
+    assert book.best_ask_price == 998 and len(book.asks) == 5
+
+
+@pytest.mark.asyncio
+async def test_clear_orders_matches_only_crossing_orders():
+    session = TradingSession(duration=1)
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.NOISE.value},
+                                 "t2": {"trader_type": TraderType.NOISE.value}}
+    session.place_order(make_order("a1", OrderType.ASK.value, 100, trader_id="t1"))
+    session.place_order(make_order("a2", OrderType.ASK.value, 105, trader_id="t1"))
+    session.place_order(make_order("b1", OrderType.BID.value, 110, trader_id="t2"))
+    session.place_order(make_order("b2", OrderType.BID.value, 101, trader_id="t2"))
+
+    res = await session.clear_orders()
+
+    assert len(res["subgroup_broadcast"]["t1"]) == 1, "Only the first pair crosses"
+    assert session.get_order("a1")["status"] == OrderStatus.EXECUTED.value
+    assert session.get_order("b1")["status"] == OrderStatus.EXECUTED.value
+    assert set(session.all_orders) == {"a2", "b2"}, "Executed orders leave the working set"
+    assert len(session.archive) == 2
+    assert session.get_spread() == (4, 103)
+    assert len(session.transactions) == 1
+    assert session.transaction_price == 105, "Last price comes from the in-memory tape"
+
+
+def test_depth_is_aggregated_per_level():
+    book = OrderBook()
+    book.add(make_order("b1", OrderType.BID.value, 1000, amount=2))
+    book.add(make_order("b2", OrderType.BID.value, 1000, amount=3))
+    book.add(make_order("b3", OrderType.BID.value, 995))
+    book.add(make_order("a1", OrderType.ASK.value, 1010, amount=4))
+
+    assert book.depth() == {
+        "bids": [{"x": 1000, "y": 5}, {"x": 995, "y": 1}],
+        "asks": [{"x": 1010, "y": 4}],
+    }
+    book.remove("b1")
+    assert book.depth(max_levels=1)["bids"] == [{"x": 1000, "y": 3}]
+
+
+def test_archive_keeps_terminal_orders():
+    session = TradingSession(duration=1)
+    session.place_order(make_order("b1", OrderType.BID.value, 1000, amount=2))
+    session.remove_order("b1", OrderStatus.CANCELLED)
+
+    archived = session.archive.get("b1")
+    assert "b1" not in session.all_orders
+    assert archived["status"] == OrderStatus.CANCELLED.value
+    assert archived["price"] == 1000 and archived["amount"] == 2
+    assert archived["closed_at"] is not None
+    assert session.archive.to_polars()["status"].to_list() == ["cancelled"]
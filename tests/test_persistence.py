@@ -0,0 +1,53 @@
+import pytest
+from main_platform.persistence import BatchWriter
+from structures import Message
+
+
+class RecordingWriter(BatchWriter):
+    """Keeps the batches in memory instead of sending them to Mongo."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(Message, *args, **kwargs)
+        self.inserted = []
+
+    def _insert_many(self, batch):
+        self.inserted.append(list(batch))
+
+
+@pytest.mark.asyncio
+async def test_writes_in_batches_and_flushes_on_close():
+    writer = RecordingWriter(batch_size=3, flush_interval=10)
+    writer.start()
+    for i in range(7):
+        assert writer.put(i)
+
+    await writer.close()
+
+    assert [len(batch) for batch in writer.inserted] == [3, 3, 1]
+    assert writer.metrics["written"] == 7
+    assert writer.metrics["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drops_instead_of_blocking_when_full():
+    writer = RecordingWriter(max_queue_size=2, backpressure_threshold=0.5)
+    assert writer.put(1)
+    assert writer.put(2)
+    assert not writer.put(3)
+
+    assert writer.metrics["dropped"] == 1
+    assert writer.metrics["backpressure_events"] == 2
+    assert writer.metrics["max_depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unbounded_writer_never_drops():
+    writer = RecordingWriter(max_queue_size=0, batch_size=1000, flush_interval=0)
+    writer.start()
+    for i in range(5000):
+        assert writer.put(i)
+    await writer.close()
+
+    assert writer.metrics["written"] == 5000
+    assert writer.metrics["dropped"] == 0
+    assert writer.metrics["backpressure_events"] == 0
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from main_platform.pnl import PnLStats
+
+
+def test_running_vwap_inventory_and_pnl():
+    stats = PnLStats()
+    stats.update_fill(2, 100)  # no midpoint yet: valued at the fill price
+    assert stats.pnl() == 0
+
+    stats.update_mid(101)
+    stats.update_fill(-1, 103)
+    assert stats.inventory == 1
+    assert stats.vwap == pytest.approx((2 * 100 + 103) / 3), "Weighted by the traded volume"
+    # bought 2 at 100, sold 1 at 103, 1 share left worth 101
+    assert stats.pnl() == pytest.approx(-200 + 103 + 101)
+    assert stats.pnl_at_last_fill == pytest.approx(4)
+
+    stats.update_mid(110)
+    assert stats.pnl() == pytest.approx(-200 + 103 + 110)
+    assert stats.fills().shape == (0, 3) and stats.mids().shape == (0,), "No history by default"
+
+
+def test_recent_history_is_bounded():
+    stats = PnLStats(history_size=3)
+    for i in range(10):
+        stats.update_mid(100 + i)
+        stats.update_fill(1, 100 + i)
+
+    assert stats.n_fills == 10 and stats.inventory == 10
+    assert stats.mids().tolist() == [107, 108, 109]
+    assert np.array_equal(stats.fills(), [[1, 107, 107], [1, 108, 108], [1, 109, 109]])
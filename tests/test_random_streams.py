@@ -0,0 +1,43 @@
+import numpy as np
+from main_platform.clock import VirtualClock
+from main_platform.random_streams import RandomStream
+from traders import NoiseTrader
+
+settings = {'levels_n': 5, 'initial': 2000, 'step': 1}
+settings_noise = {'levels_n': 5, 'pr_passive': .7, 'pr_cancel': .1, 'pr_bid': .5, 'step': 1}
+
+
+def test_draws_do_not_depend_on_the_batching():
+    one_by_one = RandomStream(7, block_size=16)
+    batched = RandomStream(7, block_size=16)
+
+    singles = [one_by_one.uniform() for _ in range(50)]
+    blocks = np.r_[batched.uniform(size=3), batched.uniform(size=40), batched.uniform(size=7)]
+
+    assert np.array_equal(singles, blocks), "Same values across block refills"
+    assert 0 <= min(singles) and max(singles) < 1
+    assert RandomStream(7).integers(5, 8, size=1000).tolist() == RandomStream(7).integers(5, 8, size=1000).tolist()
+    assert set(RandomStream(7).integers(5, 8, size=1000)) == {5, 6, 7}
+
+
+def test_children_are_reproducible_and_independent():
+    session, again = RandomStream(42), RandomStream(42)
+    children = [session.spawn() for _ in range(3)]
+    children_again = [again.spawn() for _ in range(3)]
+
+    draws = [child.gamma(1, 2, size=100) for child in children]
+    assert all(np.array_equal(a, b.gamma(1, 2, size=100)) for a, b in zip(draws, children_again))
+    assert not np.array_equal(draws[0], draws[1]), "Every trader has its own stream"
+    assert RandomStream().entropy != RandomStream().entropy
+    assert RandomStream(RandomStream().entropy).entropy is not None
+
+
+def test_noise_traders_with_the_same_seed_take_the_same_decisions():
+    book_format = np.array([2001., 1., 2000., 1.])
+    traders = [NoiseTrader(activity_frequency=1, order_amount=1, settings=settings, settings_noise=settings_noise,
+                           clock=VirtualClock(), rng=RandomStream(3).spawn()) for _ in range(2)]
+
+    decisions = [[(trader.get_noise_order(book_format), trader.cooling_interval(1)) for _ in range(20)]
+                 for trader in traders]
+
+    assert decisions[0] == decisions[1]
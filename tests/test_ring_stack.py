@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from external_traders.noise_trader import (cols_book, cols_message, get_book_message_init, get_features_update,
+                                           get_stack_update, settings, transform_book)
+from external_traders.ring_stack import RingStack
+
+
+def test_push_keeps_the_last_rows_in_order():
+    stack = RingStack(3, 2)
+    for i in range(5):
+        stack.push([i, -i])
+
+    assert len(stack) == 3 and stack.full
+    assert stack.last().tolist() == [[2, -2], [3, -3], [4, -4]], "Oldest first, the first two were dropped"
+    assert stack.last(2).tolist() == [[3, -3], [4, -4]]
+    assert stack.latest().tolist() == [4, -4]
+    assert np.shares_memory(stack.last(), stack._buffer), "The last rows are a view, not a copy"
+
+    stack.clear()
+    assert len(stack) == 0 and stack.last().shape == (0, 2)
+    with pytest.raises(ValueError):
+        RingStack(0, 2)
+
+
+def test_feature_pipeline_on_ring_stacks():
+    book_stack = RingStack(settings['stack_max_size'], len(cols_book))
+    message_stack = RingStack(settings['stack_max_size'], len(cols_message))
+    state_count = np.array([0, 0])
+    book, message = get_book_message_init(2000, 1, settings)
+    moved = book.copy()
+    moved[settings['ind_bid_price'][0]] += 1
+    moved[settings['ind_bid_size'][0]] = 3
+
+    for row in (book, book, moved):
+        book_stack, message_stack, state_count = get_stack_update(row, message, book_stack, message_stack,
+                                                                  state_count, settings)
+
+    assert state_count[0] == settings['stack_max_size']
+    of = transform_book(book_stack, settings)
+    expected = transform_book(np.vstack([book, moved]), settings)
+    assert np.array_equal(of, expected), "The ring stack gives the same order flow as the stacked arrays"
+    assert of[1, 0] == 3, "The bid improved with 3 shares"
+
+    features_state = get_features_update(None, book_stack, message_stack, settings)
+    assert np.array_equal(features_state, get_features_update(None, np.vstack([book, moved]), None, settings))
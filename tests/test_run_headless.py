@@ -0,0 +1,17 @@
+from unittest.mock import patch
+from analysis.run_headless import run_session
+from main_platform.persistence import BatchWriter
+
+trader_data = dict(num_human_traders=0, num_noise_traders=5, num_informed_traders=1, trading_day_duration=1,
+                   activity_frequency=1, seed=7)
+
+
+def test_run_session_is_reproducible_for_a_seed():
+    with patch.object(BatchWriter, "_insert_many"):
+        first = run_session(trader_data)
+        second = run_session(trader_data)
+
+    assert first["transactions"] > 0
+    assert first["transactions"] == second["transactions"], "Same seed, same session"
+    assert first["session_id"] != second["session_id"]
+    assert first["simulated_seconds"] >= 60, "The session runs to its end on virtual time"
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from external_traders.noise_trader import get_signal_update, settings
+from external_traders.signal_service import SignalService
+
+
+class LinearModel:
+    def __init__(self, weights):
+        self.weights = np.asarray(weights)
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        return features @ self.weights
+
+
+@pytest.fixture
+def service():
+    service = SignalService(settings)
+    service.register('market_maker', LinearModel([1., 0., 0.]), feature_ind=[0, 1, 2])
+    service.register('informed', LinearModel([1., 1.]), feature_ind=[3, 4])
+    return service
+
+
+def test_one_call_per_model_for_all_agents(service):
+    features = np.arange(5 * 6, dtype=np.float64).reshape(5, 6)  # 5 agents
+
+    signals = service.predict(features)
+
+    assert signals.shape == (5, 2)
+    assert np.array_equal(signals[:, 0], features[:, 0])
+    assert np.array_equal(signals[:, 1], features[:, 3] + features[:, 4])
+    assert [model['model'].calls for model in service.models.values()] == [1, 1], "A single call per model"
+
+
+def test_update_fans_out_to_subscribers(service):
+    market_maker, informed, failing = MagicMock(), MagicMock(), MagicMock(side_effect=ValueError)
+    service.subscribe('market_maker', market_maker)
+    service.subscribe('market_maker', failing)
+    service.subscribe('informed', informed)
+
+    signals = service.update(np.array([2., 0., 0., 1., 1., 0.]))
+
+    assert signals.tolist() == [2., 2.]
+    market_maker.assert_called_once_with(2.)
+    informed.assert_called_once_with(2.)
+    with pytest.raises(KeyError):
+        service.subscribe('noise', market_maker)
+
+
+def test_same_signals_as_get_signal_update(service):
+    features_state = np.array([1., 2., 3., 4., 5.])
+    assert np.array_equal(service.predict(features_state), get_signal_update(features_state, service.models, settings))
+
+
+def test_each_agent_gets_the_signal_of_its_row(service):
+    first, second, everyone = MagicMock(), MagicMock(), MagicMock()
+    service.subscribe('informed', first, row=0)
+    service.subscribe('informed', second, row=1)
+    service.subscribe('informed', everyone)
+
+    service.update(np.array([[0., 0., 0., 1., 2., 0.],
+                             [0., 0., 0., 5., 5., 0.]]))
+
+    first.assert_called_once_with(3.)
+    second.assert_called_once_with(10.)
+    assert everyone.call_args.args[0].tolist() == [3., 10.], "Without a row, the whole column"
+
+    service.unsubscribe('informed', first)
+    service.update(np.array([0., 0., 0., 1., 1., 0.]))  # a single row, shared by all the agents
+    first.assert_called_once()
+    second.assert_called_with(2.)
@@ -1,21 +1,22 @@
 import pytest
 import asyncio
+import json
 from unittest.mock import AsyncMock, patch
 from main_platform import TradingSession
-from structures import OrderStatus, OrderType
+from main_platform.transport import InProcessMessage
+from structures import ActionType, OrderStatus, OrderType, TraderType
 
 
 @pytest.mark.asyncio
 async def test_initialize():
     session = TradingSession(duration=1)
-    session.connection = AsyncMock()
-    session.channel = AsyncMock()
-    with patch("aio_pika.connect_robust", return_value=session.connection), patch(
-        "main_platform.trading_platform.now", return_value="2023-04-01T00:00:00Z"
+    connection = AsyncMock()
+    with patch("aio_pika.connect_robust", return_value=connection), patch.object(
+        session.clock, "now", return_value="2023-04-01T00:00:00Z"
     ):
         await session.initialize()
-        session.connection.channel.assert_awaited()
-        session.channel.declare_exchange.assert_awaited()
+        connection.channel.assert_awaited()
+        session.transport.channel.declare_exchange.assert_awaited()
         assert session.active is True
         assert session.start_time == "2023-04-01T00:00:00Z"
 
@@ -151,11 +152,95 @@ async def test_get_spread():
 @pytest.mark.asyncio
 async def test_clean_up():
     session = TradingSession(duration=1)
-    session.connection = AsyncMock()
-    session.channel = AsyncMock()
+    session.transport.connection = AsyncMock()
+    session.transport.channel = AsyncMock()
     session._stop_requested = asyncio.Event()
     session._stop_requested.set()
     await session.clean_up()
-    session.channel.close.assert_awaited()
-    session.connection.close.assert_awaited()
+    session.transport.channel.close.assert_awaited()
+    session.transport.connection.close.assert_awaited()
     assert session.active is False
+
+
+@pytest.mark.asyncio
+async def test_add_orders_is_atomic_with_one_broadcast():
+    session = TradingSession(duration=1)
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.NOISE.value}}
+    orders = [
+        {"amount": 1, "price": 1010, "order_type": OrderType.ASK.value},
+        {"amount": 1, "price": 1000, "order_type": OrderType.BID.value},
+        {"amount": 1, "price": 1010, "order_type": OrderType.BID.value, "client_order_id": "c1"},
+    ]
+
+    with patch("main_platform.trading_platform.Message"):
+        message = json.dumps({"action": ActionType.POST_NEW_ORDERS.value, "trader_id": "t1", "orders": orders})
+        await session.on_individual_message(InProcessMessage(message.encode(), routing_key=""))
+        broadcasts = [call.args[1] for call in session.transport.publish.await_args_list
+                      if call.args[0] == session.broadcast_exchange_name
+                      and call.args[1].get("type") != "transaction_update"]
+        assert len(broadcasts) == 1, "One book broadcast for the whole batch"
+        assert len(session.transactions) == 1, "One matching pass over the batch"
+        assert [order["price"] for order in session.active_orders.values()] == [1000]
+
+        invalid = orders + [{"amount": 1, "price": "not a price", "order_type": OrderType.BID.value}]
+        result = await session.handle_add_orders({"trader_id": "t1", "orders": invalid})
+        assert result["status"] == "failed"
+        assert len(session.active_orders) == 1, "Nothing of an invalid batch is placed"
+
+
+@pytest.mark.asyncio
+async def test_acks_fills_and_cancels_go_to_the_trader_queue():
+    session = TradingSession(duration=1)
+    session.active = True
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.NOISE.value},
+                                 "t2": {"trader_type": TraderType.NOISE.value},
+                                 "t3": {"trader_type": TraderType.NOISE.value}}
+
+    def private(trader_id):
+        return [call.args[1] for call in session.transport.publish.await_args_list
+                if call.args[0] == session.queue_name and call.kwargs["routing_key"] == f"trader_{trader_id}"]
+
+    await session.handle_add_order({"trader_id": "t1", "amount": 1, "price": 1010, "order_type": OrderType.ASK.value})
+    await session.handle_add_order({"trader_id": "t1", "amount": 1, "price": 1020, "order_type": OrderType.ASK.value,
+                                    "client_order_id": "c1"})
+    await session.handle_add_order({"trader_id": "t2", "amount": 1, "price": 1010, "order_type": OrderType.BID.value})
+    assert not any(call.args[0] == session.broadcast_exchange_name
+                   for call in session.transport.publish.await_args_list), "Nothing is fanned out"
+
+    ack, ack_c1, fill = private("t1")
+    assert ack["type"] == "order_ack" and ack_c1["orders"][0]["client_order_id"] == "c1"
+    assert fill == {"type": "transaction_update", "transactions": [
+        {"id": ack["orders"][0]["id"], "price": 1010, "type": "ask", "amount": 1, "trader_id": "t1"}]}
+    assert [message["type"] for message in private("t2")] == ["order_ack", "transaction_update"]
+    assert private("t3") == [], "Traders not taking part get nothing"
+
+    order_id = str(ack_c1["orders"][0]["id"])
+    await session.handle_cancel_order({"trader_id": "t2", "order_id": order_id})
+    await session.handle_cancel_order({"trader_id": "t1", "order_id": order_id})
+    assert private("t2")[-1]["type"] == "cancel_rejected"
+    assert private("t1")[-1] == {"type": "order_cancelled", "order_id": ack_c1["orders"][0]["id"]}
+
+
+@pytest.mark.asyncio
+async def test_add_order_ignores_client_timestamps_and_rejects_bad_orders():
+    session = TradingSession(duration=1)
+    session.transport = AsyncMock()
+    session.connected_traders = {"t1": {"trader_type": TraderType.HUMAN.value}}
+    order = {"trader_id": "t1", "amount": 1, "price": 1000, "order_type": OrderType.BID.value,
+             "timestamp": "2024-06-25T14:01:58", "status": "whatever"}
+
+    result = await session.handle_add_order(dict(order))
+    assert result["type"] == "NEW_ORDER_ADDED"
+    placed, = session.active_orders.values()
+    assert placed["timestamp"].year != 2024, "The session stamps the order itself"
+    assert placed["status"] == OrderStatus.ACTIVE.value
+
+    result = await session.handle_add_orders({"trader_id": "t1", "orders": [dict(order, price=999)]})
+    assert result["type"] == "NEW_ORDERS_ADDED" and len(session.active_orders) == 2
+
+    for bad in ({"trader_id": "t1", "amount": 1, "price": 1000}, dict(order, order_type="bid")):
+        result = await session.handle_add_order(bad)
+        assert result["status"] == "failed"
+    assert session.transport.publish.await_args.args[1]["type"] == "order_rejected"
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from main_platform import TradingSession
+from main_platform.persistence import BatchWriter
+from main_platform.transport import InProcessBus
+from structures import ExchangeType, OrderType, TraderType
+from traders.base_trader import BaseTrader
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fanout_and_direct_routing():
+    bus = InProcessBus()
+    publisher, first, second = bus.transport(), bus.transport(), bus.transport()
+    received = {"first": [], "second": [], "direct": []}
+
+    for transport in (publisher, first, second):
+        await transport.declare_exchange("broadcast", ExchangeType.FANOUT)
+        await transport.declare_exchange("direct", ExchangeType.DIRECT)
+
+    def collect(name):
+        async def callback(message):
+            received[name].append(json.loads(message.body))
+        return callback
+
+    await first.subscribe("broadcast", collect("first"))
+    await second.subscribe("broadcast", collect("second"))
+    await second.subscribe("direct", collect("direct"), queue_name="trader_2")
+
+    for i in range(3):
+        await publisher.publish("broadcast", {"n": i})
+    await publisher.publish("direct", {"n": "to 2"}, routing_key="trader_2")
+    await publisher.publish("direct", {"n": "to 1"}, routing_key="trader_1")
+    await settle()
+
+    assert received["first"] == received["second"] == [{"n": 0}, {"n": 1}, {"n": 2}], "Fanout keeps the order"
+    assert received["direct"] == [{"n": "to 2"}], "Direct only reaches the bound routing key"
+
+    await second.close()
+    await publisher.publish("broadcast", {"n": 3})
+    await settle()
+    assert len(received["second"]) == 3
+    assert len(received["first"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_close_drops_exchanges_nobody_subscribed_to():
+    bus = InProcessBus()
+    publisher, reader = bus.transport(), bus.transport()
+    await publisher.declare_exchange("ticker", ExchangeType.FANOUT)
+    await publisher.declare_exchange("broadcast", ExchangeType.FANOUT)
+    await reader.declare_exchange("broadcast", ExchangeType.FANOUT)
+
+    async def ignore(message):
+        pass
+
+    await reader.subscribe("broadcast", ignore)
+    await publisher.close()
+    assert set(bus.exchanges) == {"broadcast"}, "Exchanges with readers outlive the publisher"
+
+    await reader.close()
+    assert not bus.exchanges
+
+
+@pytest.mark.asyncio
+async def test_session_and_trader_in_one_process():
+    bus = InProcessBus()
+    session = TradingSession(duration=1, transport=bus.transport())
+    trader = BaseTrader(TraderType.NOISE, transport=bus.transport())
+
+    with patch.object(BatchWriter, "_insert_many"):
+        await session.initialize()
+        await trader.initialize()
+        await trader.connect_to_session(session.id)
+        await settle()
+        assert trader.id in session.connected_traders
+
+        await trader.post_new_order(1, 100, OrderType.BID)
+        await trader.post_new_order(2, 105, OrderType.ASK)
+        await settle()
+
+        assert trader.order_book == session.order_book
+        assert len(trader.orders) == 2, "Both orders are seen as own orders"
+
+        await trader.clean_up()
+        await session.clean_up()
+    assert not bus.exchanges
@@ -1,4 +1,5 @@
 from .human_trader import HumanTrader
 from .noise_trader import NoiseTrader
+from .noise_crowd import NoiseCrowd
 from .base_trader import BaseTrader
 from .informed_trader import InformedTrader
\ No newline at end of file
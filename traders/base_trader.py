@@ -1,15 +1,16 @@
 import asyncio
-import aio_pika
 import json
 import uuid
-from structures.structures import OrderType, ActionType, TraderType
-import os
+from structures.structures import DEFAULT_FEEDS, OrderType, ActionType, TraderType, ExchangeType, Feed
 from abc import abstractmethod
+from typing import Dict, List, Optional
 
+from main_platform.clock import Clock, WallClock
 from main_platform.custom_logger import setup_custom_logger
-from main_platform.utils import (CustomEncoder)
-
-rabbitmq_url = os.getenv('RABBITMQ_URL', 'amqp://localhost')
+from main_platform.market_data import MarketDataReplica
+from main_platform.pnl import PnLStats
+from main_platform.random_streams import RandomStream
+from main_platform.transport import RabbitMQTransport, Transport
 
 logger = setup_custom_logger(__name__)
 
@@ -22,8 +23,12 @@ class BaseTrader:
     shares = 0
     initial_cash = 0
     initial_shares = 0
-    
-    def __init__(self, trader_type: TraderType, cash=0, shares=0):
+    # the parts of the market data the trader reads: the rest of the updates is skipped, and the
+    # session leaves the trade history out of the snapshots if no trader reads it
+    feeds = DEFAULT_FEEDS
+
+    def __init__(self, trader_type: TraderType, cash=0, shares=0, transport: Optional[Transport] = None,
+                 clock: Optional[Clock] = None, rng: Optional[RandomStream] = None, pnl_history_size: int = 0):
 
         self.initial_shares = shares
         self.initial_cash = cash
@@ -36,86 +41,57 @@ class BaseTrader:
         self.trader_type = trader_type.value
         self.id = f"{trader_type.name}_{str(uuid.uuid4())}" # added identifier of trader type
         logger.info(f"Trader of type {self.trader_type} created with UUID: {self.id}")
-        self.connection = None
-        self.channel = None
+        self.transport = transport or RabbitMQTransport()
+        self.clock = clock or WallClock()
+        self.rng = rng or RandomStream()
         self.trading_session_uuid = None
         self.trader_queue_name = f'trader_{self.id}'  # unique queue name based on Trader's UUID
         logger.info(f"Trader queue name: {self.trader_queue_name}")
         self.queue_name = None
         self.broadcast_exchange_name = None
-        self.trading_system_exchange = None
+        self.ticker_exchange_name = None
+        self.market_data = MarketDataReplica(owner_id=self.id, feeds=self.feeds)
+        self.ticker = None
 
-        # PNL BLOCK
-        self.DInv = []
-        self.transaction_prices = []
-        self.transaction_relevant_mid_prices = []  # Mid prices relevant to each transaction
-        self.general_mid_prices = []  # All mid prices from the trading system
-        self.sum_cost = 0
-        self.sum_dinv = 0
-        self.sum_mid_executions = 0
-        self.current_pnl = 0
+        # PNL BLOCK: running sums, plus the last pnl_history_size fills and midpoints if asked for
+        self.pnl_stats = PnLStats(history_size=pnl_history_size)
 
-        self.start_time = asyncio.get_event_loop().time()
+        self.start_time = self.clock.time()
 
 
     def get_elapsed_time(self) -> float:
         """Returns the elapsed time in seconds since the trader was initialized."""
-        current_time = asyncio.get_event_loop().time()
-        return current_time - self.start_time
+        return self.clock.time() - self.start_time
 
     def get_vwap(self):
-        # let's for now just return the average of all transaction prices
-        return sum(self.transaction_prices) / len(self.transaction_prices) if self.transaction_prices else 0
-    def update_mid_price(self, new_mid_price):
+        return self.pnl_stats.vwap
 
-        self.general_mid_prices.append(new_mid_price)
+    def update_mid_price(self, new_mid_price):
+        self.pnl_stats.update_mid(new_mid_price)
 
     def update_data_for_pnl(self, dinv: float, transaction_price: float) -> None:
-        relevant_mid_price = self.general_mid_prices[-1] if self.general_mid_prices else transaction_price
-
-        # Update lists
-        self.DInv.append(dinv)
-        self.transaction_prices.append(transaction_price)
-        self.transaction_relevant_mid_prices.append(relevant_mid_price)  # Store relevant mid_price for this transaction
-
-        # Update running totals
-        self.sum_cost += dinv * (transaction_price - relevant_mid_price)
-        self.sum_dinv += dinv
-        self.sum_mid_executions += relevant_mid_price * dinv
-
-        self.current_pnl = relevant_mid_price * self.sum_dinv - self.sum_mid_executions - self.sum_cost
+        self.pnl_stats.update_fill(dinv, transaction_price)
 
     def get_current_pnl(self, use_latest_general_mid_price=True):
+        if use_latest_general_mid_price:
+            return self.pnl_stats.pnl()
+        return self.pnl_stats.pnl_at_last_fill
 
-        if use_latest_general_mid_price and self.general_mid_prices:
-            latest_mid_price = self.general_mid_prices[-1]
-            pnl_adjusted = latest_mid_price * self.sum_dinv - self.sum_mid_executions - self.sum_cost
-            return pnl_adjusted
-        return self.current_pnl
+    @property
+    def sum_dinv(self):
+        return self.pnl_stats.inventory
 
-    
     @property
     def delta_cash(self):
         return self.cash - self.initial_cash
 
     async def initialize(self):
-        self.connection = await aio_pika.connect_robust(rabbitmq_url)
-        self.channel = await self.connection.channel()
-        await self.channel.declare_queue(self.trader_queue_name, auto_delete=True)
+        await self.transport.connect()
 
     async def clean_up(self):
         self._stop_requested.set()
-        try:
-            # Close the channel and connection
-            if self.channel:
-                await self.channel.close()
-                logger.info(f"Trader {self.id} channel closed")
-            if self.connection:
-                await self.connection.close()
-                logger.info(f"Trader {self.id} connection closed")
-
-        except Exception as e:
-            logger.error(f"An error occurred during Trader cleanup: {e}")
+        await self.transport.close()
+        logger.info(f"Trader {self.id} transport closed")
 
     async def connect_to_session(self, trading_session_uuid):
         self.trading_session_uuid = trading_session_uuid
@@ -125,23 +101,18 @@ class BaseTrader:
         self.broadcast_exchange_name = f'broadcast_{self.trading_session_uuid}'
 
         # Subscribe to group messages
-        broadcast_exchange = await self.channel.declare_exchange(self.broadcast_exchange_name,
-                                                                 aio_pika.ExchangeType.FANOUT,
-                                                                 auto_delete=True)
-        broadcast_queue = await self.channel.declare_queue("", auto_delete=True)
-        await broadcast_queue.bind(broadcast_exchange)
-        await broadcast_queue.consume(self.on_message_from_system)
-
-        # For individual messages
-        self.trading_system_exchange = await self.channel.declare_exchange(self.queue_name,
-                                                                           aio_pika.ExchangeType.DIRECT,
-                                                                           auto_delete=True)
-        trader_queue = await self.channel.declare_queue(
-            self.trader_queue_name,
-            auto_delete=True
-        )  # Declare a unique queue for this Trader
-        await trader_queue.bind(self.trading_system_exchange, routing_key=self.trader_queue_name)
-        await trader_queue.consume(self.on_message_from_system)
+        await self.transport.declare_exchange(self.broadcast_exchange_name, ExchangeType.FANOUT)
+        await self.transport.subscribe(self.broadcast_exchange_name, self.on_message_from_system)
+
+        if Feed.TICKER in self.feeds:
+            self.ticker_exchange_name = f'ticker_{self.trading_session_uuid}'
+            await self.transport.declare_exchange(self.ticker_exchange_name, ExchangeType.FANOUT)
+            await self.transport.subscribe(self.ticker_exchange_name, self.on_ticker)
+
+        # For individual messages, on a unique queue for this Trader
+        await self.transport.declare_exchange(self.queue_name, ExchangeType.DIRECT)
+        await self.transport.subscribe(self.queue_name, self.on_message_from_system,
+                                       queue_name=self.trader_queue_name)
 
         await self.register()  # Register with the trading system
 
@@ -149,29 +120,19 @@ class BaseTrader:
         message = {
             'type': ActionType.REGISTER.value,
             'action': ActionType.REGISTER.value,
-            'trader_type': self.trader_type
+            'trader_type': self.trader_type,
+            'feeds': sorted(feed.value for feed in self.feeds),
         }
 
         await self.send_to_trading_system(message)
 
+    async def request_snapshot(self):
+        await self.send_to_trading_system({'action': 'request_snapshot'})
+
     async def send_to_trading_system(self, message):
         # front end design means human traders' own_orders will alaways be empty
         message['trader_id'] = self.id
-        await self.trading_system_exchange.publish(
-            aio_pika.Message(body=json.dumps(message, cls=CustomEncoder).encode()),
-            routing_key=self.queue_name  # Use the dynamic queue_name
-        )
-
-    def check_if_relevant(self, transactions: list) -> list:
-        """
-        Check if any of the transactions in the list are relevant to this trader.
-        """
-        transactions_relevant_to_self = []
-        for transaction in transactions:
-            if transaction['trader_id'] == self.id:
-                transactions_relevant_to_self.append(transaction)
-        
-        return transactions_relevant_to_self
+        await self.transport.publish(self.queue_name, message, routing_key=self.queue_name)
 
     async def on_message_from_system(self, message):
         try:
@@ -179,25 +140,13 @@ class BaseTrader:
             action_type = json_message.get('type')
             data = json_message
 
-            
-            if action_type == 'transaction_update' and self.trader_type != TraderType.NOISE.value:
-                transactions_relevant_to_self = self.check_if_relevant(data['transactions'])
-                if transactions_relevant_to_self:
-                    self.update_inventory(transactions_relevant_to_self)
-
             if data.get('midpoint'):
                 self.update_mid_price(data['midpoint'])
             if not data:
                 logger.error('no data from trading system')
                 return
-            order_book = data.get('order_book')
-            if order_book:
-                self.order_book = order_book
-            active_orders = data.get('active_orders')
-            if active_orders:
-                self.active_orders = active_orders
-                own_orders = [order for order in active_orders if order['trader_id'] == self.id]
-                self.orders = own_orders
+            if 'snapshot' in data:  # book updates, tickers have a seq too
+                await self.update_market_data(data)
 
             handler = getattr(self, f'handle_{action_type}', None)
             if handler:
@@ -209,19 +158,94 @@ class BaseTrader:
         except json.JSONDecodeError:
             logger.error(f"Error decoding message: {message}")
 
+    async def on_ticker(self, message):
+        try:
+            ticker = json.loads(message.body.decode())
+        except json.JSONDecodeError:
+            logger.error(f"Error decoding ticker: {message}")
+            return
+        await self.handle_ticker(ticker)
+
+    async def handle_ticker(self, data):
+        """
+        Keeps the latest ticker: it carries the whole top of the book, so there is nothing to apply.
+        It comes from the ticker exchange, or from the individual queue when the trader registers.
+        """
+        if self.ticker is None or data['seq'] >= self.ticker['seq']:
+            self.ticker = data
+
+    def top_prices(self, order_type: OrderType, n: int = 1) -> List[float]:
+        """
+        The n best prices of one side of the book, best first. They come from the ticker when the
+        trader has one deep enough, from the local copy of the book otherwise.
+        """
+        side = 'bids' if order_type == OrderType.BID else 'asks'
+        if self.ticker is not None and n <= self.ticker['levels']:
+            return [price for price, _ in self.ticker[side][:n]]
+        return [level['x'] for level in self.order_book.get(side, [])[:n]]
+
+    def best_price(self, order_type: OrderType) -> Optional[float]:
+        """The best bid or ask price, None when that side of the book is empty."""
+        prices = self.top_prices(order_type, 1)
+        return prices[0] if prices else None
+
+    async def update_market_data(self, data: dict) -> None:
+        """Applies a numbered market data update (delta or snapshot) to the local copy of the book."""
+        if not self.market_data.apply(data):
+            logger.warning(f"Trader {self.id} missed a market data update, requesting a snapshot")
+            await self.request_snapshot()
+            return
+        if self.market_data.awaiting_snapshot:
+            return
+        self.order_book = self.market_data.order_book
+        if Feed.ORDERS in self.feeds:
+            self.active_orders = list(self.market_data.active_orders.values())
+        self.orders = list(self.market_data.own_orders.values())
+
+    async def handle_snapshot(self, data):
+        """Snapshots are applied in update_market_data, nothing else to do here."""
+        pass
+
+    # the platform sends the messages below to the individual queue of the trader only
+
+    async def handle_order_ack(self, data):
+        """New orders of the trader, with the ids the platform gave them."""
+        self.market_data.own_orders_added(data['orders'])
+        self.orders = list(self.market_data.own_orders.values())
+
+    async def handle_order_rejected(self, data):
+        logger.warning(f"Trader {self.id} orders rejected: {data['reason']}")
+
+    async def handle_transaction_update(self, data):
+        """Executions of orders of the trader."""
+        for transaction in data['transactions']:
+            self.market_data.own_order_closed(transaction['id'])
+        self.orders = list(self.market_data.own_orders.values())
+        if self.trader_type != TraderType.NOISE.value:
+            self.update_inventory(data['transactions'])
+
+    async def handle_order_cancelled(self, data):
+        self.market_data.own_order_closed(data['order_id'])
+        self.orders = list(self.market_data.own_orders.values())
+
+    async def handle_cancel_rejected(self, data):
+        logger.warning(f"Trader {self.id} could not cancel order {data['order_id']}: {data['reason']}")
+
     def update_inventory(self, transactions_relevant_to_self: list) -> None:
         """
-        Update the trader's inventory based on matched transactions relevant to this trader.
-        Only accounts for the increase of shares and cash.
+        Update the trader's inventory based on matched transactions relevant to this trader: a bid
+        fill adds shares and costs cash, an ask fill does the opposite.
         """
         for transaction in transactions_relevant_to_self:
             if transaction['type'] == 'bid':
-                self.shares += transaction['amount']
-                self.cash = transaction['price'] * transaction['amount']
+                dinv = transaction['amount']
             elif transaction['type'] == 'ask':
-                self.cash += transaction['price'] * transaction['amount']
-                self.shares -= transaction['amount']
-            self.update_data_for_pnl(transaction['amount'], transaction['price'])
+                dinv = -transaction['amount']
+            else:
+                continue
+            self.shares += dinv
+            self.cash -= transaction['price'] * dinv
+            self.update_data_for_pnl(dinv, transaction['price'])
 
         
     @abstractmethod
@@ -231,18 +255,24 @@ class BaseTrader:
         """
         pass
 
-    async def post_new_order(self, amount: int, price: int, order_type: OrderType) -> None:
+    def has_enough_for(self, amount: int, price: int, order_type: OrderType) -> bool:
         if self.trader_type != TraderType.NOISE.value:
             if order_type == OrderType.BID:
                 if self.cash < price * amount:
                     logger.critical(f"Trader {self.id} does not have enough cash to place bid order.")
-                    return
+                    return False
                 #self.cash -= price * amount
             elif order_type == OrderType.ASK:
                 if self.shares < amount:
                     logger.critical(f"Trader {self.id} does not have enough shares to place ask order.")
-                    return
+                    return False
                 #self.shares -= amount
+        return True
+
+    async def post_new_order(self, amount: int, price: int, order_type: OrderType,
+                             client_order_id: Optional[str] = None) -> None:
+        if not self.has_enough_for(amount, price, order_type):
+            return
 
         new_order = {
             "action": ActionType.POST_NEW_ORDER.value,
@@ -250,8 +280,24 @@ class BaseTrader:
             "price": price,
             "order_type": order_type,
         }
+        if client_order_id is not None:
+            new_order["client_order_id"] = client_order_id
         await self.send_to_trading_system(new_order)
 
+    async def post_new_orders(self, orders: List[Dict]) -> None:
+        """
+        Posts several orders in one message: dicts with amount, price, order_type and optionally
+        client_order_id. The platform places them all, clears the book once and broadcasts once.
+        """
+        orders = [order for order in orders
+                  if self.has_enough_for(order["amount"], order["price"], order["order_type"])]
+        if not orders:
+            return
+        await self.send_to_trading_system({
+            "action": ActionType.POST_NEW_ORDERS.value,
+            "orders": orders,
+        })
+
     async def send_cancel_order_request(self, order_id: uuid.UUID) -> None:
         if not order_id:
             logger.error(f"Order ID is not provided")
@@ -28,6 +28,10 @@ class HumanTrader(BaseTrader):
 
     async def post_processing_server_message(self, json_message):
         message_type = json_message.pop('type', None)
+        if 'seq' in json_message:
+            # the client still expects the full list of orders and transactions
+            json_message['active_orders'] = self.active_orders
+            json_message['history'] = self.market_data.history
         if message_type:
             await self.send_message_to_client(message_type, **json_message)
 
@@ -1,13 +1,20 @@
 import asyncio
-from structures import OrderType, TraderType, TradeDirection
+from structures import Feed, OrderType, TraderType, TradeDirection
 from main_platform.custom_logger import setup_custom_logger
+from main_platform.clock import Clock
+from main_platform.random_streams import RandomStream
+from main_platform.transport import Transport
 from .base_trader import BaseTrader
 import numpy as np
+from typing import Optional
 
 logger = setup_custom_logger(__name__)
 
 
 class InformedTrader(BaseTrader):
+    # the top of the book comes from the ticker, the full feed only brings its own orders
+    feeds = frozenset({Feed.TICKER, Feed.OWN_ORDERS})
+
     def __init__(
         self,
         activity_frequency: int,
@@ -17,8 +24,11 @@ class InformedTrader(BaseTrader):
         informed_state: dict,
         get_signal_informed: callable,
         get_order_to_match: callable,
+        transport: Optional[Transport] = None,
+        clock: Optional[Clock] = None,
+        rng: Optional[RandomStream] = None,
     ):
-        super().__init__(trader_type=TraderType.INFORMED)
+        super().__init__(trader_type=TraderType.INFORMED, transport=transport, clock=clock, rng=rng)
         self.activity_frequency = activity_frequency
         self.settings = settings
         self.settings_informed = settings_informed
@@ -45,17 +55,11 @@ class InformedTrader(BaseTrader):
 
     def get_best_opposite_price(self, order_side: OrderType) -> float:
         if order_side == OrderType.BID:
-            asks = self.order_book.get("asks", [])
-            if asks:
-                return min(ask["x"] for ask in asks)
-            else:
-                return float("inf")
+            price = self.best_price(OrderType.ASK)
+            return price if price is not None else float("inf")
         elif order_side == OrderType.ASK:
-            bids = self.order_book.get("bids", [])
-            if bids:
-                return max(bid["x"] for bid in bids)
-            else:
-                return float("-inf")
+            price = self.best_price(OrderType.BID)
+            return price if price is not None else float("-inf")
 
     def calculate_sleep_time(self, remaining_time: float) -> float:
         # buying case
@@ -106,27 +110,14 @@ class InformedTrader(BaseTrader):
         # 'timestamp': '2024-06-25T14:01:58.719769'}
 
         if self.shares > 3 and len(self.orders) < self.num_passive_orders:
-            if order_side == OrderType.BID:
-                bids = self.order_book.get("bids", [])
-                price_passive = max(bid["x"] for bid in bids)
-                await self.post_new_order(1, price_passive, order_side)
-                # tests whether the orders are within the first three levels
-                three_highest_bids = sorted(bids, key=lambda bid: bid["x"], reverse=True)[:3]
-                if self.orders:
-                    for order in self.orders:
-                        if order['price'] not in three_highest_bids:
-                            await self.send_cancel_order_request(order['id'])
-            if order_side == OrderType.ASK:
-                asks = self.order_book.get("asks", [])
-                price_passive = min(ask["x"] for ask in asks)
-                await self.post_new_order(1, price_passive, order_side)
-                # tests whether the orders are within the first three levels
-                if self.orders:
-                    three_lowest_asks = sorted(ask["x"] for ask in asks)[:3]
-                    print(three_lowest_asks)
-                    for order in self.orders:
-                        if order['price'] not in three_lowest_asks:
-                            await self.send_cancel_order_request(order['id'])
+            # the passive order joins the best level of its side
+            # and the orders out of the first three levels get cancelled
+            three_best_prices = self.top_prices(order_side, 3)
+            if three_best_prices:
+                await self.post_new_order(1, three_best_prices[0], order_side)
+                for order in self.orders:
+                    if order['price'] not in three_best_prices:
+                        await self.send_cancel_order_request(order['id'])
         else:
             for order in self.orders:
                 await self.send_cancel_order_request(order['id'])
@@ -150,7 +141,7 @@ class InformedTrader(BaseTrader):
                         f"Sleep Time: {self.next_sleep_time:.2f} seconds"
                 )
 
-                await asyncio.sleep(self.next_sleep_time)
+                await self.clock.sleep(self.next_sleep_time)
             except asyncio.CancelledError:
                 logger.info("Run method cancelled, performing cleanup...")
                 await self.clean_up()
@@ -0,0 +1,170 @@
+import asyncio
+import itertools
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from structures import Feed, OrderType, TraderType
+from main_platform.clock import Clock
+from main_platform.custom_logger import setup_custom_logger
+from main_platform.random_streams import RandomStream
+from main_platform.transport import Transport
+from main_platform.utils import convert_to_book_format_new
+from .base_trader import BaseTrader
+
+logger = setup_custom_logger(__name__)
+
+# asyncio runs a timer up to the resolution of the monotonic clock before it is due
+WAKE_UP_TOLERANCE = time.get_clock_info("monotonic").resolution
+
+
+class NoiseCrowd(BaseTrader):
+    """
+    n_members noise traders behind one connection: the book is received and decoded once for all of
+    them, and their orders go through the same transport, as orders of the crowd.
+
+    Each member behaves as a NoiseTrader: it wakes up after a gamma(1, 1 / activity_frequency)
+    interval and takes the decisions of NoiseTrader.get_noise_order. The intervals and decisions of
+    all the members waking up together are drawn at once. Every member keeps its own orders (the
+    orders of the crowd are attributed to the member that posted them), so a cancel removes one of
+    the orders of the member cancelling.
+    """
+    feeds = frozenset({Feed.BOOK, Feed.OWN_ORDERS})
+
+
+    def __init__(
+        self,
+        n_members: int,
+        activity_frequency: float,
+        order_amount: int,
+        settings: dict,
+        settings_noise: dict,
+        transport: Optional[Transport] = None,
+        clock: Optional[Clock] = None,
+        rng: Optional[RandomStream] = None,
+    ):
+        super().__init__(trader_type=TraderType.NOISE, transport=transport, clock=clock, rng=rng)
+        self.n_members = n_members
+        self.activity_frequency = activity_frequency
+        self.order_amount = order_amount
+        self.settings = settings
+        self.settings_noise = settings_noise
+        self.step = self.settings_noise["step"]
+        self.initial_value = self.settings["initial"]
+
+        # order ids of each member, in the order they were posted (a dict, so that seeded runs cancel the same ones)
+        self.member_orders: List[Dict[str, None]] = [{} for _ in range(n_members)]
+        self.member_of: Dict[str, int] = {}
+        self._client_order_ids = itertools.count()
+        self.next_wake_up = self.cooling_intervals(n_members)
+
+    def cooling_intervals(self, n: int) -> np.ndarray:
+        return self.rng.gamma(shape=1, scale=1 / self.activity_frequency, size=n)
+
+    async def update_market_data(self, data: dict) -> None:
+        await super().update_market_data(data)
+        self.assign_orders()
+
+    async def handle_order_ack(self, data: dict) -> None:
+        await super().handle_order_ack(data)
+        self.assign_orders()
+
+    def assign_orders(self) -> None:
+        """Gives the new orders of the crowd to the members that posted them, and forgets the closed ones."""
+        own_orders = self.market_data.own_orders
+        for order_id in [order_id for order_id in self.member_of if order_id not in own_orders]:
+            self.member_orders[self.member_of.pop(order_id)].pop(order_id, None)
+        for order_id, order in own_orders.items():
+            if order_id in self.member_of:
+                continue
+            client_order_id = order.get("client_order_id")
+            if not client_order_id:
+                continue
+            member = int(client_order_id.split("-")[0])
+            self.member_of[order_id] = member
+            self.member_orders[member][order_id] = None
+
+    def member_order(self, member: int, amount: int, price: float, order_type: OrderType) -> dict:
+        return {"amount": amount, "price": price, "order_type": order_type,
+                "client_order_id": f"{member}-{next(self._client_order_ids)}"}
+
+    def seed_orders(self, member: int) -> list:
+        orders = []
+        for level in range(1, 6):
+            orders.append(self.member_order(member, 1, self.initial_value + level * self.step, OrderType.ASK))
+            orders.append(self.member_order(member, 1, self.initial_value - level * self.step, OrderType.BID))
+        return orders
+
+    def get_noise_orders(self, n: int) -> Dict[str, np.ndarray]:
+        """The decisions of get_noise_order for n members at once."""
+        levels_n = self.settings_noise["levels_n"]
+        draws = self.rng.uniform(size=3 * n).reshape(n, 3)
+        return {
+            "passive": draws[:, 0] < self.settings_noise["pr_passive"],
+            "bid": draws[:, 1] < self.settings_noise["pr_bid"],
+            "cancel": draws[:, 2] < self.settings_noise["pr_cancel"],
+            "offset": self.rng.integers(self.step, max(self.step * levels_n, self.step + 1), n),
+        }
+
+    async def act(self, members: np.ndarray) -> None:
+        """The members wake up together: all their orders go in one batch."""
+        if not self.order_book:
+            await self.post_new_orders([order for member in members for order in self.seed_orders(int(member))])
+            return
+
+        # shared by all the members waking up together
+        book_format = convert_to_book_format_new(self.order_book)
+        best_ask, best_bid = book_format[0], book_format[2]
+        orders = []
+        if len(self.order_book["bids"]) == 0:
+            orders.append(self.member_order(int(members[0]), 1, best_ask - self.step, OrderType.BID))
+        if len(self.order_book["asks"]) == 0:
+            orders.append(self.member_order(int(members[0]), 1, best_bid + self.step, OrderType.ASK))
+
+        decisions = self.get_noise_orders(len(members))
+        prices = np.where(
+            decisions["passive"],
+            np.where(decisions["bid"], best_ask - decisions["offset"], best_bid + decisions["offset"]),
+            np.where(decisions["bid"], best_ask, best_bid),
+        )
+        for i, member in enumerate(members):
+            order_type = OrderType.BID if decisions["bid"][i] else OrderType.ASK
+            for _ in range(self.order_amount):
+                orders.append(self.member_order(int(member), self.order_amount, float(prices[i]), order_type))
+        await self.post_new_orders(orders)
+
+        for member in members[decisions["cancel"]]:
+            await self.cancel_member_order(int(member))
+
+    async def cancel_member_order(self, member: int) -> None:
+        own_orders = self.market_data.own_orders
+        order_ids = [order_id for order_id in self.member_orders[member] if order_id in own_orders]
+        if not order_ids:
+            return
+        await self.send_cancel_order_request(self.rng.choice(order_ids))
+
+    async def warm_up(self, number_of_warmup_orders: int) -> None:
+        members = np.arange(self.n_members)
+        for _ in range(number_of_warmup_orders):
+            await self.act(members)
+
+    async def run(self) -> None:
+        start = self.clock.time()
+        while not self._stop_requested.is_set():
+            try:
+                elapsed = self.clock.time() - start
+                await self.clock.sleep(max(float(self.next_wake_up.min()) - elapsed, 0))
+                elapsed = self.clock.time() - start
+                members = np.flatnonzero(self.next_wake_up <= elapsed + WAKE_UP_TOLERANCE)
+                if not len(members):
+                    continue  # woke up early, nobody is due yet
+                await self.act(members)
+                self.next_wake_up[members] = elapsed + self.cooling_intervals(len(members))
+            except asyncio.CancelledError:
+                logger.info("Run method cancelled, performing cleanup of %s...", self.trader_type)
+                await self.clean_up()
+                raise
+            except Exception as e:
+                logger.error("An error occurred in NoiseCrowd run loop: %s", e)
+                break
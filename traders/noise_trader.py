@@ -1,27 +1,35 @@
 import asyncio
-import random
 import numpy as np
-from structures import OrderType, TraderType, ActionType
+from typing import Optional
+from structures import Feed, OrderType, TraderType, ActionType
 from main_platform.utils import (
     convert_to_book_format_new,
     convert_to_noise_state,
     convert_to_trader_actions,
 )
 from main_platform.custom_logger import setup_custom_logger
+from main_platform.clock import Clock
+from main_platform.random_streams import RandomStream
+from main_platform.transport import Transport
 from .base_trader import BaseTrader
 
 logger = setup_custom_logger(__name__)
 
 
 class NoiseTrader(BaseTrader):
+    feeds = frozenset({Feed.BOOK, Feed.OWN_ORDERS})
+
     def __init__(
         self,
         activity_frequency: float,
         order_amount: int,
         settings: dict,
         settings_noise: dict,
+        transport: Optional[Transport] = None,
+        clock: Optional[Clock] = None,
+        rng: Optional[RandomStream] = None,
     ):
-        super().__init__(trader_type=TraderType.NOISE)
+        super().__init__(trader_type=TraderType.NOISE, transport=transport, clock=clock, rng=rng)
         self.activity_frequency = activity_frequency
         self.order_amount = order_amount
         self.settings = settings
@@ -42,7 +50,7 @@ class NoiseTrader(BaseTrader):
             self.order_index += 1
 
     def cooling_interval(self, target: float) -> float:
-        interval = np.random.gamma(shape=1,scale=1/target)
+        interval = self.rng.gamma(shape=1, scale=1/target)
         return interval
 
     def get_noise_order(self, book_format):
@@ -53,21 +61,21 @@ class NoiseTrader(BaseTrader):
         pr_bid = self.settings_noise["pr_bid"]
         pr_cancel = self.settings_noise["pr_cancel"]
 
-        pr_passive_signal = np.random.uniform(0, 1) < pr_passive
-        pr_bid_signal = np.random.uniform(0, 1) < pr_bid
-        pr_cancel_signal = np.random.uniform(0, 1) < pr_cancel
+        pr_passive_signal = self.rng.uniform() < pr_passive
+        pr_bid_signal = self.rng.uniform() < pr_bid
+        pr_cancel_signal = self.rng.uniform() < pr_cancel
 
         if pr_passive_signal:
             if pr_bid_signal:
                 best_ask = book_format[0]
                 prices_to_choose = [best_ask - i for i in range(step, step * levels_n)]
-                price = random.choice(prices_to_choose)
+                price = self.rng.choice(prices_to_choose)
                 amount = self.order_amount
                 order["bid"] = {price: [amount]}
             else:
                 best_bid = book_format[2]
                 prices_to_choose = [best_bid + i for i in range(step, step * levels_n)]
-                price = random.choice(prices_to_choose)
+                price = self.rng.choice(prices_to_choose)
                 amount = self.order_amount
                 order["ask"] = {price: [amount]}
         else:
@@ -83,23 +91,18 @@ class NoiseTrader(BaseTrader):
                 order["ask"] = {price: [amount]}
 
         if pr_cancel_signal:
-            direction_to_cancel = random.choice(["ask", "bid"])
+            direction_to_cancel = self.rng.choice(["ask", "bid"])
             order[direction_to_cancel][None] = [-1]
 
         return order
 
     async def act(self) -> None:
         if not self.order_book:
-            await self.post_new_order(1, self.initial_value + self.step, OrderType.ASK)
-            await self.post_new_order(1, self.initial_value - self.step, OrderType.BID)
-            await self.post_new_order(1, self.initial_value + 2* self.step, OrderType.ASK)
-            await self.post_new_order(1, self.initial_value - 2* self.step, OrderType.BID)
-            await self.post_new_order(1, self.initial_value + 3* self.step, OrderType.ASK)
-            await self.post_new_order(1, self.initial_value - 3* self.step, OrderType.BID)
-            await self.post_new_order(1, self.initial_value + 4* self.step, OrderType.ASK)
-            await self.post_new_order(1, self.initial_value - 4* self.step, OrderType.BID)
-            await self.post_new_order(1, self.initial_value + 5* self.step, OrderType.ASK)
-            await self.post_new_order(1, self.initial_value - 5* self.step, OrderType.BID)
+            orders = []
+            for level in range(1, 6):
+                orders.append({"amount": 1, "price": self.initial_value + level * self.step, "order_type": OrderType.ASK})
+                orders.append({"amount": 1, "price": self.initial_value - level * self.step, "order_type": OrderType.BID})
+            await self.post_new_orders(orders)
             return
 
 
@@ -128,8 +131,9 @@ class NoiseTrader(BaseTrader):
         if order["action_type"] == ActionType.POST_NEW_ORDER.value:
             order_type = order["order_type"]
             amount, price = self.order_amount, order["price"]
-            for _ in range(order["amount"]):
-                await self.post_new_order(amount, price, order_type)
+            await self.post_new_orders(
+                [{"amount": amount, "price": price, "order_type": order_type}] * order["amount"]
+            )
 
             logger.info(
                 "POSTED %s AT %s AMOUNT %s * %s",
@@ -147,7 +151,7 @@ class NoiseTrader(BaseTrader):
             logger.info("No orders to cancel.")
             return
 
-        order_to_cancel = random.choice(self.orders)
+        order_to_cancel = self.rng.choice(self.orders)
         order_id = order_to_cancel["id"]
         await self.send_cancel_order_request(order_id)
         logger.info(f"Canceled order ID {order_id[:10]}")
@@ -162,7 +166,7 @@ class NoiseTrader(BaseTrader):
             try:
                 await self.act()
                 # await self.post_orders_from_list()
-                await asyncio.sleep(self.cooling_interval(target=self.activity_frequency))
+                await self.clock.sleep(self.cooling_interval(target=self.activity_frequency))
             except asyncio.CancelledError:
                 logger.info(
                     "Run method cancelled, performing cleanup of %s...",